@@ -0,0 +1,69 @@
+"""Compare string row hashes with 64-bit row digests for the dedup set.
+
+Builds synthetic result histories and reports, for each key type, the time
+to hash every row and the memory held by the resulting set (measured with
+``tracemalloc``, so it includes the key objects themselves).
+
+Run from the repository root::
+
+    python -m benchmarks.bench_row_hashes            # 10^5 and 10^6 rows
+    python -m benchmarks.bench_row_hashes 250000      # custom sizes
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from evolve_results_automation.parsing_utils import row_digest, unique_row_hash
+
+_TESTS = ["4748-102 Functional Skills English Level 2",
+          "4748-103 Functional Skills Maths Level 1",
+          "3905-001 Digital Skills"]
+
+
+def _rows(n):
+    for i in range(n):
+        yield {
+            "Enrolment no.": str(10000000 + i),
+            "First name": "Olivia",
+            "Last name": f"Richardson-Smith{i % 997}",
+            "Completed": f"{i % 28 + 1:02d}/{i % 12 + 1:02d}/{2020 + i % 7}",
+            "Test Name": _TESTS[i % len(_TESTS)],
+            "Result": "Pass" if i % 4 else "Fail",
+        }
+
+
+def _measure(n, key_fn):
+    """Return (seconds to build the key set, bytes held by the set)."""
+    rows = list(_rows(n))
+    gc.collect()
+    start = time.perf_counter()
+    keys = {key_fn(r) for r in rows}
+    elapsed = time.perf_counter() - start
+    assert len(keys) == n
+    del keys
+    gc.collect()
+
+    # Separate pass for memory: tracemalloc slows allocation-heavy code
+    tracemalloc.start()
+    size = _traced_size({key_fn(r) for r in rows})
+    tracemalloc.stop()
+    return elapsed, size
+
+
+def _traced_size(_held):
+    """Bytes currently traced, read while ``_held`` keeps the key set alive."""
+    return tracemalloc.get_traced_memory()[0]
+
+
+def main(sizes):
+    print(f"{'rows':>9}  {'key':<16}{'hash time':>11}{'set memory':>13}{'per row':>10}")
+    for n in sizes:
+        for name, fn in (("unique_row_hash", unique_row_hash), ("row_digest", row_digest)):
+            elapsed, size = _measure(n, fn)
+            print(f"{n:>9}  {name:<16}{elapsed:>10.2f}s{size / 2**20:>11.1f}MB"
+                  f"{size / n:>9.0f}B")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
@@ -1,3 +1,5 @@
+import multiprocessing
+
 from evolve_results_automation.gui_tk import EvolveGUI
 
 
@@ -7,4 +9,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Analytics worker processes re-launch the EXE; this hands them over to
+    # multiprocessing instead of opening another GUI
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,88 @@
+"""Background analytics refresh.
+
+A run used to rebuild the dashboards inline, so the GUI sat on "Updating
+analytics..." and the completion notification waited for every workbook to
+be rewritten. ``EvolveAutomation`` now hands the years it saved and its new
+rows to an ``AnalyticsJob`` and reports the run complete as soon as the
+results and PDFs are on disk. ``regenerate_analytics`` then runs on one
+background thread.
+
+Only one rebuild runs at a time. Work scheduled while a rebuild is running
+is merged and picked up by the same thread when it finishes. Anything that
+writes or checks the workbooks (the next run, the GUI's Excel lock check
+and backups) calls ``wait`` first, so it never holds a workbook open while
+its dashboard is being swapped in.
+"""
+import time
+import logging
+import threading
+
+from .excel_utils import regenerate_analytics
+
+
+class AnalyticsJob:
+    """Run ``regenerate_analytics`` in the background, one rebuild at a time.
+
+    ``schedule`` queues work and returns straight away. ``busy`` is True
+    while a rebuild is running or queued, and ``wait`` blocks until none
+    is. ``status`` is "idle", "running", "done" or "failed" (with the
+    message in ``error``). The thread is not a daemon, so closing the app
+    lets a rebuild that has started finish its writes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = None
+        self._thread = None
+        self.status = "idle"
+        self.error = None
+
+    @property
+    def busy(self):
+        return not self._idle.is_set()
+
+    def schedule(self, touched_years=None, changed_rows=()):
+        """Queue a rebuild for ``touched_years`` (None: every year) and
+        ``changed_rows``, merged with any rebuild not yet started."""
+        with self._lock:
+            if self._pending is None:
+                self._pending = (None if touched_years is None else set(touched_years),
+                                 list(changed_rows))
+            else:
+                years, rows = self._pending
+                if years is not None and touched_years is not None:
+                    years |= set(touched_years)
+                else:
+                    years = None
+                self._pending = (years, rows + list(changed_rows))
+            self._idle.clear()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analytics")
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until no rebuild is running or queued. False on timeout."""
+        return self._idle.wait(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._thread = None
+                    self._idle.set()
+                    return
+                touched_years, changed_rows = self._pending
+                self._pending = None
+                self.status = "running"
+            logging.info("Updating analytics...")
+            started = time.monotonic()
+            try:
+                regenerate_analytics(touched_years, changed_rows)
+            except Exception as e:
+                logging.error(f"Analytics update failed: {e}")
+                self.status, self.error = "failed", str(e)
+            else:
+                logging.info(f"Analytics updated in {time.monotonic() - started:.1f}s")
+                self.status, self.error = "done", None
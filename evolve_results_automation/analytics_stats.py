@@ -0,0 +1,556 @@
+"""Single-pass statistics behind the analytics dashboards.
+
+``RowStats`` walks a list of result rows once and keeps every per-row
+figure the dashboards show: totals, pass/fail counts, scores, unique
+candidates, centres, the monthly distribution, per-exam groups and the
+durations used for extra-time detection. The ``_compute_*`` helpers in
+``excel_utils`` are thin views over it, so a dashboard no longer re-scans
+its rows once per section.
+
+``AttemptIndex`` groups every attempt by candidate + exam once per
+analytics run, for the cross-year resit conversion and rebook figures;
+``YearAttempts`` is one year's slice of it, small enough to send to a
+worker process.
+``fingerprint`` hashes just the fields the dashboards read, so a rebuild
+can be skipped when nothing that shows up in them has changed.
+``summarize`` stores a year's aggregates as JSON; ``YearSummary``,
+``merge_stats`` and ``StoredAttemptIndex`` rebuild the dashboard views from
+those without the rows.
+
+Dates come from the rows' cached ``completed_date`` (see ``result_row.py``),
+so nothing here calls ``strptime``.
+"""
+import hashlib
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from .result_row import completed_date
+
+
+# Every row field any dashboard figure reads (not PDF or scrape times)
+ANALYTICS_FIELDS = ("Enrolment no.", "First name", "Last name", "Test Name",
+                    "Result", "Percent", "Duration", "Centre Name", "Completed")
+
+
+def fingerprint(rows, *context):
+    """Hex digest of the analytics fields of ``rows`` (in order) plus ``context``."""
+    h = hashlib.blake2b(digest_size=16)
+    for row in rows:
+        h.update("\x1f".join(str(row.get(f, "")) for f in ANALYTICS_FIELDS).encode("utf-8"))
+        h.update(b"\x1e")
+    h.update(repr(context).encode("utf-8"))
+    return h.hexdigest()
+
+
+def parse_percent(value):
+    """Score as a float, or None if the cell is blank or not a number."""
+    try:
+        return float(value.replace("%", ""))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class _ExamGroup:
+    __slots__ = ("count", "passed", "score_sum", "score_count")
+
+    def __init__(self):
+        self.count = 0
+        self.passed = 0
+        self.score_sum = 0.0
+        self.score_count = 0
+
+
+class RowStats:
+    """Every per-row statistic a dashboard needs, from one pass over ``rows``.
+
+    Group orders (exams, centres, extra-time entries) follow first
+    appearance in ``rows``, as the old per-section scans did.
+    """
+
+    def __init__(self, rows=()):
+        self.total = 0
+        self.passed = 0
+        self.failed = 0
+        self.score_sum = 0.0
+        self.score_count = 0
+        self.enrolments = set()
+        self.centres = Counter()
+        self.monthly = Counter()
+        self.exams = {}
+        self.durations = defaultdict(list)
+        for row in rows:
+            self.add(row)
+
+    def add(self, row):
+        self.total += 1
+        result = row.get("Result", "").strip().lower()
+        is_pass = result == "pass"
+        if is_pass:
+            self.passed += 1
+        elif result == "fail":
+            self.failed += 1
+        score = parse_percent(row.get("Percent", "0"))
+        if score is not None:
+            self.score_sum += score
+            self.score_count += 1
+
+        enrol = row.get("Enrolment no.", "").strip()
+        if enrol:
+            self.enrolments.add(enrol)
+        self.centres[row.get("Centre Name", "").strip() or "Unknown Centre"] += 1
+        dt = completed_date(row)
+        if dt is not None:
+            self.monthly[dt.month] += 1
+
+        test = row.get("Test Name", "").strip()
+        if not test:
+            return
+        group = self.exams.get(test)
+        if group is None:
+            group = self.exams[test] = _ExamGroup()
+        group.count += 1
+        if is_pass:
+            group.passed += 1
+        if score is not None:
+            group.score_sum += score
+            group.score_count += 1
+        duration = row.get("Duration", "").strip()
+        if duration:
+            try:
+                value = float(duration)
+            except (ValueError, TypeError):
+                return
+            self.durations[test].append((row, value))
+
+    # ── Views ─────────────────────────────────────────────────────────────
+
+    @property
+    def customers(self):
+        return len(self.enrolments)
+
+    @property
+    def avg_score(self):
+        """Mean score over rows with a numeric Percent, or None."""
+        if not self.score_count:
+            return None
+        return round(self.score_sum / self.score_count, 1)
+
+    def by_exam(self):
+        """Per-exam dicts {name, count, passed, failed, rate, avg_score},
+        most sat first."""
+        result = []
+        for name, g in self.exams.items():
+            result.append({
+                "name": name, "count": g.count, "passed": g.passed,
+                "failed": g.count - g.passed,
+                "rate": round(g.passed / g.count * 100, 1) if g.count else 0.0,
+                "avg_score": (round(g.score_sum / g.score_count, 1)
+                              if g.score_count else 0.0),
+            })
+        result.sort(key=lambda x: x["count"], reverse=True)
+        return result
+
+    def monthly_counts(self):
+        """{month_int: {"count": int}} for months with at least one exam."""
+        return {mi: {"count": cnt} for mi, cnt in self.monthly.items()}
+
+    def extra_time(self):
+        """Candidates whose duration is more than 10% over their exam's mode."""
+        result = []
+        for test, entries in self.durations.items():
+            mode_dur = Counter(d for _, d in entries).most_common(1)[0][0]
+            if not mode_dur:
+                continue
+            for rd, dur in entries:
+                if dur > mode_dur * 1.1:
+                    name = (f"{rd.get('First name', '')} "
+                            f"{rd.get('Last name', '')}").strip()
+                    result.append({
+                        "name": name,
+                        "enrolment": rd.get("Enrolment no.", "").strip(),
+                        "exam": test,
+                        "extra_pct": f"+{round((dur / mode_dur - 1) * 100)}%",
+                    })
+        return result
+
+
+# ── Candidate-exam attempt index ──────────────────────────────────────────
+# Resit conversion and rebook opportunities look at every attempt a
+# candidate made at an exam, across all years. The index groups all rows
+# once per analytics run, with attempts sorted by date ordinal, and keeps
+# the per-year results so each year tab and the Overview only look them up.
+
+class _Fail:
+    __slots__ = ("name", "enrolment", "exam", "attempts", "last_fail",
+                 "fail_date", "year")
+
+    def __init__(self, name, enrolment, exam, attempts, last_fail, fail_date, year):
+        self.name = name
+        self.enrolment = enrolment
+        self.exam = exam
+        self.attempts = attempts
+        self.last_fail = last_fail
+        self.fail_date = fail_date
+        self.year = year
+
+
+def _ordinal(dt):
+    """Date ordinal for sorting; 0 (earliest) for a missing date."""
+    return dt.toordinal() if dt is not None else 0
+
+
+class AttemptIndex:
+    """Attempts grouped by candidate + exam, built once from all rows.
+
+    Resit conversion groups by (Enrolment no., Test Name); rebook
+    opportunities by (Enrolment no., First name, Last name, Test Name), as
+    before. Rows without an enrolment number or exam are ignored.
+    """
+
+    def __init__(self, rows):
+        by_exam = defaultdict(list)
+        by_name = defaultdict(list)
+        for row in rows:
+            enrol = row.get("Enrolment no.", "").strip()
+            test = row.get("Test Name", "").strip()
+            if not enrol or not test:
+                continue
+            dt = completed_date(row)
+            attempt = (_ordinal(dt), row.get("Result", "").strip().lower() == "fail",
+                       dt, row)
+            by_exam[(enrol, test)].append(attempt)
+            by_name[(enrol, row.get("First name", "").strip(),
+                     row.get("Last name", "").strip(), test)].append(attempt)
+
+        # year -> [returned, unique fails]; None -> across all years
+        self._resits = defaultdict(lambda: [0, 0])
+        for attempts in by_exam.values():
+            attempts.sort(key=lambda a: a[0])
+            latest = attempts[-1][0]
+            last_fail = {}
+            for ordinal, failed, dt, _row in attempts:
+                if failed:
+                    last_fail[dt.year if dt is not None else 1] = ordinal
+                    last_fail[None] = ordinal
+            for year, fail_ordinal in last_fail.items():
+                counts = self._resits[year]
+                counts[1] += 1
+                if latest > fail_ordinal:
+                    counts[0] += 1
+
+        # Pairs whose latest attempt is a fail, in first-seen order
+        self._fails = []
+        for (enrol, fname, lname, test), attempts in by_name.items():
+            attempts.sort(key=lambda a: a[0])
+            _, failed, dt, latest = attempts[-1]
+            if not failed:
+                continue
+            self._fails.append(_Fail(
+                f"{fname} {lname}".strip(), enrol, test, len(attempts),
+                latest.get("Completed", ""), dt, dt.year if dt is not None else 1))
+
+    def resit_conversion(self, year=None):
+        """(returned, unique_fails): candidate+exam pairs that failed in
+        ``year`` (any year if None) and have a later attempt in any year."""
+        returned, total = self._resits.get(year, (0, 0))
+        return returned, total
+
+    def rebook_opportunities(self, year_filter=None, now=None):
+        """Candidates whose latest attempt at an exam is a fail, optionally
+        only those whose latest fail is in ``year_filter``. Most overdue first."""
+        now = now or datetime.now()
+        rebooks = []
+        for f in self._fails:
+            if year_filter is not None and f.year != year_filter:
+                continue
+            rebooks.append({
+                "name": f.name,
+                "enrolment": f.enrolment,
+                "exam": f.exam,
+                "attempts": f.attempts,
+                "last_fail": f.last_fail,
+                "days_ago": (now - f.fail_date).days if f.fail_date is not None else 0,
+            })
+        rebooks.sort(key=lambda x: x["days_ago"], reverse=True)
+        return rebooks
+
+
+class YearAttempts:
+    """One year's resit and rebook figures, cut from an attempt index.
+
+    A year dashboard only asks the index about its own year, so this small
+    picklable slice is what a worker process gets instead of the whole
+    index (and every row behind it). Rebook days are counted from ``now``
+    when the slice is made.
+    """
+    __slots__ = ("year", "resits", "rebooks")
+
+    def __init__(self, attempts, year, now=None):
+        self.year = year
+        self.resits = attempts.resit_conversion(year)
+        self.rebooks = attempts.rebook_opportunities(year_filter=year, now=now)
+
+    def resit_conversion(self, year=None):
+        return self.resits
+
+    def rebook_opportunities(self, year_filter=None, now=None):
+        return [dict(r) for r in self.rebooks]
+
+
+# ── Stored year summaries ─────────────────────────────────────────────────
+# ``summarize`` reduces a year workbook's rows to the aggregates the
+# dashboards read: the RowStats counters, the durations behind extra-time
+# detection, and per candidate + exam the latest attempt and last fail date
+# (per fail year) plus the latest attempt per candidate name. ``excel_utils``
+# keeps it in a JSON sidecar next to the workbook and folds each save's new
+# rows into it with ``merge_summary``, so neither a save nor an analytics
+# run has to summarize a whole year. The classes below rebuild the
+# dashboard views from it.
+
+def _full_name(row):
+    return f"{row.get('First name', '')} {row.get('Last name', '')}".strip()
+
+
+def _mode(counts):
+    """Most common duration in ``[[duration, count], ...]``; the first seen
+    wins ties, as with ``Counter.most_common``."""
+    return max(counts, key=lambda c: c[1])[0]
+
+
+def _drop_mode_entries(groups):
+    """Leave out entries at their exam's (positive) mode duration: they are
+    most of the rows and never count as extra time."""
+    for group in groups:
+        mode = _mode(group[1])
+        if mode > 0:
+            group[2] = [e for e in group[2] if e[2] != mode]
+    return groups
+
+
+def _merge_durations(stored, groups):
+    """Duration groups of ``stored`` followed by ``groups`` (all entries
+    kept), or None if an exam's mode moved far enough that entries left out
+    of ``stored`` could now count as extra time."""
+    merged = {}
+    for test, counts, entries in stored:
+        merged[test] = [dict(counts), list(entries), _mode(counts)]
+    for test, counts, entries in groups:
+        group = merged.setdefault(test, [{}, [], None])
+        for dur, n in counts:
+            group[0][dur] = group[0].get(dur, 0) + n
+        group[1].extend(entries)
+    result = []
+    for test, (counts, entries, old_mode) in merged.items():
+        counts = list(counts.items())
+        mode = _mode(counts)
+        if old_mode is not None and old_mode > 0 and mode and old_mode > mode * 1.1:
+            return None
+        result.append([test, counts, entries])
+    return _drop_mode_entries(result)
+
+
+def _fold_attempts(pairs, names, summary):
+    """Add a summary's attempts to the ``pairs`` and ``names`` dicts, as if
+    its rows came after theirs (a later attempt wins a date tie, as in
+    AttemptIndex's stable sort)."""
+    for enrol, test, ordinal, fails in summary["pairs"]:
+        pair = pairs.get((enrol, test))
+        if pair is None:
+            pairs[(enrol, test)] = [ordinal, dict(fails)]
+            continue
+        pair[0] = max(pair[0], ordinal)
+        for year, fail_ordinal in fails:
+            pair[1][year] = max(pair[1].get(year, fail_ordinal), fail_ordinal)
+    for enrol, fname, lname, test, count, ordinal, failed, completed in summary["names"]:
+        key = (enrol, fname, lname, test)
+        entry = names.get(key)
+        if entry is None:
+            names[key] = [count, ordinal, failed, completed]
+        else:
+            entry[0] += count
+            if ordinal >= entry[1]:
+                entry[1:] = [ordinal, failed, completed]
+
+
+def _summary(stats, year, pairs, names, durations):
+    return {
+        "year": year,
+        "total": stats.total,
+        "passed": stats.passed,
+        "failed": stats.failed,
+        "score_sum": stats.score_sum,
+        "score_count": stats.score_count,
+        "enrolments": sorted(stats.enrolments),
+        "centres": list(stats.centres.items()),
+        "monthly": list(stats.monthly.items()),
+        "exams": [[name, g.count, g.passed, g.score_sum, g.score_count]
+                  for name, g in stats.exams.items()],
+        "durations": durations,
+        "pairs": [[enrol, test, latest, sorted(fails.items())]
+                  for (enrol, test), (latest, fails) in pairs.items()],
+        "names": [[*key, *entry] for key, entry in names.items()],
+    }
+
+
+def _summarize(rows):
+    """``summarize`` with every duration entry kept."""
+    stats = RowStats(rows)
+    year = None
+    pairs = {}   # (enrolment, exam) -> [latest ordinal, {fail year: last fail ordinal}]
+    names = {}   # (enrolment, first, last, exam) -> [attempts, ordinal, failed, Completed]
+    for row in rows:
+        dt = completed_date(row)
+        if year is None and dt is not None:
+            year = dt.year
+        enrol = row.get("Enrolment no.", "").strip()
+        test = row.get("Test Name", "").strip()
+        if not enrol or not test:
+            continue
+        ordinal = _ordinal(dt)
+        failed = row.get("Result", "").strip().lower() == "fail"
+        pair = pairs.setdefault((enrol, test), [ordinal, {}])
+        pair[0] = max(pair[0], ordinal)
+        if failed:
+            fail_year = dt.year if dt is not None else 1
+            pair[1][fail_year] = max(pair[1].get(fail_year, ordinal), ordinal)
+        key = (enrol, row.get("First name", "").strip(),
+               row.get("Last name", "").strip(), test)
+        entry = names.get(key)
+        if entry is None:
+            names[key] = [1, ordinal, failed, row.get("Completed", "")]
+        else:
+            entry[0] += 1
+            if ordinal >= entry[1]:
+                entry[1:] = [ordinal, failed, row.get("Completed", "")]
+    durations = [[test, list(Counter(d for _, d in entries).items()),
+                  [[_full_name(rd), rd.get("Enrolment no.", "").strip(), d]
+                   for rd, d in entries]]
+                 for test, entries in stats.durations.items()]
+    return _summary(stats, year, pairs, names, durations)
+
+
+def summarize(rows):
+    """JSON-ready aggregates of a year workbook's ``rows`` (in workbook order)."""
+    summary = _summarize(rows)
+    _drop_mode_entries(summary["durations"])
+    return summary
+
+
+def merge_summary(summary, rows):
+    """``summary`` with ``rows`` added after the rows it was made from.
+
+    Only ``rows`` are read. Group orders follow the order rows were added
+    rather than workbook order. Returns None when an exam's usual duration
+    changed such that the full rows have to be summarized again.
+    """
+    part = _summarize(rows)
+    durations = _merge_durations(summary["durations"], part["durations"])
+    if durations is None:
+        return None
+    stats = merge_stats([YearSummary(summary), YearSummary(part)])
+    pairs, names = {}, {}
+    for s in (summary, part):
+        _fold_attempts(pairs, names, s)
+    year = summary["year"] if summary["year"] is not None else part["year"]
+    return _summary(stats, year, pairs, names, durations)
+
+
+class YearSummary(RowStats):
+    """One year's RowStats rebuilt from its ``summarize`` output.
+
+    ``year`` is the year of the first dated row (None if no row is dated).
+    Picklable, so it is what a worker process gets for a year dashboard.
+    """
+
+    def __init__(self, summary):
+        super().__init__()
+        self.year = summary["year"]
+        self.total = summary["total"]
+        self.passed = summary["passed"]
+        self.failed = summary["failed"]
+        self.score_sum = summary["score_sum"]
+        self.score_count = summary["score_count"]
+        self.enrolments = set(summary["enrolments"])
+        self.centres = Counter(dict(summary["centres"]))
+        self.monthly = Counter(dict(summary["monthly"]))
+        for name, count, passed, score_sum, score_count in summary["exams"]:
+            group = self.exams[name] = _ExamGroup()
+            group.count = count
+            group.passed = passed
+            group.score_sum = score_sum
+            group.score_count = score_count
+        self._durations = summary["durations"]
+
+    def extra_time(self):
+        result = []
+        for test, counts, entries in self._durations:
+            mode_dur = _mode(counts)
+            if not mode_dur:
+                continue
+            for name, enrol, dur in entries:
+                if dur > mode_dur * 1.1:
+                    result.append({
+                        "name": name,
+                        "enrolment": enrol,
+                        "exam": test,
+                        "extra_pct": f"+{round((dur / mode_dur - 1) * 100)}%",
+                    })
+        return result
+
+
+def merge_stats(parts):
+    """RowStats over several years, from their RowStats in row order.
+
+    Score sums are added per year rather than per row, so a mean can differ
+    from a single pass in the last bit; the dashboards round it to one
+    decimal. Extra time is a per-year figure and is not merged.
+    """
+    merged = RowStats()
+    for stats in parts:
+        merged.total += stats.total
+        merged.passed += stats.passed
+        merged.failed += stats.failed
+        merged.score_sum += stats.score_sum
+        merged.score_count += stats.score_count
+        merged.enrolments |= stats.enrolments
+        merged.centres.update(stats.centres)
+        merged.monthly.update(stats.monthly)
+        for name, g in stats.exams.items():
+            group = merged.exams.get(name)
+            if group is None:
+                group = merged.exams[name] = _ExamGroup()
+            group.count += g.count
+            group.passed += g.passed
+            group.score_sum += g.score_sum
+            group.score_count += g.score_count
+    return merged
+
+
+class StoredAttemptIndex(AttemptIndex):
+    """AttemptIndex rebuilt from the ``summarize`` output of every year
+    workbook, given in the order their rows would be read."""
+
+    def __init__(self, summaries):
+        latest = {}
+        names = {}
+        for summary in summaries:
+            _fold_attempts(latest, names, summary)
+
+        self._resits = defaultdict(lambda: [0, 0])
+        for latest_ordinal, per_year in latest.values():
+            if not per_year:
+                continue
+            for year, fail_ordinal in [*per_year.items(), (None, max(per_year.values()))]:
+                counts = self._resits[year]
+                counts[1] += 1
+                if latest_ordinal > fail_ordinal:
+                    counts[0] += 1
+
+        self._fails = []
+        for (enrol, fname, lname, test), (count, ordinal, failed, completed) in names.items():
+            if not failed:
+                continue
+            dt = datetime.fromordinal(ordinal) if ordinal else None
+            self._fails.append(_Fail(
+                f"{fname} {lname}".strip(), enrol, test, count, completed, dt,
+                dt.year if dt is not None else 1))
@@ -24,6 +24,18 @@ def get_excel_file_for_year(year):
     """Get the Excel file path for a specific year (no mkdir)."""
     return os.path.join(_year_folder_path(year), f"exam_results_{year}.xlsx")
 
+def get_dedup_index_for_year(year):
+    """Get the dedup index sidecar path for a specific year (no mkdir)."""
+    return os.path.join(_year_folder_path(year), f"exam_results_{year}.index.json")
+
+def get_analytics_summary_for_year(year):
+    """Get the analytics summary sidecar path for a specific year (no mkdir)."""
+    return os.path.join(_year_folder_path(year), f"exam_results_{year}.analytics.json")
+
+def get_pdf_ledger_for_year(year):
+    """Get the append-only PDF download ledger path for a year (no mkdir)."""
+    return os.path.join(_year_folder_path(year), f"pdf_ledger_{year}.jsonl")
+
 def get_reports_base_for_year(year):
     """Get the reports base folder for a specific year (no mkdir)."""
     return os.path.join(_year_folder_path(year), "reports")
@@ -70,6 +82,9 @@ COLUMNS = [
 # Root-level files (shared across years)
 ENCRYPTED_CREDENTIALS_FILE = os.path.join(BASE_DIR, "credentials.enc")
 ANALYTICS_FILE = os.path.join(BASE_DIR, "analytics.xlsx")
+ANALYTICS_CACHE_FILE = os.path.join(BASE_DIR, "analytics_cache.json")
+PDF_RETRY_QUEUE_FILE = os.path.join(BASE_DIR, "pdf_retry_queue.json")
+PDF_STORE_DIR = os.path.join(BASE_DIR, "pdf_store")
 
 # User settings (persisted across sessions)
 SETTINGS_FILE = os.path.join(BASE_DIR, "settings.json")
@@ -81,6 +96,12 @@ _DEFAULT_SETTINGS = {
     "schedule_time": "",
     "start_with_windows": False,
     "minimize_to_tray": False,
+    # Report downloads: keep-alive connections per host and the minimum
+    # gap in seconds between two requests to the same host
+    "download_connections": 2,
+    "download_min_interval": 0.25,
+    # Keep each report once under pdf_store/ and hard-link it into reports/
+    "pdf_content_store": False,
 }
 
 def atomic_json_write(path: str, data) -> None:
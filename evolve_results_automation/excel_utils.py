@@ -1,17 +1,38 @@
+import io
 import os
 import re
+import json
+import heapq
 import shutil
 import logging
-from collections import Counter, defaultdict
+import pickle
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from openpyxl import Workbook, load_workbook
 from openpyxl.chart import BarChart, Reference
 from openpyxl.chart.label import DataLabelList
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
 from openpyxl.utils import get_column_letter
 
-from .config import COLUMNS, ANALYTICS_FILE, get_excel_file_for_year, list_year_excel_files
-from .parsing_utils import unique_row_hash
+from .config import (
+    COLUMNS, ANALYTICS_FILE, ANALYTICS_CACHE_FILE, atomic_json_write,
+    get_analytics_summary_for_year, get_dedup_index_for_year,
+    get_excel_file_for_year, list_year_excel_files
+)
+from .analytics_stats import (
+    ANALYTICS_FIELDS, AttemptIndex, RowStats, StoredAttemptIndex, YearAttempts,
+    YearSummary, fingerprint, merge_stats, merge_summary, summarize
+)
+from .pdf_ledger import apply_ledger, mark_reports_on_disk
+from .result_row import ResultRow, completed_date
+from .xlsx_patch import append_sheets, replace_sheets
+from .xlsx_reader import iter_sheet_values, sheet_names
 
 
 def _normalize(val):
@@ -57,29 +78,71 @@ def initialize_excel(filepath: str):
         wb.close()
 
 
-def load_existing_results(filepath: str):
-    """Load rows from an Excel file as a list of dicts with string values."""
-    if not os.path.exists(filepath):
+def _rows_to_records(rows_iter):
+    """Turn a header row + value rows iterator into ``ResultRow`` records."""
+    # First row is the header
+    try:
+        headers = [str(h) if h is not None else "" for h in next(rows_iter)]
+    except StopIteration:
         return []
+
+    result = []
+    if headers == COLUMNS:
+        # The app's own layout: values are already in record order
+        for row_values in rows_iter:
+            result.append(ResultRow.from_values([_normalize(v) for v in row_values]))
+        return result
+    for row_values in rows_iter:
+        result.append(ResultRow({h: _normalize(v) for h, v in zip(headers, row_values)}))
+    return result
+
+
+def _load_existing_results_openpyxl(filepath: str):
+    """openpyxl read-only loader, used when the streaming reader cannot cope."""
     wb = load_workbook(filepath, read_only=True, data_only=True)
     try:
         ws = wb["Results"] if "Results" in wb.sheetnames else wb.active
-        rows_iter = ws.iter_rows(values_only=True)
+        return _rows_to_records(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
 
-        # First row is the header
-        try:
-            headers = [str(h) if h is not None else "" for h in next(rows_iter)]
-        except StopIteration:
-            return []
 
-        result = []
-        for row_values in rows_iter:
-            row_dict = {h: _normalize(v) for h, v in zip(headers, row_values)}
-            result.append(row_dict)
+def load_existing_results(filepath: str):
+    """Load rows from an Excel file as a list of ``ResultRow`` records.
 
-        return result
-    finally:
-        wb.close()
+    Streams the Results sheet XML directly (see ``xlsx_reader``) and falls
+    back to openpyxl for workbooks the streaming reader cannot handle, such
+    as files without a Results sheet.
+    """
+    if not os.path.exists(filepath):
+        return []
+    try:
+        return _rows_to_records(iter_sheet_values(filepath, "Results"))
+    except Exception as e:
+        logging.debug(f"Streaming read failed for {os.path.basename(filepath)}, "
+                      f"using openpyxl: {e!r}")
+    return _load_existing_results_openpyxl(filepath)
+
+
+def _apply_results_banding(ws, last_row):
+    """Style the Results data area with two conditional-format rules.
+
+    Borders, font colour and the alternating stripe come from a pair of
+    formula rules over the whole data range instead of per-cell styles, so
+    the styling cost and the size of the sheet XML stay constant however
+    many rows the year has. Stripes follow the row number, so they stay
+    even after an admin sorts the sheet in Excel; rows hidden by a filter
+    still take their place in the alternation.
+    """
+    if last_row < 2:
+        return
+    data_ref = f"A2:{get_column_letter(len(COLUMNS))}{last_row}"
+    ws.conditional_formatting.add(data_ref, FormulaRule(
+        formula=["MOD(ROW(),2)=0"], font=_DATA_CF_FONT,
+        border=_THIN_BORDER, fill=_STRIPE_CF_FILL))
+    ws.conditional_formatting.add(data_ref, FormulaRule(
+        formula=["MOD(ROW(),2)=1"], font=_DATA_CF_FONT,
+        border=_THIN_BORDER))
 
 
 def _build_results_workbook(rows: list):
@@ -90,13 +153,18 @@ def _build_results_workbook(rows: list):
     ws.title = "Results"
     ws.sheet_properties.tabColor = 'E30613'
     ws.append(COLUMNS)
+    # Track column widths while appending instead of re-walking every cell
+    max_lengths = [len(col) for col in COLUMNS]
     for row in rows:
         values = []
-        for col in COLUMNS:
+        for ci, col in enumerate(COLUMNS):
             val = row.get(col, "")
             if col in date_cols_ddmmyyyy:
                 val = format_ddmmyyyy(val)
             values.append(val)
+            val_len = len(str(val)) if val is not None else 0
+            if val_len > max_lengths[ci]:
+                max_lengths[ci] = val_len
         ws.append(values)
 
     # Apply formatting in-memory before saving (single I/O operation)
@@ -108,25 +176,11 @@ def _build_results_workbook(rows: list):
         cell.font = _HDR_FONT
         cell.fill = _HDR_FILL
     # Alternating row stripes + thin grey borders (consistent with Analytics tab)
-    for row_idx in range(2, ws.max_row + 1):
-        for cell in ws[row_idx]:
-            cell.border = _THIN_BORDER
-            cell.font = _DATA_FONT
-            if row_idx % 2 == 0:
-                cell.fill = _STRIPE_FILL
+    _apply_results_banding(ws, len(rows) + 1)
 
     # Auto-fit column widths
-    for col in ws.columns:
-        max_length = 0
-        col_letter = col[0].column_letter
-        for cell in col:
-            try:
-                cell_len = len(str(cell.value)) if cell.value is not None else 0
-                if cell_len > max_length:
-                    max_length = cell_len
-            except Exception:
-                pass
-        ws.column_dimensions[col_letter].width = max(10, min(max_length + 2, 50))
+    for ci, max_length in enumerate(max_lengths, start=1):
+        ws.column_dimensions[get_column_letter(ci)].width = max(10, min(max_length + 2, 50))
 
     return wb
 
@@ -146,83 +200,282 @@ def format_ddmmyyyy(val):
         return s
 
 
+def _valid_rows(rows):
+    """Drop garbage rows missing core fields (record values are pre-stripped)."""
+    return [r for r in rows if r["Completed"] and r["First name"] and r["Last name"]]
+
+
+def _completed_sort_key(row):
+    """Sort key for Results rows: Completed date, unparseable dates last."""
+    return row.completed_date or datetime.max
+
+
+def _is_sorted(rows):
+    """True if ``rows`` are already in ``_completed_sort_key`` order."""
+    keys = [_completed_sort_key(r) for r in rows]
+    return all(a <= b for a, b in zip(keys, keys[1:]))
+
+
 def save_year_to_excel(year, rows_by_year, silent=False):
-    """Save rows for a given year to Excel, merging with existing data and deduplicating."""
+    """Save rows for a given year to Excel, merging with existing data and deduplicating.
+
+    Returns the rows that replaced a workbook row with different dashboard
+    fields (for example a corrected Result), so the caller can rebuild the
+    other years whose resit and rebook figures read them."""
     if year not in rows_by_year:
-        return
+        return []
     year_rows = rows_by_year[year]
     excel_file = get_excel_file_for_year(year)
     initialize_excel(excel_file)
 
     # Load existing data (may contain rows from previous accounts)
-    existing = load_existing_results(excel_file)
-
-    # Merge existing + new
-    combined = existing + year_rows
-
-    # Remove garbage rows missing core fields
-    core_fields = ["Completed", "First name", "Last name"]
-    combined = [r for r in combined
-                if all(r.get(cf, "").strip() for cf in core_fields)]
+    existing = _valid_rows(load_existing_results(excel_file))
 
-    # Deduplicate using unique_row_hash, keep last (in-memory rows have latest PDF links)
+    # Deduplicate using the row digest, keep last (in-memory rows have latest
+    # PDF links). A row already in the workbook is replaced in place - its
+    # Completed date is part of the digest, so its sort position still holds.
     seen = {}
-    for row in combined:
-        seen[unique_row_hash(row)] = row
-    combined = list(seen.values())
-
-    # Enforce column order from config (fill missing columns with empty string)
-    combined = [{col: row.get(col, "") for col in COLUMNS} for row in combined]
-
-    # Sort by completion date
-    def sort_key(row):
-        try:
-            return datetime.strptime(row.get("Completed", ""), "%d/%m/%Y")
-        except (ValueError, TypeError):
-            return datetime.max
-    try:
-        combined.sort(key=sort_key)
-    except Exception as e:
-        logging.warning(f"Sorting failed for year {year}: {e}")
+    for row in existing:
+        seen[row.digest] = row
+    new_rows = {}
+    edited = []
+    for row in _valid_rows(ResultRow.coerce(r) for r in year_rows):
+        if row.digest in seen:
+            if _analytics_values(seen[row.digest]) != _analytics_values(row):
+                edited.append(row)
+            seen[row.digest] = row
+        else:
+            new_rows[row.digest] = row
+    base = list(seen.values())
+    new_rows = sorted(new_rows.values(), key=_completed_sort_key)
+
+    # The stored analytics summary can take the new rows as they are when it
+    # matches the workbook and no existing row changed a dashboard field
+    stored = None
+    if not edited:
+        stored = _read_year_summary(year, excel_file)
+        if stored is not None and stored["total"] != len(base):
+            stored = None
+
+    # The workbook is written in Completed order, so only the new rows need
+    # sorting before a linear merge. Stable: existing rows stay ahead of new
+    # rows with the same date, exactly as a full sort of existing + new would.
+    if not _is_sorted(base):
+        logging.debug(f"{year}/exam_results_{year}.xlsx is out of order, re-sorting")
+        base.sort(key=_completed_sort_key)
+    combined = list(heapq.merge(base, new_rows, key=_completed_sort_key))
 
     wb = _build_results_workbook(combined)
     try:
-        _atomic_wb_save(wb, excel_file)
+        if new_rows or edited or not _save_keeping_dashboard(wb, excel_file):
+            _atomic_wb_save(wb, excel_file)
     finally:
         wb.close()
+    _write_dedup_index(year, excel_file, combined)
+    _write_year_summary(year, excel_file, combined, stored, new_rows)
     if not silent:
         logging.info(f"Saved {len(combined)} rows to {year}/exam_results_{year}.xlsx")
+    return edited
+
+
+def _save_keeping_dashboard(wb, excel_file):
+    """Save the Results workbook ``wb`` over ``excel_file``, carrying the
+    file's existing Analytics and _ChartData sheets across.
+
+    Only for saves that change no dashboard field (such as PDF save times
+    alone): the year's analytics fingerprint still matches, so
+    ``regenerate_analytics`` skips the year instead of rebuilding a dropped
+    tab. Returns False, having written nothing, when the file has no
+    dashboard or its parts cannot be grafted; the caller then saves
+    Results alone and the dashboard is rebuilt."""
+    try:
+        if sheet_names(excel_file)[1:] != ["Analytics", "_ChartData"]:
+            return False
+        buf = io.BytesIO()
+        wb.save(buf)
+        append_sheets(buf, [excel_file], excel_file)
+        return True
+    except Exception as e:
+        logging.debug(f"Saving {os.path.basename(excel_file)} without its dashboard: {e}")
+        return False
+
+
+# ── Dedup index sidecar ───────────────────────────────────────────────────
+# Each year workbook gets an ``exam_results_YYYY.index.json`` next to it
+# holding the row hashes and the rows still waiting for a PDF, stamped with
+# the workbook's mtime and size. ``load_all_existing_data`` only re-reads a
+# workbook when that stamp no longer matches (edited in Excel, restored from
+# .bak, first run after upgrade), so startup cost follows what changed.
+_DEDUP_INDEX_VERSION = 2
+
+
+def _file_signature(path):
+    """Return [mtime_ns, size] for a file, used to detect outside edits."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _build_index_entry(rows):
+    """Collect the hashes and PDF-pending rows from a year's loaded rows."""
+    hashes = []
+    pending = []
+    for r in rows:
+        # Skip garbage rows missing core fields
+        if not r["Completed"]:
+            continue
+        hashes.append(r.digest)
+        # Only rows needing a PDF download are kept in full
+        if not r["PDF report save time"]:
+            pending.append(dict(r))
+    return {"hashes": hashes, "pending": pending}
+
+
+def _read_dedup_index(year, excel_file):
+    """Return the cached index entry for a year, or None if missing or stale."""
+    index_path = get_dedup_index_for_year(year)
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        if (entry.get("version") == _DEDUP_INDEX_VERSION
+                and entry.get("source") == _file_signature(excel_file)):
+            return entry
+    except (OSError, ValueError) as e:
+        if os.path.exists(index_path):
+            logging.debug(f"Ignoring unreadable dedup index {index_path}: {e}")
+    return None
+
+
+def _write_dedup_index(year, excel_file, rows):
+    """Persist the index entry for a year, stamped with the workbook signature.
+    Returns the entry (written or not) so callers can use it directly."""
+    entry = _build_index_entry(rows)
+    try:
+        entry["version"] = _DEDUP_INDEX_VERSION
+        entry["source"] = _file_signature(excel_file)
+        atomic_json_write(get_dedup_index_for_year(year), entry)
+    except (OSError, TypeError, ValueError) as e:
+        logging.debug(f"Could not write dedup index for {year}: {e}")
+    return entry
+
+
+def _restamp_sidecars(year, excel_file, source):
+    """Move a year's dedup index and analytics summary over to the workbook's
+    new signature after only its dashboard sheets were rewritten (its rows,
+    and so both sidecars, are unchanged). A sidecar that did not match
+    ``source``, the signature before the rewrite, is left stale."""
+    new_source = _file_signature(excel_file)
+    for path in (get_dedup_index_for_year(year), get_analytics_summary_for_year(year)):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("source") == source:
+                entry["source"] = new_source
+                atomic_json_write(path, entry)
+        except (OSError, ValueError, AttributeError) as e:
+            logging.debug(f"Could not restamp {os.path.basename(path)}: {e}")
+
+
+# ── Analytics summary sidecar ─────────────────────────────────────────────
+# ``exam_results_YYYY.analytics.json`` holds the year's dashboard aggregates
+# (see ``analytics_stats.summarize``), stamped like the dedup index. A save
+# merges its new rows into the stored summary (``merge_summary``) and only
+# summarizes the whole year when the summary is stale or an existing row's
+# dashboard fields changed. ``regenerate_analytics`` builds every
+# dashboard from these, so only a workbook edited outside the app is re-read.
+_SUMMARY_VERSION = 2
+
+
+def _read_year_summary(year, excel_file):
+    """Return the stored summary for a year, or None if missing or stale."""
+    path = get_analytics_summary_for_year(year)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            summary = json.load(f)
+        if (summary.get("version") == _SUMMARY_VERSION
+                and summary.get("source") == _file_signature(excel_file)):
+            return summary
+    except (OSError, ValueError, AttributeError) as e:
+        if os.path.exists(path):
+            logging.debug(f"Ignoring unreadable analytics summary {path}: {e}")
+    return None
+
+
+def _analytics_values(row):
+    return tuple(row[f] for f in ANALYTICS_FIELDS)
+
+
+def _write_year_summary(year, excel_file, rows, stored=None, new_rows=()):
+    """Persist the summary of a year's ``rows``, stamped with the workbook
+    signature. With ``stored`` (the summary of the rows before ``new_rows``
+    were added) only ``new_rows`` are summarized and merged in; the full
+    rows are summarized if that is not possible. Returns the summary
+    (written or not)."""
+    summary = merge_summary(stored, new_rows) if stored is not None else None
+    if summary is None:
+        summary = summarize(rows)
+    try:
+        summary["version"] = _SUMMARY_VERSION
+        summary["source"] = _file_signature(excel_file)
+        atomic_json_write(get_analytics_summary_for_year(year), summary)
+    except (OSError, TypeError, ValueError) as e:
+        logging.debug(f"Could not write analytics summary for {year}: {e}")
+    return summary
+
+
+def _load_year_summaries():
+    """{year: summary} for every year workbook, newest first (the order
+    their rows were always read in). A missing or stale summary is rebuilt
+    from its workbook."""
+    summaries = {}
+    for year_str, filepath in list_year_excel_files():
+        yr = int(year_str)
+        summary = _read_year_summary(yr, filepath)
+        if summary is None:
+            logging.debug(f"Rebuilding analytics summary for {year_str}")
+            summary = _write_year_summary(yr, filepath, load_existing_results(filepath))
+        summaries[yr] = summary
+    return summaries
 
 
 def load_all_existing_data(silent=False):
     """Load all existing year Excel files and return hashes + rows needing PDF download.
-    
+
+    Years whose workbook is unchanged since their dedup index was written are
+    served from the index; only changed years are re-read from Excel. Rows
+    the PDF ledger already records, or whose report is already on disk, come
+    back with their save time filled in (so the next save writes it) and are
+    not counted as pending.
+
     Returns:
         tuple: (existing_hashes: set, rows_by_year: dict, pdf_resume_count: int)
     """
     existing_hashes = set()
     rows_by_year = {}
     pdf_resume_count = 0
-    for _year_str, excel_path in list_year_excel_files():
-        rows = load_existing_results(excel_path)
-        for r in rows:
-            # Skip garbage rows missing core fields
-            completed_val = r.get("Completed", "").strip()
-            if not completed_val:
-                continue
-
-            existing_hashes.add(unique_row_hash(r))
-            # Only add rows needing PDF download to rows_by_year
-            report_dl = r.get("PDF report save time", "").strip()
-            if not report_dl:
-                try:
-                    yr = datetime.strptime(completed_val, "%d/%m/%Y").year
-                except (ValueError, TypeError):
-                    continue  # Skip rows with unparseable dates
-                if yr not in rows_by_year:
-                    rows_by_year[yr] = []
-                rows_by_year[yr].append(r)
-                pdf_resume_count += 1
+    rebuilt = []
+    for year_str, excel_path in list_year_excel_files():
+        entry = _read_dedup_index(year_str, excel_path)
+        if entry is None:
+            entry = _write_dedup_index(
+                year_str, excel_path, load_existing_results(excel_path))
+            rebuilt.append(year_str)
+        existing_hashes.update(entry["hashes"])
+        for pending in entry["pending"]:
+            r = ResultRow(pending)
+            if r.completed_date is None:
+                continue  # Skip rows with unparseable dates
+            yr = r.completed_date.year
+            if yr not in rows_by_year:
+                rows_by_year[yr] = []
+            rows_by_year[yr].append(r)
+            pdf_resume_count += 1
+    # Downloads recorded in the ledger but not yet written to the workbook
+    # (run stopped before the batch save) are not pending any more, and
+    # neither are rows whose report is already in the reports folder
+    pdf_resume_count -= apply_ledger(rows_by_year)
+    pdf_resume_count -= mark_reports_on_disk(rows_by_year)
+    if rebuilt:
+        logging.debug(f"Rebuilt dedup index for {', '.join(sorted(rebuilt))}")
     if not silent:
         logging.info(f"Loaded {len(existing_hashes)} existing results from Excel files")
     return existing_hashes, rows_by_year, pdf_resume_count
@@ -260,6 +513,77 @@ _FOOTER_FONT     = Font(italic=True, size=7, color=_GREY_600)
 _THIN_BORDER = Border(
     left=Side('thin', color=_GREY_400), right=Side('thin', color=_GREY_400),
     top=Side('thin', color=_GREY_400), bottom=Side('thin', color=_GREY_400))
+# Conditional-format equivalents for the Results sheet (dxf fills use bgColor)
+_DATA_CF_FONT    = Font(color=_BLACK)
+_STRIPE_CF_FILL  = PatternFill('solid', fgColor='FFF2F2', bgColor='FFF2F2')
+
+# ── Named styles ──────────────────────────────────────────────────────────
+# Every Analytics cell format is a NamedStyle, registered once per workbook
+# by _register_styles and assigned by name (cell.style = "table-header").
+# That is one style-array copy per cell, where setting font, fill, border
+# and alignment separately makes openpyxl hash and look up each object.
+_GRID_SIDE = Side('thin', color=_GREY_400)
+_KPI_EDGE  = Side('medium', color=_RED)
+_V_CENTER  = Alignment(vertical='center')
+_CENTER    = Alignment(horizontal='center', vertical='center')
+_CENTER_WRAP = Alignment(horizontal='center', vertical='center', wrap_text=True)
+_LEFT_WRAP = Alignment(horizontal='left', vertical='center', wrap_text=True)
+_KPI_TOP    = Border(top=_KPI_EDGE, bottom=_GRID_SIDE, left=_GRID_SIDE, right=_GRID_SIDE)
+_KPI_MIDDLE = Border(top=_GRID_SIDE, bottom=_GRID_SIDE, left=_GRID_SIDE, right=_GRID_SIDE)
+_KPI_BOTTOM = Border(top=_GRID_SIDE, bottom=_KPI_EDGE, left=_GRID_SIDE, right=_GRID_SIDE)
+_HIGHLIGHT_FONT = Font(bold=True, size=9, color=_RED_FG)
+_HIGHLIGHT_FILL = PatternFill('solid', fgColor=_RED_BG)
+
+_STYLES = {
+    "header-title":      dict(font=_TITLE_FONT, fill=_TITLE_FILL, alignment=_V_CENTER),
+    "header-meta":       dict(font=_TITLE_META_FONT, fill=_TITLE_FILL, alignment=_V_CENTER),
+    "header-fill":       dict(fill=_TITLE_FILL),
+    "section-title":     dict(font=_SECTION_FONT),
+    "insight-text":      dict(font=_INSIGHT_FONT),
+    "insight-wrap":      dict(font=_INSIGHT_FONT,
+                              alignment=Alignment(vertical='center', wrap_text=True)),
+    "footer-text":       dict(font=_FOOTER_FONT, alignment=Alignment(horizontal='left')),
+    # Wide tables: the first cell of each merged field holds the value,
+    # the rest ("-cell") only carry the border and fill
+    "table-header":      dict(font=_HDR_FONT, fill=_HDR_FILL, border=_THIN_BORDER,
+                              alignment=_CENTER_WRAP),
+    "table-header-cell": dict(fill=_HDR_FILL, border=_THIN_BORDER),
+    "table-row-first":   dict(font=_DATA_FONT, border=_THIN_BORDER, alignment=_LEFT_WRAP),
+    "table-row":         dict(font=_DATA_FONT, border=_THIN_BORDER, alignment=_CENTER_WRAP),
+    "table-row-cell":    dict(border=_THIN_BORDER),
+    "table-row-striped-first": dict(font=_DATA_FONT, fill=_STRIPE_FILL, border=_THIN_BORDER,
+                                    alignment=_LEFT_WRAP),
+    "table-row-striped": dict(font=_DATA_FONT, fill=_STRIPE_FILL, border=_THIN_BORDER,
+                              alignment=_CENTER_WRAP),
+    "table-row-striped-cell": dict(fill=_STRIPE_FILL, border=_THIN_BORDER),
+    "highlight-days":    dict(font=_HIGHLIGHT_FONT, fill=_HIGHLIGHT_FILL, border=_THIN_BORDER,
+                              alignment=_CENTER_WRAP),
+    "highlight-days-cell": dict(font=_HIGHLIGHT_FONT, fill=_HIGHLIGHT_FILL,
+                                border=_THIN_BORDER),
+    # KPI cards: three rows, red accent above and below
+    "kpi-card-top":      dict(fill=_KPI_FILL, border=_KPI_TOP),
+    "kpi-card-middle":   dict(fill=_KPI_FILL, border=_KPI_MIDDLE),
+    "kpi-card-bottom":   dict(fill=_KPI_FILL, border=_KPI_BOTTOM),
+    "kpi-label":         dict(font=_KPI_LABEL_FONT, fill=_KPI_FILL, border=_KPI_TOP,
+                              alignment=_CENTER),
+    "kpi-value":         dict(font=_KPI_VALUE_FONT, fill=_KPI_FILL, border=_KPI_MIDDLE,
+                              alignment=_CENTER_WRAP),
+    "kpi-value-small":   dict(font=_KPI_VALUE_SM, fill=_KPI_FILL, border=_KPI_MIDDLE,
+                              alignment=_CENTER_WRAP),
+    "kpi-sub":           dict(font=_KPI_SUB_FONT, fill=_KPI_FILL, border=_KPI_BOTTOM,
+                              alignment=_CENTER_WRAP),
+}
+_KPI_CARD_ROWS = ("kpi-card-top", "kpi-card-middle", "kpi-card-bottom")
+
+
+def _register_styles(wb):
+    """Add the Analytics named styles to ``wb`` (once; later calls do nothing).
+    Fields a style leaves out get the workbook defaults, as plain cells do."""
+    existing = set(wb.named_styles)
+    for name, attrs in _STYLES.items():
+        if name not in existing:
+            wb.add_named_style(NamedStyle(
+                name=name, **{"font": DEFAULT_FONT, "border": DEFAULT_BORDER, **attrs}))
 
 _MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun",
            "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
@@ -287,55 +611,6 @@ def _apply_col_widths(ws):
         ws.column_dimensions[get_column_letter(ci)].width = _COL_W.get(ci, 13)
 
 
-def _date_key(r):
-    """Parse Completed date from row dict, return datetime (or datetime.min if invalid)."""
-    try:
-        return datetime.strptime(r.get("Completed", ""), "%d/%m/%Y")
-    except (ValueError, TypeError):
-        return datetime.min
-
-
-def _group_by_candidate_exam(rows, include_name=False):
-    """Group rows by (Enrolment no., Test Name) or (Enrolment no., First name, Last name, Test Name).
-    Returns dict mapping key tuple to list of row dicts."""
-    pairs = defaultdict(list)
-    for rd in rows:
-        enrol = rd.get("Enrolment no.", "").strip()
-        test = rd.get("Test Name", "").strip()
-        if not enrol or not test:
-            continue
-        if include_name:
-            fname = rd.get("First name", "").strip()
-            lname = rd.get("Last name", "").strip()
-            pairs[(enrol, fname, lname, test)].append(rd)
-        else:
-            pairs[(enrol, test)].append(rd)
-    return pairs
-
-
-def _compute_monthly(rows):
-    """Compute monthly distribution from rows. Returns dict {month_int: {"count": int}}."""
-    monthly = {}
-    for rd in rows:
-        try:
-            mi = datetime.strptime(rd.get("Completed", ""), "%d/%m/%Y").month
-            if mi not in monthly:
-                monthly[mi] = {"count": 0}
-            monthly[mi]["count"] += 1
-        except (ValueError, TypeError):
-            pass
-    return monthly
-
-
-def _compute_centres(rows):
-    """Group rows by centre name. Returns defaultdict {centre_name: [rows]}."""
-    centres = defaultdict(list)
-    for rd in rows:
-        cn = rd.get("Centre Name", "").strip() or "Unknown Centre"
-        centres[cn].append(rd)
-    return centres
-
-
 def _exam_short(name):
     """Strip numeric prefix from exam name."""
     return re.sub(r'^\d{4}-\d{3}\s*', '', name)
@@ -363,7 +638,7 @@ def _section(ws, row, title, start_col=1, end_col=_NUM_COLS):
     """Write a section title row, merged across given columns."""
     ws.merge_cells(start_row=row, start_column=start_col,
                    end_row=row, end_column=end_col)
-    ws.cell(row=row, column=start_col, value=title).font = _SECTION_FONT
+    ws.cell(row=row, column=start_col, value=title).style = "section-title"
     ws.row_dimensions[row].height = 22
     return row + 1
 
@@ -374,38 +649,23 @@ def _wide_tbl_header(ws, row, headers, layout):
         if ec > sc:
             ws.merge_cells(start_row=row, start_column=sc,
                            end_row=row, end_column=ec)
-        c = ws.cell(row=row, column=sc, value=text)
-        c.font = _HDR_FONT
-        c.fill = _HDR_FILL
-        c.border = _THIN_BORDER
-        c.alignment = Alignment(horizontal='center', vertical='center',
-                                wrap_text=True)
+        ws.cell(row=row, column=sc, value=text).style = "table-header"
         for ci in range(sc + 1, ec + 1):
-            cell = ws.cell(row=row, column=ci)
-            cell.fill = _HDR_FILL
-            cell.border = _THIN_BORDER
+            ws.cell(row=row, column=ci).style = "table-header-cell"
     ws.row_dimensions[row].height = 22
 
 
 def _wide_tbl_row(ws, row, values, layout, stripe=False):
     """Write data row with merged cells spanning A-L."""
+    base = "table-row-striped" if stripe else "table-row"
     for idx, ((sc, ec), val) in enumerate(zip(layout, values)):
         if ec > sc:
             ws.merge_cells(start_row=row, start_column=sc,
                            end_row=row, end_column=ec)
-        c = ws.cell(row=row, column=sc, value=val)
-        c.font = _DATA_FONT
-        c.border = _THIN_BORDER
-        c.alignment = Alignment(
-            horizontal='left' if idx == 0 else 'center',
-            vertical='center', wrap_text=True)
-        if stripe:
-            c.fill = _STRIPE_FILL
+        ws.cell(row=row, column=sc, value=val).style = (
+            base + "-first" if idx == 0 else base)
         for ci in range(sc + 1, ec + 1):
-            cell = ws.cell(row=row, column=ci)
-            cell.border = _THIN_BORDER
-            if stripe:
-                cell.fill = _STRIPE_FILL
+            ws.cell(row=row, column=ci).style = base + "-cell"
     ws.row_dimensions[row].height = 20
 
 
@@ -505,40 +765,8 @@ def _exam_breakdown_chart(dws, exam_d_start, exam_d_end, width=15, height=7.5):
 # ── Compute helpers ───────────────────────────────────────────────────────
 
 
-def _compute_extra_time(rows):
-    """Return list of dicts for candidates whose duration exceeds mode."""
-    by_test = defaultdict(list)
-    for rd in rows:
-        dur_str = rd.get("Duration", "").strip()
-        test = rd.get("Test Name", "").strip()
-        if dur_str and test:
-            try:
-                dur_val = float(dur_str)
-                by_test[test].append((rd, dur_val))
-            except (ValueError, TypeError):
-                pass
-
-    result = []
-    for test, entries in by_test.items():
-        durations = [d for _, d in entries]
-        mode_dur = Counter(durations).most_common(1)[0][0] if durations else 0
-        if not mode_dur:
-            continue
-        for rd, dur in entries:
-            if dur > mode_dur * 1.1:
-                name = (f"{rd.get('First name', '')} "
-                        f"{rd.get('Last name', '')}").strip()
-                enrol = rd.get("Enrolment no.", "").strip()
-                result.append({
-                    "name": name, "enrolment": enrol, "exam": test,
-                    "extra_pct": f"+{round((dur / mode_dur - 1) * 100)}%",
-                })
-    return result
-
-
-def _compute_insights(rows, by_exam, monthly, rebook_opps):
-    """Generate auto-insight bullet strings."""
-    total = len(rows)
+def _compute_insights(total, by_exam, monthly, rebook_opps):
+    """Generate auto-insight bullet strings (``total``: the year's exam count)."""
     insights = []
     if by_exam:
         top = by_exam[0]
@@ -570,22 +798,16 @@ def _build_header(ws, title, subtitle, year):
     r = 1
     # Title in A-D
     ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=4)
-    c = ws.cell(row=r, column=1, value=title)
-    c.font = _TITLE_FONT
-    c.fill = _TITLE_FILL
-    c.alignment = Alignment(vertical='center')
+    ws.cell(row=r, column=1, value=title).style = "header-title"
     for ci in range(2, 5):
-        ws.cell(row=r, column=ci).fill = _TITLE_FILL
+        ws.cell(row=r, column=ci).style = "header-fill"
     # Meta in E-L (smaller font)
     ws.merge_cells(start_row=r, start_column=5, end_row=r, end_column=_NUM_COLS)
     meta = (f"{subtitle}    Year: {year}    "
             f"Generated: {datetime.now().strftime('%d/%m/%Y')}")
-    m = ws.cell(row=r, column=5, value=meta)
-    m.font = _TITLE_META_FONT
-    m.fill = _TITLE_FILL
-    m.alignment = Alignment(vertical='center')
+    ws.cell(row=r, column=5, value=meta).style = "header-meta"
     for ci in range(6, _NUM_COLS + 1):
-        ws.cell(row=r, column=ci).fill = _TITLE_FILL
+        ws.cell(row=r, column=ci).style = "header-fill"
     ws.row_dimensions[r].height = 30
     return r + 2  # row 2 = spacer
 
@@ -605,45 +827,25 @@ def _build_kpis(ws, row, kpis, layout=None):
         sub = kpi[2] if len(kpi) > 2 else None
         # Use smaller font for text values that need more space
         is_text = isinstance(val, str) and len(val) > 6
-        val_font = _KPI_VALUE_SM if is_text else _KPI_VALUE_FONT
 
         # Merge cells for 3 rows
         for r_off in range(3):
             ws.merge_cells(start_row=row + r_off, start_column=sc,
                            end_row=row + r_off, end_column=ec)
 
-        # Apply card styling: grey fill + red top/bottom accent
-        for r_off in range(3):
-            for c_off in range(span):
-                cell = ws.cell(row=row + r_off, column=sc + c_off)
-                cell.fill = _KPI_FILL
-                top_s = Side('medium', color=_RED) if r_off == 0 else Side('thin', color=_GREY_400)
-                bot_s = Side('medium', color=_RED) if r_off == 2 else Side('thin', color=_GREY_400)
-                cell.border = Border(
-                    top=top_s, bottom=bot_s,
-                    left=Side('thin', color=_GREY_400),
-                    right=Side('thin', color=_GREY_400))
-
-        # Label row
-        lc = ws.cell(row=row, column=sc, value=label)
-        lc.font = _KPI_LABEL_FONT
-        lc.fill = _KPI_FILL
-        lc.alignment = Alignment(horizontal='center', vertical='center')
-
-        # Value row
-        vc = ws.cell(row=row + 1, column=sc, value=val)
-        vc.font = val_font
-        vc.fill = _KPI_FILL
-        vc.alignment = Alignment(horizontal='center', vertical='center',
-                                      wrap_text=True)
-
-        # Subtitle row
+        # Card styling: grey fill + red top/bottom accent
+        for r_off, card_style in enumerate(_KPI_CARD_ROWS):
+            for c_off in range(1, span):
+                ws.cell(row=row + r_off, column=sc + c_off).style = card_style
+
+        # Label, value and subtitle rows
+        ws.cell(row=row, column=sc, value=label).style = "kpi-label"
+        ws.cell(row=row + 1, column=sc, value=val).style = (
+            "kpi-value-small" if is_text else "kpi-value")
         if sub:
-            sc2 = ws.cell(row=row + 2, column=sc, value=sub)
-            sc2.font = _KPI_SUB_FONT
-            sc2.fill = _KPI_FILL
-            sc2.alignment = Alignment(horizontal='center', vertical='center',
-                                          wrap_text=True)
+            ws.cell(row=row + 2, column=sc, value=sub).style = "kpi-sub"
+        else:
+            ws.cell(row=row + 2, column=sc).style = "kpi-card-bottom"
 
     ws.row_dimensions[row].height = 18
     ws.row_dimensions[row + 1].height = 38
@@ -654,31 +856,56 @@ def _build_kpis(ws, row, kpis, layout=None):
 def _build_footer(ws, row, text):
     """Write a grey footer line."""
     ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=_NUM_COLS)
-    c = ws.cell(row=row, column=1, value=text)
-    c.font = _FOOTER_FONT
-    c.alignment = Alignment(horizontal='left')
+    ws.cell(row=row, column=1, value=text).style = "footer-text"
     ws.row_dimensions[row].height = 14
     return row + 1
 
 
-# ── Public entry-point ────────────────────────────────────────────────────
-def add_analytics_sheet(filepath, rows=None, all_rows=None):
-    """Add/replace the Analytics sheet on an existing Excel file.
-    If all_rows is provided, rebook opportunities cross-reference all years."""
-    if rows is None:
-        rows = load_existing_results(filepath)
-    if not rows:
-        return
-    wb = load_workbook(filepath)
+# ── Year workbook dashboards ──────────────────────────────────────────────
+def _write_year_file(excel_file, rows, all_rows=None, stats=None, attempts=None):
+    """Write a year workbook's Results, Analytics and _ChartData sheets from
+    ``rows`` (the year's full Results rows, in Completed order) in one save."""
+    wb = _build_results_workbook(rows)
     try:
-        if wb.active and wb.active.title not in ("Results", "Analytics"):
-            wb.active.title = "Results"
-        _add_analytics_to_wb(wb, rows, all_rows=all_rows)
-        _atomic_wb_save(wb, filepath)
+        _add_analytics_to_wb(wb, rows, all_rows=all_rows, stats=stats,
+                             attempts=attempts)
+        _atomic_wb_save(wb, excel_file)
     finally:
         wb.close()
 
 
+def _refresh_year_file(excel_file, rows, all_rows=None, stats=None, attempts=None):
+    """Replace the Analytics and _ChartData sheets of ``excel_file`` without
+    rewriting its Results sheet.
+
+    The dashboard is built in an otherwise empty workbook and its parts are
+    swapped into the existing ``.xlsx`` by ``xlsx_patch.replace_sheets``, so
+    the cost does not depend on the row count and admin edits to Results
+    are kept as they are. Falls back to a full ``_write_year_file`` save if
+    the file has a layout the patcher does not handle. Takes a path rather
+    than a year so it can run in a worker process. ``rows`` may be None when
+    ``stats`` is a ``YearSummary`` and ``attempts`` is given; they are then
+    only read for a full rewrite. The caller restamps the year's sidecars."""
+    wb = Workbook()
+    wb.active.title = "Results"
+    buf = io.BytesIO()
+    try:
+        _add_analytics_to_wb(wb, rows, all_rows=all_rows, stats=stats,
+                             attempts=attempts)
+        wb.save(buf)
+    finally:
+        wb.close()
+    try:
+        replace_sheets(excel_file, buf)
+    except Exception as e:
+        logging.debug(f"Rewriting {os.path.basename(excel_file)} in full, "
+                      f"Analytics swap failed: {e}")
+        if rows is None:
+            rows = load_existing_results(excel_file)
+        _write_year_file(excel_file, rows, all_rows=all_rows, stats=stats,
+                         attempts=attempts)
+
+
 def _build_rebook_section(ws, r, rebook_opps, highlight_days=False):
     """Build REBOOK OPPORTUNITIES summary + CANDIDATES TO REBOOK detail tables.
 
@@ -722,17 +949,15 @@ def _build_rebook_section(ws, r, rebook_opps, highlight_days=False):
                                    rb["last_fail"], rb["days_ago"]],
                           _REBOOK_LAYOUT, stripe=(idx % 2 == 1))
             if highlight_days:
-                for ci in [11, 12]:
-                    cell = ws.cell(row=r, column=ci)
-                    cell.fill = PatternFill('solid', fgColor=_RED_BG)
-                    cell.font = Font(bold=True, size=9, color=_RED_FG)
+                ws.cell(row=r, column=11).style = "highlight-days"
+                ws.cell(row=r, column=12).style = "highlight-days-cell"
             r += 1
     else:
         ws.merge_cells(start_row=r, start_column=1,
                        end_row=r, end_column=_NUM_COLS)
         ws.cell(row=r, column=1,
                 value="  No rebook opportunities - all fails have "
-                      "rebooked or passed on resit").font = _INSIGHT_FONT
+                      "rebooked or passed on resit").style = "insight-text"
         r += 1
     r += 1
     return r
@@ -740,23 +965,26 @@ def _build_rebook_section(ws, r, rebook_opps, highlight_days=False):
 
 # ── Shared year-level dashboard builder ───────────────────────────────────
 def _build_year_dashboard(wb, ws, rows, all_rows, year,
-                          chart_sheet_name, header_title, footer_text):
+                          chart_sheet_name, header_title, footer_text,
+                          stats=None, attempts=None):
     """Build a full year analytics dashboard on the given worksheet.
-    Used by both per-year Excel analytics and combined workbook year tabs."""
-    centres = _compute_centres(rows)
-    total = len(rows)
-    by_exam = _compute_by_exam(rows)
-    extra_time = _compute_extra_time(rows)
-    monthly = _compute_monthly(rows)
+    Used by both per-year Excel analytics and combined workbook year tabs.
+    ``stats`` is the year's RowStats and ``attempts`` the run's AttemptIndex
+    when the caller already has them; ``rows`` is not read when both are."""
+    stats = stats or RowStats(rows)
+    centres = stats.centres
+    total = stats.total
+    by_exam = stats.by_exam()
+    extra_time = stats.extra_time()
+    monthly = stats.monthly_counts()
 
-    rebook_source = all_rows if all_rows else rows
-    rebook_opps = _compute_rebook_opportunities(rebook_source, year_filter=year)
+    attempts = attempts or AttemptIndex(all_rows if all_rows else rows)
+    rebook_opps = attempts.rebook_opportunities(year_filter=year)
 
-    customers = len({rd.get("Enrolment no.", "").strip() for rd in rows
-                     if rd.get("Enrolment no.", "").strip()})
+    customers = stats.customers
 
     # Resit conversion (cross-year aware)
-    resits_returned, unique_fails = _compute_resit_conversion(rebook_source, year)
+    resits_returned, unique_fails = attempts.resit_conversion(year)
     resit_conv = (f"{round(resits_returned / unique_fails * 100)}%"
                   if unique_fails else "N/A")
     resit_sub = (f"{resits_returned} of {unique_fails} returned"
@@ -777,6 +1005,8 @@ def _build_year_dashboard(wb, ws, rows, all_rows, year,
     busiest_pct = round(busiest_cnt / total * 100) if total else 0
     busiest_sub = f"{busiest_cnt} sittings ({busiest_pct}%)" if busiest_cnt else ""
 
+    _register_styles(wb)
+
     # ── Hidden chart-data sheet ───────────────────────────────────────
     dws = wb.create_sheet(chart_sheet_name)
     dws.sheet_state = 'hidden'
@@ -813,9 +1043,9 @@ def _build_year_dashboard(wb, ws, rows, all_rows, year,
 
     # ── Side-by-side charts ───────────────────────────────────────────
     ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-    ws.cell(row=r, column=1, value="MONTHLY VOLUME").font = _SECTION_FONT
+    ws.cell(row=r, column=1, value="MONTHLY VOLUME").style = "section-title"
     ws.merge_cells(start_row=r, start_column=7, end_row=r, end_column=12)
-    ws.cell(row=r, column=7, value="EXAM BREAKDOWN").font = _SECTION_FONT
+    ws.cell(row=r, column=7, value="EXAM BREAKDOWN").style = "section-title"
     ws.row_dimensions[r].height = 22
     r += 1
 
@@ -839,15 +1069,13 @@ def _build_year_dashboard(wb, ws, rows, all_rows, year,
     r += 1  # spacer
 
     # ── Key Insights ──────────────────────────────────────────────────
-    insights = _compute_insights(rows, by_exam, monthly, rebook_opps)
+    insights = _compute_insights(total, by_exam, monthly, rebook_opps)
     if insights:
         r = _section(ws, r, "KEY INSIGHTS")
         for ins in insights:
             ws.merge_cells(start_row=r, start_column=1,
                            end_row=r, end_column=_NUM_COLS)
-            c = ws.cell(row=r, column=1, value=f"  {ins}")
-            c.font = _INSIGHT_FONT
-            c.alignment = Alignment(vertical='center', wrap_text=True)
+            ws.cell(row=r, column=1, value=f"  {ins}").style = "insight-wrap"
             ws.row_dimensions[r].height = 20
             r += 1
         r += 1
@@ -871,7 +1099,7 @@ def _build_year_dashboard(wb, ws, rows, all_rows, year,
         ws.merge_cells(start_row=r, start_column=1,
                        end_row=r, end_column=_NUM_COLS)
         ws.cell(row=r, column=1,
-                value="  No extra time candidates detected").font = _INSIGHT_FONT
+                value="  No extra time candidates detected").style = "insight-text"
         r += 1
     r += 1
 
@@ -881,9 +1109,11 @@ def _build_year_dashboard(wb, ws, rows, all_rows, year,
 
 
 # ── Per-year Excel orchestrator ───────────────────────────────────────────
-def _add_analytics_to_wb(wb, rows, all_rows=None):
-    """Build the Analytics tab in a per-year Excel file."""
-    if not rows:
+def _add_analytics_to_wb(wb, rows, all_rows=None, stats=None, attempts=None):
+    """Build the Analytics tab in a per-year Excel file. ``rows`` may be None
+    when ``stats`` is a ``YearSummary`` and ``attempts`` is given."""
+    stats = stats or RowStats(rows)
+    if not stats.total:
         return
 
     # Remove all non-Results tabs
@@ -893,56 +1123,29 @@ def _add_analytics_to_wb(wb, rows, all_rows=None):
 
     # Detect year
     year = datetime.now().year
-    for rd in rows:
-        try:
-            year = datetime.strptime(rd.get("Completed", ""), "%d/%m/%Y").year
-            break
-        except (ValueError, TypeError):
-            pass
+    if rows is None:
+        year = stats.year or year
+    else:
+        for rd in rows:
+            dt = completed_date(rd)
+            if dt is not None:
+                year = dt.year
+                break
 
     ws = wb.create_sheet("Analytics", 1)
     ws.sheet_properties.tabColor = _RED
     ws.sheet_view.showGridLines = False
 
-    centres = _compute_centres(rows)
+    centres = stats.centres
     centre_names = ", ".join(_short_centre_name(cn)
                              for cn in sorted(centres.keys()))
-    footer = (f"Data: Results tab - {len(rows)} records - "
+    footer = (f"Data: Results tab - {stats.total} records - "
               f"{len(centres)} centre(s): {centre_names} - "
               f"Internal use - City & Guilds")
 
     _build_year_dashboard(wb, ws, rows, all_rows, year,
                           "_ChartData", "EVOLVE SECURE-ASSESS ANALYTICS",
-                          footer)
-
-
-def _compute_by_exam(rows):
-    """Group rows by Test Name. Returns list of dicts sorted by count desc.
-    Each: {name, count, passed, failed, rate, avg_score}."""
-    groups = defaultdict(list)
-    for r in rows:
-        name = r.get("Test Name", "").strip()
-        if name:
-            groups[name].append(r)
-    result = []
-    for name, group in groups.items():
-        count = len(group)
-        passed = sum(1 for r in group if r.get("Result", "").strip().lower() == "pass")
-        scores = []
-        for r in group:
-            try:
-                scores.append(float(r.get("Percent", "0").replace("%", "")))
-            except (ValueError, TypeError):
-                pass
-        avg_score = round(sum(scores) / len(scores), 1) if scores else 0.0
-        result.append({
-            "name": name, "count": count, "passed": passed,
-            "failed": count - passed,
-            "rate": round(passed / count * 100, 1) if count else 0.0,
-            "avg_score": avg_score,
-        })
-    result.sort(key=lambda x: x["count"], reverse=True)
-    return result
+                          footer, stats=stats, attempts=attempts)
 
 
 # =========================================================================
@@ -950,119 +1153,50 @@ def _compute_by_exam(rows):
 # =========================================================================
 
 
-def _compute_resit_conversion(all_rows, year):
-    """Count how many unique candidate+exam combos that failed in `year`
-    went on to have at least one later attempt (in any year).
-    Returns (returned, total_unique_fails) so caller can compute the rate."""
-    pairs = _group_by_candidate_exam(all_rows, include_name=False)
-
-    returned = 0
-    total_unique_fails = 0
-    for (enrol, test), attempts in pairs.items():
-        attempts.sort(key=_date_key)
-        # Find fails in the target year
-        fails_in_year = [a for a in attempts
-                         if _date_key(a).year == year
-                         and a.get("Result", "").strip().lower() == "fail"]
-        if not fails_in_year:
-            continue
-        total_unique_fails += 1
-        # Check if there's any attempt AFTER the last fail in that year
-        last_fail_dt = _date_key(fails_in_year[-1])
-        has_later = any(_date_key(a) > last_fail_dt for a in attempts)
-        if has_later:
-            returned += 1
-    return returned, total_unique_fails
-
-
-def _compute_rebook_opportunities(all_rows, year_filter=None):
-    """Find candidates whose latest attempt for any exam is a fail - potential revenue.
-    Includes both single-attempt fails and multi-attempt fails (never passed).
-    If year_filter is set, only include candidates who had a fail in that year
-    and whose latest overall attempt is still a fail (i.e. they haven't rebooked
-    or passed in a later year).
-    Sorted by days since fail (most overdue at top)."""
-    pairs = _group_by_candidate_exam(all_rows, include_name=True)
-
-    rebooks = []
-    for (enrol, fname, lname, test), attempts in pairs.items():
-        attempts.sort(key=_date_key)
-        latest = attempts[-1]
-        latest_result = latest.get("Result", "").strip().lower()
-        if latest_result != "fail":
-            continue
-        # If year_filter is set, only include if the latest fail is in that year
-        if year_filter is not None:
-            if _date_key(latest).year != year_filter:
-                continue
-        fail_date = latest.get("Completed", "")
-        try:
-            days_ago = (datetime.now() - datetime.strptime(fail_date, "%d/%m/%Y")).days
-        except (ValueError, TypeError):
-            days_ago = 0
-        rebooks.append({
-            "name": f"{fname} {lname}".strip(),
-            "enrolment": enrol,
-            "exam": test,
-            "attempts": len(attempts),
-            "last_fail": fail_date,
-            "days_ago": days_ago,
-        })
-    rebooks.sort(key=lambda x: x["days_ago"], reverse=True)
-    return rebooks
-
-
-def _build_analytics_year_tab(wb, year_str, rows, all_rows=None):
-    """Build a single year analytics tab in the combined workbook."""
+def _build_analytics_year_tab(wb, year_str, rows, all_rows=None, stats=None,
+                              attempts=None):
+    """Build a single year analytics tab in the combined workbook.
+    ``rows`` may be None when ``stats`` and ``attempts`` are given."""
     ws = wb.create_sheet(year_str)
     ws.sheet_properties.tabColor = _RED
     ws.sheet_view.showGridLines = False
 
     year = int(year_str)
-    centres = _compute_centres(rows)
+    stats = stats or RowStats(rows)
+    centres = stats.centres
     centre_names = ", ".join(_short_centre_name(cn)
                              for cn in sorted(centres.keys()))
-    footer = (f"Data: {len(rows)} records - "
+    footer = (f"Data: {stats.total} records - "
               f"{len(centres)} centre(s): {centre_names}")
 
     _build_year_dashboard(wb, ws, rows, all_rows, year,
                           f"_{year_str}_ChartData",
-                          f"ANALYTICS - {year_str}", footer)
+                          f"ANALYTICS - {year_str}", footer, stats=stats,
+                          attempts=attempts)
 
 
-def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
-    """Build the Overview tab with cross-year aggregated analytics."""
+def _build_analytics_overview_tab(wb, stats, year_stats, attempts):
+    """Build the Overview tab with cross-year aggregated analytics.
+    ``stats`` is the RowStats over every year, ``year_stats`` maps each year
+    to its own (for the YoY table) and ``attempts`` is the AttemptIndex over
+    all years."""
     ws = wb.active
     ws.title = "Overview"
     ws.sheet_properties.tabColor = _RED
     ws.sheet_view.showGridLines = False
+    _register_styles(wb)
 
-    years_sorted = sorted(rows_by_year.keys(), reverse=True)
-    total = len(all_rows)
-    by_exam = _compute_by_exam(all_rows)
-    rebook_opps = _compute_rebook_opportunities(all_rows)
+    years_sorted = sorted(year_stats.keys(), reverse=True)
+    total = stats.total
+    by_exam = stats.by_exam()
+    rebook_opps = attempts.rebook_opportunities()
 
-    customers = len({rd.get("Enrolment no.", "").strip() for rd in all_rows
-                     if rd.get("Enrolment no.", "").strip()})
-    
-    total_fails = sum(1 for rd in all_rows
-                      if rd.get("Result", "").strip().lower() == "fail")
+    customers = stats.customers
+    total_fails = stats.failed
 
     # Resit conversion: across all years, how many unique candidate+exam
     # combos that failed went on to have at least one later attempt?
-    pairs = _group_by_candidate_exam(all_rows, include_name=False)
-    total_unique_fails = 0
-    resits_returned = 0
-    for (enrol, test), attempts in pairs.items():
-        attempts.sort(key=_date_key)
-        fails = [a for a in attempts
-                 if a.get("Result", "").strip().lower() == "fail"]
-        if not fails:
-            continue
-        total_unique_fails += 1
-        last_fail_dt = _date_key(fails[-1])
-        if any(_date_key(a) > last_fail_dt for a in attempts):
-            resits_returned += 1
+    resits_returned, total_unique_fails = attempts.resit_conversion()
 
     resit_conv = (f"{round(resits_returned / total_unique_fails * 100)}%"
                   if total_unique_fails else "N/A")
@@ -1074,7 +1208,7 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
     top_exam_sub = f"{by_exam[0]['count']} sittings ({top_exam_pct}%)" if by_exam else ""
 
     # Monthly data (all years combined)
-    monthly = _compute_monthly(all_rows)
+    monthly = stats.monthly_counts()
 
     busiest_mi = max(range(1, 13),
                      key=lambda m: monthly.get(m, {"count": 0})["count"],
@@ -1083,7 +1217,7 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
     busiest_pct = round(busiest_cnt / total * 100) if total else 0
     busiest_sub = f"{busiest_cnt} sittings ({busiest_pct}%)" if busiest_cnt else ""
 
-    centres = _compute_centres(all_rows)
+    centres = stats.centres
 
     # Header
     year_range = (f"{min(years_sorted)}-{max(years_sorted)}"
@@ -1114,9 +1248,8 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
     dws.cell(1, 1, "Year")
     dws.cell(1, 2, "Exams")
     for i, yr in enumerate(sorted(years_sorted)):
-        yr_rows = rows_by_year[yr]
         dws.cell(2 + i, 1, str(yr))
-        dws.cell(2 + i, 2, len(yr_rows))
+        dws.cell(2 + i, 2, year_stats[yr].total)
     yoy_end = 1 + len(years_sorted)
 
     # Monthly data (col 4-5)
@@ -1138,15 +1271,15 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
 
     # ── Row 1 charts: YoY volume (left) + Monthly volume (right) ──
     ws.merge_cells(start_row=r, start_column=1, end_row=r, end_column=6)
-    ws.cell(row=r, column=1, value="YEAR-OVER-YEAR VOLUME").font = _SECTION_FONT
+    ws.cell(row=r, column=1, value="YEAR-OVER-YEAR VOLUME").style = "section-title"
     ws.merge_cells(start_row=r, start_column=7, end_row=r, end_column=12)
-    ws.cell(row=r, column=7, value="MONTHLY VOLUME (ALL YEARS)").font = _SECTION_FONT
+    ws.cell(row=r, column=7, value="MONTHLY VOLUME (ALL YEARS)").style = "section-title"
     ws.row_dimensions[r].height = 22
     r += 1
 
     chart_anchor_row = r
     if len(years_sorted) > 0:
-        yoy_max = max(len(rows_by_year[y]) for y in years_sorted)
+        yoy_max = max(year_stats[y].total for y in years_sorted)
         ch_yoy = _bar_chart(
             Reference(dws, min_col=2, min_row=1, max_row=yoy_end),
             Reference(dws, min_col=1, min_row=2, max_row=yoy_end),
@@ -1186,21 +1319,11 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
                      yoy_layout)
     r += 1
     for idx, yr in enumerate(sorted(years_sorted, reverse=True)):
-        yr_rows = rows_by_year[yr]
-        yr_total = len(yr_rows)
-        yr_cust = len({rd.get("Enrolment no.", "").strip() for rd in yr_rows
-                       if rd.get("Enrolment no.", "").strip()})
-        yr_pass = sum(1 for rd in yr_rows
-                      if rd.get("Result", "").strip().lower() == "pass")
-        yr_rate = f"{round(yr_pass / yr_total * 100)}%" if yr_total else "N/A"
-        yr_scores = []
-        for rd in yr_rows:
-            try:
-                yr_scores.append(float(rd.get("Percent", "0").replace("%", "")))
-            except (ValueError, TypeError):
-                pass
-        yr_avg = f"{round(sum(yr_scores) / len(yr_scores), 1)}%" if yr_scores else "N/A"
-        _wide_tbl_row(ws, r, [str(yr), yr_total, yr_cust, yr_rate, yr_avg],
+        ys = year_stats[yr]
+        yr_total = ys.total
+        yr_rate = f"{round(ys.passed / yr_total * 100)}%" if yr_total else "N/A"
+        yr_avg = f"{ys.avg_score}%" if ys.avg_score is not None else "N/A"
+        _wide_tbl_row(ws, r, [str(yr), yr_total, ys.customers, yr_rate, yr_avg],
                       yoy_layout, stripe=(idx % 2 == 1))
         r += 1
     r += 1
@@ -1231,49 +1354,122 @@ def _build_analytics_overview_tab(wb, all_rows, rows_by_year):
     _apply_col_widths(ws)
 
 
-def generate_analytics_workbook(all_rows=None, rows_by_year=None):
+# ── Parallel dashboard builds ─────────────────────────────────────────────
+# Year dashboards are independent, CPU-bound openpyxl work, so the year
+# workbooks and the combined workbook's year tabs are built in a pool of
+# "spawn" processes (what Windows uses anyway; the EXE entry point calls
+# multiprocessing.freeze_support()). Workers get a file path, the year's
+# rows and a YearAttempts slice, never module state such as BASE_DIR. The
+# combined workbook is assembled from the tab packages they return with
+# ``xlsx_patch.append_sheets``. If the pool cannot start or breaks, the
+# remaining work runs in this process.
+ANALYTICS_WORKERS = None   # None: one per CPU; 1: build everything in-process
+
+
+class _DashboardPool:
+    """Runs dashboard builds in worker processes, or in-process when there
+    is only one CPU, one job, or no working pool."""
+
+    def __init__(self, jobs):
+        self._pool = None
+        workers = min(jobs, ANALYTICS_WORKERS or os.cpu_count() or 1)
+        if workers < 2:
+            return
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        except (OSError, ValueError, NotImplementedError) as e:
+            logging.debug(f"Building dashboards in-process, no worker pool: {e}")
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue ``fn(*args, **kwargs)``; returns a task for ``result``."""
+        future = None
+        if self._pool is not None:
+            try:
+                future = self._pool.submit(fn, *args, **kwargs)
+            except RuntimeError as e:   # shut down or broken
+                logging.debug(f"Dashboard pool unavailable, building in-process: {e}")
+                self._pool = None
+        return future, fn, args, kwargs
+
+    def result(self, task):
+        """The task's return value. Runs it here if it was not queued or
+        the pool failed under it; errors from the build itself propagate."""
+        future, fn, args, kwargs = task
+        if future is not None:
+            try:
+                return future.result()
+            except (BrokenProcessPool, pickle.PicklingError) as e:
+                logging.debug(f"Dashboard worker failed, building in-process: {e}")
+        return fn(*args, **kwargs)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+
+def _year_tab_package(year, stats, attempts):
+    """A combined-workbook year tab (and its chart data) as ``.xlsx`` bytes,
+    after a placeholder first sheet that ``append_sheets`` skips."""
+    wb = Workbook()
+    buf = io.BytesIO()
+    try:
+        _build_analytics_year_tab(wb, str(year), None, stats=stats, attempts=attempts)
+        wb.save(buf)
+    finally:
+        wb.close()
+    return buf.getvalue()
+
+
+def generate_analytics_workbook(year_stats=None, attempts=None, pool=None):
     """Generate the combined analytics.xlsx with Overview + per-year tabs.
     Only generates when 2+ years of data exist.
     
     Args:
-        all_rows: Optional pre-loaded list of all rows (avoids re-reading files)
-        rows_by_year: Optional pre-loaded dict {year: [rows]} (avoids re-reading files)
+        year_stats: Optional dict {year: YearSummary}, newest year first
+            (read from the analytics summary sidecars if not given)
+        attempts: Optional AttemptIndex over all years already built by the caller
+        pool: Optional _DashboardPool to build the year tabs in
     """
-    # If data not provided, load from files
-    if all_rows is None or rows_by_year is None:
-        year_files = list_year_excel_files()
-        if len(year_files) < 2:
-            logging.info("Need 2+ years of data for combined analytics, skipping")
-            return
-
-        all_rows = []
-        rows_by_year = {}
-        for year_str, filepath in year_files:
-            rows = load_existing_results(filepath)
-            if rows:
-                yr = int(year_str)
-                rows_by_year[yr] = rows
-                all_rows.extend(rows)
+    # If data not provided, load from the summary sidecars
+    if year_stats is None:
+        summaries = _load_year_summaries()
+        year_stats = {yr: YearSummary(s) for yr, s in summaries.items()}
+        attempts = attempts or StoredAttemptIndex(summaries.values())
 
-    if not all_rows:
+    if not any(s.total for s in year_stats.values()):
         logging.info("No data found across year files, skipping analytics")
         return
     
-    if len(rows_by_year) < 2:
+    if len(year_stats) < 2:
         logging.info("Need 2+ years of data for combined analytics, skipping")
         return
 
-    logging.debug(f"Generating analytics from {len(all_rows)} rows across "
-                  f"{len(rows_by_year)} year(s)...")
+    # The Overview's totals are the sum of the years'
+    stats = merge_stats(year_stats.values())
+    logging.debug(f"Generating analytics from {stats.total} rows across "
+                  f"{len(year_stats)} year(s)...")
 
-    wb = Workbook()
+    own_pool = pool is None
+    if own_pool:
+        pool = _DashboardPool(len(year_stats))
     try:
-        # Tab 1: Overview (aggregated)
-        _build_analytics_overview_tab(wb, all_rows, rows_by_year)
+        # Tab 2+: one per year (most recent first), built by the workers
+        # while this process builds the Overview
+        now = datetime.now()
+        tabs = [pool.submit(_year_tab_package, yr, year_stats[yr],
+                            YearAttempts(attempts, yr, now))
+                for yr in sorted(year_stats.keys(), reverse=True)]
 
-        # Tab 2+: One per year (most recent first)
-        for yr in sorted(rows_by_year.keys(), reverse=True):
-            _build_analytics_year_tab(wb, str(yr), rows_by_year[yr], all_rows)
+        # Tab 1: Overview (aggregated)
+        wb = Workbook()
+        overview = io.BytesIO()
+        try:
+            _build_analytics_overview_tab(wb, stats, year_stats, attempts)
+            wb.save(overview)
+        finally:
+            wb.close()
+        packages = [io.BytesIO(pool.result(task)) for task in tabs]
 
         # Back up the previous analytics.xlsx before overwriting so a crash
         # mid-save leaves a restorable copy. Matches the `.bak` pattern used
@@ -1283,31 +1479,172 @@ def generate_analytics_workbook(all_rows=None, rows_by_year=None):
                 shutil.copy2(ANALYTICS_FILE, ANALYTICS_FILE + ".bak")
             except OSError as e:
                 logging.debug(f"Could not create analytics backup: {e}")
-        _atomic_wb_save(wb, ANALYTICS_FILE)
+        append_sheets(overview, packages, ANALYTICS_FILE)
         logging.debug(f"Analytics saved to {os.path.basename(ANALYTICS_FILE)}")
     finally:
-        wb.close()
+        if own_pool:
+            pool.close()
+
+
+def _candidate_exam_key(row):
+    return (row.get("Enrolment no.", "").strip(), row.get("Test Name", "").strip())
+
+
+def _has_analytics_sheet(year):
+    """True if the year workbook already has an Analytics tab (reads the sheet list only)."""
+    try:
+        return "Analytics" in sheet_names(get_excel_file_for_year(year))
+    except (OSError, KeyError, ValueError) as e:
+        logging.debug(f"Could not list sheets of {year} workbook: {e}")
+        return False
 
 
-def regenerate_analytics():
+def analytics_years_to_rebuild(summaries, touched_years, changed_rows=()):
+    """Years whose per-year dashboard is out of date after a run.
+
+    That is every year in ``touched_years`` (workbooks the run saved),
+    every year holding an attempt at the same candidate + exam as one of
+    ``changed_rows`` (its rebook list and resit conversion read attempts
+    from all years), and any year whose workbook has no Analytics tab yet. ``summaries`` maps each year to its stored
+    analytics summary.
+    """
+    years = {yr for yr in touched_years if yr in summaries}
+    keys = {k for k in map(_candidate_exam_key, changed_rows) if all(k)}
+    for yr, summary in summaries.items():
+        if yr in years:
+            continue
+        if keys and any((enrol, test) in keys for enrol, test, *_ in summary["pairs"]):
+            years.add(yr)
+        elif not _has_analytics_sheet(yr):
+            years.add(yr)
+    return years
+
+
+# ── Analytics fingerprint cache ───────────────────────────────────────────
+# ``analytics_cache.json`` keeps, per year, a hash of the fields the year
+# dashboard reads plus the cross-year resit/rebook figures for that year and
+# today's date (the dashboards show "Generated" dates and days since a
+# fail). A year whose hash is unchanged and whose workbook still has its
+# Analytics tab is not rebuilt; PDF save times alone never change it.
+_ANALYTICS_CACHE_VERSION = 2
+
+
+def _load_analytics_cache():
+    try:
+        with open(ANALYTICS_CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        if cache.get("version") == _ANALYTICS_CACHE_VERSION:
+            return cache
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        logging.debug(f"Ignoring unreadable analytics cache: {e}")
+    return {"version": _ANALYTICS_CACHE_VERSION, "years": {}, "combined": None}
+
+
+def _save_analytics_cache(cache):
+    try:
+        atomic_json_write(ANALYTICS_CACHE_FILE, cache)
+    except (OSError, TypeError, ValueError) as e:
+        logging.debug(f"Could not save analytics cache: {e}")
+
+
+def _year_fingerprint(year, stats, attempts, today):
+    """Hash of everything the year dashboard shows, from its YearSummary."""
+    rebooks = [tuple(r.values()) for r in attempts.rebook_opportunities(year_filter=year)]
+    return fingerprint((), year, today, stats.year, stats.total, stats.customers,
+                       list(stats.centres.items()), sorted(stats.monthly.items()),
+                       stats.by_exam(), stats.extra_time(),
+                       tuple(attempts.resit_conversion(year)), rebooks)
+
+
+def regenerate_analytics(touched_years=None, changed_rows=()):
     """Regenerate per-year and combined analytics from all year Excel files.
-    Returns True if analytics were generated, False if no data to process."""
-    all_rows = []
-    by_year = {}
-    for year_str, filepath in list_year_excel_files():
-        yr = int(year_str)
-        yr_rows = load_existing_results(filepath)
-        by_year[yr] = yr_rows
-        all_rows.extend(yr_rows)
-    if not all_rows:
+
+    Every dashboard is built from the years' stored analytics summaries
+    (see "Analytics summary sidecar"), so a run's cost follows the number of
+    dashboards rebuilt, not the rows behind them; only a workbook changed
+    outside the app is re-read. With ``touched_years`` (years the run saved)
+    only those dashboards and the years that depend on ``changed_rows`` (the
+    run's new results) are considered; see ``analytics_years_to_rebuild``.
+    Without it every year is. A year (or the combined ``analytics.xlsx``)
+    whose analytics fingerprint matches the cache is skipped, and the skip
+    is logged. A rebuilt year only has its dashboard sheets swapped in (see
+    ``_refresh_year_file``). Year dashboards are built in parallel
+    worker processes.
+    Returns True if analytics were generated, False if no data to process.
+    A dashboard that fails (for example a workbook open in Excel) does not
+    stop the others; once they are built and the cache is saved, a
+    RuntimeError names every year (or ``analytics.xlsx``) that failed."""
+    summaries = _load_year_summaries()
+    year_stats = {yr: YearSummary(s) for yr, s in summaries.items()}
+    if not any(s.total for s in year_stats.values()):
         return False
-    for year in by_year:
-        try:
-            add_analytics_sheet(get_excel_file_for_year(year), all_rows=all_rows)
-        except Exception as e:
-            logging.error(f"Failed to generate analytics for {year}: {e}")
+    attempts = StoredAttemptIndex(summaries.values())
+    if touched_years is None:
+        rebuild = set(summaries)
+    else:
+        rebuild = analytics_years_to_rebuild(summaries, touched_years, changed_rows)
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    cache = _load_analytics_cache()
+    fps = {yr: _year_fingerprint(yr, s, attempts, today) for yr, s in year_stats.items()}
+    cached = cache.get("years", {})
+    cache["years"] = {str(yr): cached[str(yr)] for yr in summaries if str(yr) in cached}
+
+    to_build = []
+    for year in sorted(rebuild):
+        if cache["years"].get(str(year)) == fps[year] and _has_analytics_sheet(year):
+            logging.info(f"Analytics for {year} unchanged, skipping rebuild")
+        elif year_stats[year].total:
+            to_build.append(year)
+    combined_fp = fingerprint((), today, sorted(fps.items()))
+    build_combined = not (cache.get("combined") == combined_fp
+                          and os.path.exists(ANALYTICS_FILE))
+    if not build_combined:
+        logging.info("Combined analytics unchanged, skipping rebuild")
+
+    # Year workbooks build in the pool while this process (and the pool)
+    # works on the combined workbook; see "Parallel dashboard builds"
+    now = datetime.now()
+    pool = _DashboardPool(len(to_build) + (len(summaries) if build_combined else 0))
+    built = 0
+    failed = []
     try:
-        generate_analytics_workbook(all_rows=all_rows, rows_by_year=by_year)
-    except Exception as e:
-        logging.error(f"Failed to generate combined analytics: {e}")
+        sources = {}
+        tasks = {}
+        for year in to_build:
+            excel_file = get_excel_file_for_year(year)
+            sources[year] = _file_signature(excel_file)
+            tasks[year] = pool.submit(_refresh_year_file, excel_file, None,
+                                      stats=year_stats[year],
+                                      attempts=YearAttempts(attempts, year, now))
+        if build_combined:
+            cache["combined"] = None
+            try:
+                generate_analytics_workbook(year_stats=year_stats, attempts=attempts,
+                                            pool=pool)
+                if os.path.exists(ANALYTICS_FILE):
+                    cache["combined"] = combined_fp
+            except Exception as e:
+                failed.append(os.path.basename(ANALYTICS_FILE))
+                logging.error(f"Failed to generate combined analytics: {e}")
+        for year, task in tasks.items():
+            try:
+                pool.result(task)
+                # Same rows, new mtime: restamp the sidecars so the next
+                # startup and analytics run do not re-read the workbook
+                _restamp_sidecars(year, get_excel_file_for_year(year), sources[year])
+                cache["years"][str(year)] = fps[year]
+                built += 1
+            except Exception as e:
+                cache["years"].pop(str(year), None)
+                failed.append(str(year))
+                logging.error(f"Failed to generate analytics for {year}: {e}")
+    finally:
+        pool.close()
+    logging.debug(f"Rebuilt analytics for {built} of {len(summaries)} year(s)")
+    _save_analytics_cache(cache)
+    if failed:
+        raise RuntimeError(f"Analytics not updated for {', '.join(failed)}")
     return True
@@ -135,6 +135,9 @@ class EvolveGUI:
         self.master_password = None
         self.automation_thread = None
         self._automation    = None
+        self._analytics_job = None   # AnalyticsJob, created with the first run
+        self._analytics_pending = False
+        self._waiting_for_analytics = False
         self._stop_event    = None
         self.log_queue      = queue.Queue()
         self._read_only     = False
@@ -1758,10 +1761,22 @@ class EvolveGUI:
                 locked.append(year)
         return locked
 
-    def _run_automation(self, scheduled=False):
+    def _analytics_busy(self):
+        return self._analytics_job is not None and self._analytics_job.busy
+
+    def _run_automation(self, scheduled=False, _retry=False):
         if self.automation_thread and self.automation_thread.is_alive():
             self._set_status("Automation is already running.", DANGER)
             return
+        # The last run's dashboards may still be rebuilding; the lock check,
+        # backups and the run itself start once they are written
+        if self._analytics_busy():
+            if _retry or not self._waiting_for_analytics:
+                self._waiting_for_analytics = True
+                self._set_status("Waiting for analytics to finish...", CG_RED)
+                self.root.after(500, lambda: self._run_automation(scheduled, _retry=True))
+            return
+        self._waiting_for_analytics = False
         self._run_scheduled = scheduled
         try:
             creds = self.manager.list_credentials(
@@ -1828,11 +1843,7 @@ class EvolveGUI:
                                text_color=DANGER, border_color=DANGER,
                                border_width=1, hover_color=DANGER_BG,
                                command=self._stop_automation)
-        self._excel_btn.configure(state="disabled", fg_color=ELEVATED,
-                                   text_color=TEXT_DIM)
-        if hasattr(self, '_analytics_btn'):
-            self._analytics_btn.configure(state="disabled", fg_color=ELEVATED,
-                                          text_color=TEXT_DIM)
+        self._set_workbook_buttons(False)
         if hasattr(self, '_lock_btn') and self._lock_btn.winfo_exists():
             self._lock_btn.configure(state="disabled", text_color=BORDER)
         self._show_progress_section()
@@ -1854,6 +1865,9 @@ class EvolveGUI:
     def _worker(self, headless, selected_username, months_back=1, skip_pdfs=False):
         try:
             from .main import EvolveAutomation as _Automation
+            if self._analytics_job is None:
+                from .analytics_job import AnalyticsJob
+                self._analytics_job = AnalyticsJob()
 
             class _QH(logging.Handler):
                 def __init__(self, q):
@@ -1876,7 +1890,7 @@ class EvolveGUI:
                 headless, self.master_password, selected_username,
                 stop_event=self._stop_event,
                 months_back=months_back, skip_pdfs=skip_pdfs,
-                scheduled=scheduled)
+                scheduled=scheduled, analytics_job=self._analytics_job)
             self._automation = automation
             stats = automation.run()
             self._automation = None
@@ -1899,6 +1913,9 @@ class EvolveGUI:
             pass
         if self.automation_thread and self.automation_thread.is_alive():
             self.root.after(80, self._poll_queue)
+        elif self._analytics_busy():
+            # Run finished; keep showing the background analytics log
+            self.root.after(80, self._poll_queue)
         else:
             # Final drain: catch messages the thread put just before dying
             try:
@@ -1912,6 +1929,10 @@ class EvolveGUI:
                         self._log(data)
             except queue.Empty:
                 pass
+            if self._analytics_pending:
+                self._on_analytics_done()
+            elif self.root.winfo_exists():
+                self._set_workbook_buttons(True)   # after a failed run
 
     # ----------------------------------------------- progress parsing
     def _update_progress(self, msg):
@@ -1953,12 +1974,20 @@ class EvolveGUI:
                 self._push_progress()
                 self._set_status(
                     self._stat(f"Page {pg}/{self._acct_pages}"), CG_RED)
+        elif "PDF downloads:" in msg:
+            m = re.search(r"PDF downloads: (\d+)/(\d+)", msg)
+            frac = int(m.group(1)) / max(int(m.group(2)), 1) if m else 0.5
+            base = W["login"]+W["refresh"]+W["filter"]+W["hashes"]+W["scrape"]
+            self._acct_progress = min(base+W["pdfs"]*frac, 0.95)
+            self._push_progress()
         elif "Downloading PDF" in msg:
             base = W["login"]+W["refresh"]+W["filter"]+W["hashes"]+W["scrape"]
             self._acct_progress = min(base+W["pdfs"]*0.5, 0.95)
             self._push_progress()
             self._set_status(self._stat("Downloading PDFs..."), CG_RED)
         elif "Updating analytics" in msg:
+            if not (self.automation_thread and self.automation_thread.is_alive()):
+                return  # background rebuild after the run; see _on_complete
             self._acct_progress = 0.90; self._push_progress()
             self._set_status(self._stat("Updating analytics..."), CG_RED)
         elif "Finished account" in msg:
@@ -1992,17 +2021,30 @@ class EvolveGUI:
                                fg_color=ELEVATED, text_color=TEXT_MID,
                                hover_color=CG_RED_HOVER)
 
+    def _set_workbook_buttons(self, enabled):
+        """Enable or grey out the Results and Analytics buttons, which open
+        workbooks a run or an analytics rebuild may be writing."""
+        if enabled:
+            self._excel_btn.configure(state="normal", fg_color=SURFACE,
+                                       text_color=TEXT, text="Results")
+        else:
+            self._excel_btn.configure(state="disabled", fg_color=ELEVATED,
+                                       text_color=TEXT_DIM)
+        if hasattr(self, '_analytics_btn'):
+            if enabled:
+                self._analytics_btn.configure(state="normal", fg_color=SURFACE,
+                                              text_color=TEXT)
+            else:
+                self._analytics_btn.configure(state="disabled", fg_color=ELEVATED,
+                                              text_color=TEXT_DIM)
+
     def _reset_controls(self):
         """Re-enable run, Results and lock buttons after automation ends."""
         self.run_btn.configure(text="Run Automation", hover_color=CG_RED_HOVER,
                                fg_color=CG_RED, text_color=SURFACE,
                                border_width=0, state="normal",
                                command=self._run_automation)
-        self._excel_btn.configure(state="normal", fg_color=SURFACE,
-                                   text_color=TEXT, text="Results")
-        if hasattr(self, '_analytics_btn'):
-            self._analytics_btn.configure(state="normal", fg_color=SURFACE,
-                                          text_color=TEXT)
+        self._set_workbook_buttons(not self._analytics_busy())
         if hasattr(self, '_lock_btn') and self._lock_btn.winfo_exists():
             self._lock_btn.configure(state="normal", text_color=TEXT_DIM)
 
@@ -2011,7 +2053,12 @@ class EvolveGUI:
             return
         self._reset_controls()
         self._set_progress(1.0)
-        self._set_status("Completed", SUCCESS)
+        if self._analytics_busy():
+            # Results and PDFs are saved; the dashboards finish in the background
+            self._analytics_pending = True
+            self._set_status("Completed  |  Updating analytics...", CG_RED)
+        else:
+            self._set_status("Completed", SUCCESS)
         elapsed = int(time.time() - self._run_start_time) if self._run_start_time else 0
         mins, secs = divmod(elapsed, 60)
         dur = f"{mins}m {secs}s" if mins else f"{secs}s"
@@ -2042,6 +2089,17 @@ class EvolveGUI:
         if skipped:
             self._log(f"Warning: {skipped} PDF(s) could not be downloaded - check logs for details.")
 
+    def _on_analytics_done(self):
+        """Background analytics finished: re-enable the workbook buttons."""
+        self._analytics_pending = False
+        if not self.root.winfo_exists():
+            return
+        self._set_workbook_buttons(True)
+        if self._analytics_job.status == "failed":
+            self._set_status("Completed  |  Analytics update failed - see log", AMBER)
+        else:
+            self._set_status("Completed", SUCCESS)
+
     def _on_error(self, msg):
         if not self.root.winfo_exists():
             return
@@ -2067,6 +2125,8 @@ class EvolveGUI:
                 except Exception:
                     pass
             self.automation_thread.join(timeout=3)
+        if self._analytics_busy():
+            logging.info("Analytics update still running - it will finish before the app exits")
         return True
 
     def _on_close(self):
@@ -0,0 +1,234 @@
+"""Small keep-alive HTTP client shared by one automation run.
+
+``urlopen`` opens a fresh TCP + TLS connection for every request. On a large
+PDF backfill that handshake dominates, so the run keeps one ``HttpClient``
+that holds idle ``http.client`` connections per host and reuses them. It
+also caps concurrent connections per host and spaces out request starts to
+the same host, so E-volve is never hit harder than the configured rate.
+
+Responses are context managers with ``status``, ``headers`` and ``read()``
+like ``urlopen``'s; status codes >= 400 raise ``urllib.error.HTTPError`` so
+callers handle errors exactly as they did before.
+"""
+import io
+import time
+import base64
+import threading
+import http.client
+from urllib.error import HTTPError
+from urllib.parse import unquote, urljoin, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+_USER_AGENT = "Mozilla/5.0"
+_REDIRECT_CODES = (301, 302, 303, 307, 308)
+_MAX_REDIRECTS = 5
+# A reused connection the server already closed fails on first use with one
+# of these; the request is retried once on a fresh connection
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+
+
+def _proxy_for(scheme, host):
+    """(host, port, Proxy-Authorization value or None) of the system/env
+    proxy urlopen would use for ``host``, or None to connect directly.
+    Credentials come from the proxy URL's userinfo, as with ProxyHandler."""
+    proxy = getproxies().get(scheme)
+    if not proxy or proxy_bypass(host):
+        return None
+    p = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    auth = None
+    if p.username is not None:
+        creds = f"{unquote(p.username)}:{unquote(p.password or '')}"
+        auth = "Basic " + base64.b64encode(creds.encode()).decode("ascii")
+    return p.hostname, p.port or 8080, auth
+
+
+class _PooledResponse:
+    """Context manager around an HTTPResponse that hands the connection back
+    to the pool when the body was read to the end, and closes it otherwise."""
+
+    def __init__(self, client, key, conn, resp, url):
+        self._client = client
+        self._key = key
+        self._conn = conn
+        self._resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+
+    def read(self, amt=None):
+        return self._resp.read(amt)
+
+    def readinto(self, b):
+        return self._resp.readinto(b)
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        reusable = self._resp.isclosed() and not self._resp.will_close
+        self._resp.close()
+        self._client._release(self._key, conn, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpClient:
+    """Keep-alive connection pool with per-host concurrency and rate limits.
+
+    ``max_per_host`` bounds how many requests to one host run at once (extra
+    callers wait for a free slot); ``min_interval`` is the minimum number of
+    seconds between the starts of two requests to the same host. Thread-safe.
+    """
+
+    def __init__(self, max_per_host=2, min_interval=0.0, timeout=30):
+        self.max_per_host = max(1, int(max_per_host))
+        self.min_interval = max(0.0, float(min_interval))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self._next_start = {}
+        self._closed = False
+
+    # ── Public API ────────────────────────────────────────────────────
+    def get(self, url, headers=None, timeout=None):
+        """GET ``url`` following redirects. Returns a context-manager response.
+
+        Raises ``HTTPError`` for status >= 400 and ``OSError``/``HTTPException``
+        for connection failures, like ``urlopen``.
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            resp = self._request("GET", url, headers, timeout)
+            if resp.status in _REDIRECT_CODES and resp.headers.get("Location"):
+                resp.read()
+                resp.close()
+                last = resp
+                url = urljoin(url, resp.headers["Location"])
+                continue
+            if resp.status >= 400:
+                body = resp.read()
+                resp.close()
+                raise HTTPError(url, resp.status, resp.reason, resp.headers,
+                                io.BytesIO(body))
+            return resp
+        raise HTTPError(url, last.status, "Too many redirects", last.headers, None)
+
+    def close(self):
+        """Close every idle connection. Connections still in use close on release."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── Internals ─────────────────────────────────────────────────────
+    def _request(self, method, url, headers, timeout):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {url}")
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, host, port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        all_headers = {"User-Agent": _USER_AGENT}
+        all_headers.update(headers or {})
+        proxy = _proxy_for(scheme, host) if scheme == "http" else None
+        if proxy is not None:
+            # Plain HTTP goes to the proxy as an absolute-URI request
+            path = f"http://{parts.netloc.rpartition('@')[2]}{path}"
+            if proxy[2]:
+                all_headers["Proxy-Authorization"] = proxy[2]
+
+        slot = self._slot(key)
+        slot.acquire()
+        try:
+            self._wait_turn(key)
+            for attempt in range(2):
+                conn, reused = self._checkout(key, timeout)
+                try:
+                    conn.request(method, path, headers=all_headers)
+                    resp = conn.getresponse()
+                except _STALE_ERRORS:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                except Exception:
+                    conn.close()
+                    raise
+                return _PooledResponse(self, key, conn, resp, url)
+        except BaseException:
+            slot.release()
+            raise
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return slot
+
+    def _wait_turn(self, key):
+        """Sleep until this host's next request start time (rate limit)."""
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(key, 0.0))
+            self._next_start[key] = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _checkout(self, key, timeout):
+        """Return (connection, reused) - an idle one if available."""
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                conn = idle.pop()
+                conn.timeout = timeout or self.timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(conn.timeout)
+                return conn, True
+        return self._connect(key, timeout or self.timeout), False
+
+    def _release(self, key, conn, reusable):
+        with self._lock:
+            if reusable and not self._closed:
+                self._idle.setdefault(key, []).append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+        self._slots[key].release()
+
+    @staticmethod
+    def _connect(key, timeout):
+        scheme, host, port = key
+        cls = (http.client.HTTPSConnection if scheme == "https"
+               else http.client.HTTPConnection)
+        proxy = _proxy_for(scheme, host)
+        if proxy is None:
+            return cls(host, port, timeout=timeout)
+        proxy_host, proxy_port, auth = proxy
+        conn = cls(proxy_host, proxy_port, timeout=timeout)
+        if scheme == "https":
+            # HTTPS is tunnelled with CONNECT, credentials on the CONNECT
+            conn.set_tunnel(host, port,
+                            headers={"Proxy-Authorization": auth} if auth else None)
+        return conn
+
@@ -1,14 +1,16 @@
 import logging
 from dataclasses import dataclass
 from datetime import datetime
-from urllib.request import urlopen, Request
+from http.client import HTTPException
 from urllib.error import URLError
 
 from evolve_results_automation.config import (
-    APP_VER, ENCRYPTED_CREDENTIALS_FILE, DOCUMENT_STORE_URL, RESULTS_URL
+    APP_VER, ENCRYPTED_CREDENTIALS_FILE, DOCUMENT_STORE_URL, RESULTS_URL,
+    PDF_RETRY_QUEUE_FILE, PDF_STORE_DIR, get_excel_file_for_year, load_settings
 )
 from evolve_results_automation.excel_utils import (
-    save_year_to_excel, load_all_existing_data, regenerate_analytics
+    save_year_to_excel, load_all_existing_data, load_existing_results,
+    regenerate_analytics
 )
 from evolve_results_automation.selenium_utils import (
     start_driver, login, switch_to_results_iframe,
@@ -19,9 +21,13 @@ from evolve_results_automation.selenium_utils import (
 )
 from evolve_results_automation.secure_credentials import SecureCredentialManager
 from evolve_results_automation.logging_utils import setup_logger
-from evolve_results_automation.parsing_utils import (
-    extract_pdf_filename_from_html, unique_row_hash, download_pdf
-)
+from evolve_results_automation.parsing_utils import extract_pdf_filename_from_html
+from evolve_results_automation.http_client import HttpClient
+from evolve_results_automation.pdf_fetcher import PdfFetcher
+from evolve_results_automation.pdf_ledger import audit_reports, record_download
+from evolve_results_automation.pdf_store import ContentStore
+from evolve_results_automation.result_row import ResultRow
+from evolve_results_automation.retry_queue import RetryQueue
 
 @dataclass
 class ProcessingStats:
@@ -42,7 +48,8 @@ def compute_pdf_cutoff_date(months_back: int) -> datetime:
 
 class EvolveAutomation:
     def __init__(self, headless: bool, master_password: str, selected_username: str = None, stop_event=None,
-                 months_back: int = 1, skip_pdfs: bool = False, scheduled: bool = False):
+                 months_back: int = 1, skip_pdfs: bool = False, scheduled: bool = False,
+                 analytics_job=None):
         self.headless = headless
         self.master_password = master_password
         self.selected_username = selected_username
@@ -52,10 +59,26 @@ class EvolveAutomation:
         self._months_back = months_back
         self._skip_pdfs = skip_pdfs
         self._scheduled = scheduled
+        self._pdf_years = set()
+        self._saved_years = set()
+        # Years of the current account whose rows changed since their last save
+        self._dirty_years = set()
+        # New rows and rows edited in place, for the analytics dependents
+        self._changed_rows = []
+        self._http = None
+        self._retry_queue = None
+        self._content_store = None
+        # AnalyticsJob to refresh the dashboards in the background; without
+        # one they are rebuilt inline before run() returns
+        self._analytics_job = analytics_job
 
     def run(self):
         """Top-level entry point: setup, decrypt accounts, iterate."""
         setup_logger()
+        if self._analytics_job is not None and self._analytics_job.busy:
+            # Never write a year workbook while its dashboard is being swapped
+            logging.info("Waiting for the previous analytics update to finish...")
+            self._analytics_job.wait()
         mode = "(browser not visible)" if self.headless else "browser visible"
         trigger = "scheduled" if self._scheduled else "manual"
         logging.info(f"Evolve Results Automation {APP_VER} | {mode} | {trigger} run")
@@ -75,8 +98,26 @@ class EvolveAutomation:
         account_names = ", ".join(a.get("username", "?").strip() for a in accounts)
         logging.info(f"Processing {len(accounts)} account(s): {account_names}")
 
-        self._preflight_check()
+        settings = load_settings()
+        self._http = HttpClient(max_per_host=settings["download_connections"],
+                                min_interval=settings["download_min_interval"])
+        self._retry_queue = RetryQueue(PDF_RETRY_QUEUE_FILE)
+        if settings.get("pdf_content_store"):
+            self._content_store = ContentStore(PDF_STORE_DIR)
+        try:
+            self._preflight_check()
+            if not self._skip_pdfs:
+                self._drain_retry_queue()
+            self._run_accounts(accounts)
+        finally:
+            self._http.close()
+            self._retry_queue.save()
+            if self._content_store is not None:
+                self._save_content_store()
+        return self.stats
 
+    def _run_accounts(self, accounts):
+        """Process each account, then log the summary and refresh analytics."""
         account_reports = []
         for idx_acc, account in enumerate(accounts):
             if self._stop_event and self._stop_event.is_set():
@@ -128,25 +169,45 @@ class EvolveAutomation:
             logging.info("--- Run Summary ---")
             for name, rows, pdfs, errs in account_reports:
                 logging.info(f"  {name}: {rows} new results, {pdfs} PDFs, {errs} error(s)")
-        # Regenerate analytics once after all accounts (runs even on early stop)
-        if self.stats.new_rows_added > 0 or self.stats.pdfs_downloaded > 0:
-            logging.info("Updating analytics...")
-            regenerate_analytics()
+        self._audit_reports()
+        # Regenerate analytics once after all accounts (runs even on early stop),
+        # only for the years this run changed and the years depending on them
+        if self._changed_rows or self.stats.pdfs_downloaded > 0:
+            if self._analytics_job is not None:
+                self._analytics_job.schedule(self._saved_years, self._changed_rows)
+            else:
+                logging.info("Updating analytics...")
+                try:
+                    regenerate_analytics(self._saved_years, self._changed_rows)
+                except Exception as e:
+                    logging.error(f"Analytics update failed: {e}")
 
         logging.info(f"Run complete: {self.stats.accounts_processed} account(s), "
                      f"{self.stats.new_rows_added} new results, "
                      f"{self.stats.pdfs_downloaded} PDFs downloaded, "
                      f"{self.stats.errors_encountered} error(s)")
-        return self.stats
+
+    def _audit_reports(self):
+        """Log orphaned and missing report files for years that got PDFs this run."""
+        for year in sorted(self._pdf_years):
+            try:
+                rows = load_existing_results(get_excel_file_for_year(year))
+                orphans, missing = audit_reports(year, rows)
+            except Exception as e:
+                logging.debug(f"Report audit failed for {year}: {e}")
+                continue
+            if orphans or missing:
+                logging.info(f"{year} reports: {len(orphans)} file(s) not matching any result, "
+                             f"{len(missing)} result(s) marked downloaded but missing on disk")
+                for rel in missing[:10]:
+                    logging.debug(f"  Missing: {rel}")
 
     def _preflight_check(self):
         """Test connectivity to E-volve before starting automation."""
         try:
-            req = Request(RESULTS_URL.split('#')[0],
-                          headers={"User-Agent": "Mozilla/5.0"})
-            with urlopen(req, timeout=10):
-                pass
-        except (URLError, OSError) as e:
+            with self._http.get(RESULTS_URL.split('#')[0], timeout=10) as resp:
+                resp.read()  # drain so the connection goes back to the pool
+        except (URLError, OSError, HTTPException) as e:
             raise ConnectionError(
                 f"Cannot reach E-volve. Check your internet connection. ({e})") from e
 
@@ -166,6 +227,9 @@ class EvolveAutomation:
             return
 
         existing_hashes, rows_by_year, pdf_resume_count = load_all_existing_data(silent=True)
+        # Rows the PDF ledger or the reports folder marked as downloaded
+        self._dirty_years = {year for year, year_rows in rows_by_year.items()
+                             if any(r.get("PDF report save time") for r in year_rows)}
 
         if not set_date_filter(driver, self._months_back):
             logging.warning("Date filter may not have been set correctly")
@@ -199,10 +263,19 @@ class EvolveAutomation:
                     self.stats.errors_encountered += 1
                     break
 
-        for year in rows_by_year:
-            save_year_to_excel(year, rows_by_year, silent=True)
+        # Pending rows that were never downloaded are already in their
+        # workbook as-is; only years changed since their last save need a write
+        for year in sorted(self._dirty_years, reverse=True):
+            self._save_year(year, rows_by_year)
         logging.info(f"Finished account {username}")
 
+    def _save_year(self, year, rows_by_year):
+        """Save a year workbook and remember it, and any rows the save
+        edited in place, for the analytics refresh."""
+        self._changed_rows.extend(save_year_to_excel(year, rows_by_year, silent=True))
+        self._saved_years.add(year)
+        self._dirty_years.discard(year)
+
     def _scrape_page(self, driver, page_num, existing_hashes, rows_by_year):
         """Scrape the current results page and group new rows by year.
         Returns the set of page hashes for duplicate page detection."""
@@ -211,25 +284,26 @@ class EvolveAutomation:
             # Track how many new rows go to each year
             new_per_year = {}
             for row in new_rows:
-                completed_date = row.get("Completed", "")
-                try:
-                    year = datetime.strptime(completed_date, "%d/%m/%Y").year
-                except (ValueError, TypeError):
+                if row.completed_date is not None:
+                    year = row.completed_date.year
+                else:
                     year = datetime.now().year
-                    logging.warning(f"Unparseable date '{completed_date}' for {row.get('First name', '?')} {row.get('Last name', '?')}, defaulting to {year}")
+                    logging.warning(f"Unparseable date '{row['Completed']}' for {row.get('First name', '?')} {row.get('Last name', '?')}, defaulting to {year}")
 
                 if year not in rows_by_year:
                     rows_by_year[year] = []
                 rows_by_year[year].append(row)
-                existing_hashes.add(unique_row_hash(row))
+                existing_hashes.add(row.digest)
+                self._dirty_years.add(year)
                 new_per_year[year] = new_per_year.get(year, 0) + 1
 
             logging.info(f"Found {len(new_rows)} new result(s) on page {page_num}")
             self.stats.new_rows_added += len(new_rows)
+            self._changed_rows.extend(new_rows)
 
             # Save scraped rows to Excel immediately (before PDF processing)
             for yr in sorted(new_per_year.keys(), reverse=True):
-                save_year_to_excel(yr, rows_by_year, silent=True)
+                self._save_year(yr, rows_by_year)
                 logging.info(f"  Saved {new_per_year[yr]} new result(s) to {yr}/exam_results_{yr}.xlsx")
         else:
             logging.info(f"No new results on page {page_num}")
@@ -249,12 +323,11 @@ class EvolveAutomation:
             for row in year_rows:
                 if row.get("PDF report save time"):
                     continue
-                try:
-                    dt = datetime.strptime(row.get("Completed", ""), "%d/%m/%Y")
-                    if dt < cutoff:
-                        skipped += 1
-                        continue
-                except (ValueError, TypeError):
+                dt = row.completed_date
+                if dt is None:
+                    continue
+                if dt < cutoff:
+                    skipped += 1
                     continue
                 pdf_needed.append(row)
 
@@ -263,7 +336,82 @@ class EvolveAutomation:
         if not pdf_needed:
             return
 
-        for row in pdf_needed:
+        fetcher = PdfFetcher(self._http, workers=self._http.max_per_host,
+                             stop_event=self._stop_event,
+                             on_progress=self._log_pdf_progress)
+        try:
+            self._resolve_pdfs(driver, pdf_needed, fetcher, self._dirty_years)
+        finally:
+            # Let in-flight downloads finish, then one batched save per year
+            self._record_fetched(fetcher.wait(), self._dirty_years)
+            self._queue_cancelled(fetcher)
+            fetcher.close()
+            self._retry_queue.save()
+            for year in sorted(self._dirty_years, reverse=True):
+                self._save_year(year, rows_by_year)
+
+    @staticmethod
+    def _log_pdf_progress(done, total):
+        logging.info(f"PDF downloads: {done}/{total} done")
+
+    def _save_content_store(self):
+        try:
+            self._content_store.save()
+        except OSError as e:
+            logging.debug(f"Could not save PDF store manifest: {e}")
+
+    def _drain_retry_queue(self):
+        """Fetch queued downloads from earlier runs straight from their URLs.
+
+        Runs before any browser work. Successes only go to the ledger; the
+        workbook column is filled in when the account's data is loaded.
+        """
+        due = self._retry_queue.due()
+        if not due:
+            return
+        logging.info(f"Retrying {len(due)} queued PDF download(s) from earlier runs")
+        fetcher = PdfFetcher(self._http, workers=self._http.max_per_host,
+                             stop_event=self._stop_event)
+        try:
+            for row_data, url in due:
+                fetcher.submit(url, ResultRow(row_data))
+            self._record_fetched(fetcher.wait(), set())
+            self._queue_cancelled(fetcher)
+        finally:
+            fetcher.close()
+            self._retry_queue.save()
+
+    def _record_fetched(self, results, dirty_years):
+        """Record finished downloads in the ledger and on their rows. Years
+        that gained a PDF are added to ``dirty_years`` for the batched save.
+        Failed downloads go to the retry queue for the next run."""
+        for row, url, saved_path in results:
+            if not saved_path:
+                self._retry_queue.add_failure(row, url)
+                continue
+            self._retry_queue.remove(row.digest)
+            self.stats.pdfs_downloaded += 1
+            dl_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            row_year = row.completed_date.year
+            # The ledger append is the durable record; the workbook column
+            # is saved once per page by _process_page_pdfs
+            entry = record_download(row_year, row.digest, saved_path, dl_time)
+            if self._content_store is not None:
+                self._content_store.add(saved_path, entry["sha256"])
+            row["PDF report save time"] = dl_time
+            dirty_years.add(row_year)
+            self._pdf_years.add(row_year)
+
+    def _queue_cancelled(self, fetcher):
+        """Queue downloads Stop cancelled for the next run, without using up
+        their retry attempts."""
+        for row, url in fetcher.cancelled:
+            self._retry_queue.add_cancelled(row, url)
+
+    def _resolve_pdfs(self, driver, pdf_needed, fetcher, dirty_years):
+        """Open each pending row in the browser to find its report URL and
+        queue the download on ``fetcher``, collecting finished ones as it goes."""
+        for idx, row in enumerate(pdf_needed):
             if self._stop_event and self._stop_event.is_set():
                 break
             try:
@@ -281,19 +429,12 @@ class EvolveAutomation:
                 html = driver.page_source
                 file_name = extract_pdf_filename_from_html(html)
                 if file_name:
-                    pdf_url = f"{DOCUMENT_STORE_URL}{file_name}"
-                    downloaded = download_pdf(pdf_url, row, completed)
-
-                    if downloaded:
-                        self.stats.pdfs_downloaded += 1
-                        dl_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        row["PDF report save time"] = dl_time
-                        row_year = datetime.strptime(row["Completed"], "%d/%m/%Y").year
-                        save_year_to_excel(row_year, rows_by_year, silent=True)
+                    fetcher.submit(f"{DOCUMENT_STORE_URL}{file_name}", row)
                 else:
                     logging.warning("No PDF file name found, skipping")
 
                 navigate_to_results(driver)
+                self._record_fetched(fetcher.poll(), dirty_years)
             except Exception as e:
                 logging.error(f"Error processing PDF for {row.get('First name', '?')} {row.get('Last name', '?')}: {e}")
                 self.stats.errors_encountered += 1
@@ -301,8 +442,10 @@ class EvolveAutomation:
                     navigate_to_results(driver)
                 except Exception as ex:
                     logging.error(f"Failed to recover after error: {ex}")
+                    # The failed row is counted as an error (or is already
+                    # with the fetcher); only the rows after it are skipped
                     remaining = sum(
-                        1 for r in pdf_needed
+                        1 for r in pdf_needed[idx + 1:]
                         if not r.get("PDF report save time"))
                     if remaining:
                         self.stats.pdfs_skipped += remaining
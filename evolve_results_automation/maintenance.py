@@ -0,0 +1,86 @@
+"""Maintenance commands for the app folder, run from a terminal:
+
+    python -m evolve_results_automation.maintenance dedup-reports [--verify] [--prune]
+    python -m evolve_results_automation.maintenance archive-reports [--older-than-months N]
+
+``dedup-reports`` moves every year's reports into the content-addressed
+``pdf_store/`` (see ``pdf_store.py``), turning duplicate PDFs into hard
+links, and checks the store against its manifest.
+
+``archive-reports`` packs the reports of closed years (and, with
+``--older-than-months``, older months of the current year) into per-month
+zips (see ``report_archive.py``).
+"""
+import sys
+import logging
+import argparse
+from datetime import datetime
+
+from .config import PDF_STORE_DIR, list_year_folders
+from .pdf_store import ContentStore
+from .report_archive import archive_reports
+
+
+def _dedup_reports(args):
+    summary = ContentStore(PDF_STORE_DIR).sweep(verify=args.verify, prune=args.prune)
+    print(f"Scanned {summary['reports']} report(s): {summary['linked']} newly stored, "
+          f"{summary['deduplicated']} duplicate(s) linked "
+          f"({summary['bytes_freed'] / 1048576:.1f} MB freed)")
+    print(f"Store check: {summary['missing_objects']} missing, "
+          f"{summary['corrupt_objects']} corrupt, {summary['stale_links']} stale link(s) removed, "
+          f"{summary['pruned']} unused object(s) pruned")
+    return 1 if summary["missing_objects"] or summary["corrupt_objects"] else 0
+
+
+def _months_back(today, months):
+    """(year, month) of the month ``months`` before ``today``'s month."""
+    index = today.year * 12 + (today.month - 1) - months
+    return index // 12, index % 12 + 1
+
+
+def _archive_reports(args, today=None):
+    today = today or datetime.now()
+    before = (_months_back(today, args.older_than_months)
+              if args.older_than_months is not None else None)
+    totals = {"months": 0, "files": 0, "bytes": 0}
+    for year in list_year_folders():
+        if int(year) < today.year:
+            summary = archive_reports(year)          # closed year: every month
+        elif before is not None:
+            summary = archive_reports(year, before=before)
+        else:
+            continue
+        for key in totals:
+            totals[key] += summary[key]
+    print(f"Archived {totals['files']} report(s) into {totals['months']} month zip(s) "
+          f"({totals['bytes'] / 1048576:.1f} MB)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m evolve_results_automation.maintenance",
+        description="Maintenance commands for the E-volve results folder.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    dedup = sub.add_parser("dedup-reports",
+                           help="store reports by content and hard-link duplicates")
+    dedup.add_argument("--verify", action="store_true",
+                       help="re-hash every stored PDF instead of checking sizes only")
+    dedup.add_argument("--prune", action="store_true",
+                       help="delete stored PDFs that no report links to any more")
+    dedup.set_defaults(func=_dedup_reports)
+
+    archive = sub.add_parser("archive-reports",
+                             help="pack closed years' reports into per-month zips")
+    archive.add_argument("--older-than-months", type=int, metavar="N",
+                         help="also pack current-year months more than N months old")
+    archive.set_defaults(func=_archive_reports)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,21 @@
 import os
 import re
+import hashlib
+import time
+import shutil
 import logging
 from datetime import datetime
-from urllib.request import urlopen, Request
+from http.client import HTTPException
 from urllib.error import URLError, HTTPError
 
 from .config import get_reports_base_for_year
+from .http_client import HttpClient
+from .report_archive import report_exists
 
-def make_report_folder_path(date_str: str) -> str:
-    """Create a dated folder path for reports based on exam completion date."""
+def report_folder_path(date_str: str) -> str:
+    """Dated reports folder for an exam completion date (no mkdir)."""
     dt = datetime.strptime(date_str, "%d/%m/%Y")
-    year = dt.year
-    month_day = dt.strftime("%m %d")
-    reports_base = get_reports_base_for_year(year)
-    folder = os.path.join(reports_base, month_day)
-    os.makedirs(folder, exist_ok=True)
-    return folder
+    return os.path.join(get_reports_base_for_year(dt.year), dt.strftime("%m %d"))
 
 def report_filename(row):
     """Generate a sanitized PDF filename from row data.
@@ -44,6 +44,17 @@ def unique_row_hash(row):
     ]
     return "|".join([str(row.get(f, "")).strip().lower() for f in fields])
 
+def row_digest(row):
+    """Compact 64-bit int digest of ``unique_row_hash`` for dedup sets.
+
+    The dedup sets hold one entry per historical result, so they store this
+    fixed-width int (BLAKE2b, 8 bytes) instead of the ~100-byte joined
+    string. It is derived from the same normalised fields, so rows loaded
+    from old workbooks match freshly scraped rows exactly as before.
+    """
+    key = unique_row_hash(row).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "big")
+
 def extract_pdf_filename_from_html(html):
     """Extract the PDF filename from HTML content."""
     match = re.search(r'([a-f0-9\-]{36}\.pdf)', html, re.IGNORECASE)
@@ -60,39 +71,128 @@ def _cleanup_tmp(path):
         pass
 
 
-def download_pdf(pdf_url, row, completed):
+# Download tuning: large reads, a few retries with capped exponential backoff
+_DOWNLOAD_CHUNK = 256 * 1024
+_DOWNLOAD_ATTEMPTS = 4
+_BACKOFF_BASE = 1.0
+_BACKOFF_CAP = 15.0
+
+
+def _backoff_delay(retry):
+    """Seconds to wait before retry number ``retry`` (0-based), capped."""
+    return min(_BACKOFF_CAP, _BACKOFF_BASE * (2 ** retry))
+
+
+def _content_range(value):
+    """(start, total) from a ``Content-Range: bytes a-b/total`` header,
+    or (None, None) if it is missing or malformed."""
+    match = re.match(r"bytes\s+(\d+)-\d+/(\d+)", value or "")
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+
+def _fetch_to_tmp(client, pdf_url, tmp_path):
+    """Fetch ``pdf_url`` into ``tmp_path``, resuming a partial file with a
+    Range request. Returns the expected final size, or None if unknown."""
+    offset = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    try:
+        resp = client.get(pdf_url, headers=headers)
+    except HTTPError as e:
+        if e.code == 416 and offset:
+            # Partial file no longer matches the server copy - start over
+            _cleanup_tmp(tmp_path)
+            raise ValueError("server rejected resume range") from e
+        raise
+    with resp:
+        start, total = (None, None)
+        if offset and resp.status == 206:
+            start, total = _content_range(resp.headers.get("Content-Range"))
+        if start == offset:
+            mode = "ab"
+            logging.info(f"  Resuming PDF download at {offset // 1024} KB")
+        else:
+            # Full body (server ignored Range): overwrite the partial file
+            mode = "wb"
+            length = resp.headers.get("Content-Length", "")
+            total = int(length) if length.isdigit() else None
+        with open(tmp_path, mode) as f:
+            shutil.copyfileobj(resp, f, _DOWNLOAD_CHUNK)
+            size = f.tell()
+    if total is not None and size < total:
+        # Body ended early: keep the partial file so the retry resumes it
+        raise ConnectionError(f"connection closed at {size} of {total} bytes")
+    return total
+
+
+def _validate_pdf(path, expected_size):
+    """Raise ValueError unless ``path`` looks like a complete PDF."""
+    size = os.path.getsize(path)
+    if expected_size is not None and size != expected_size:
+        raise ValueError(f"size {size} does not match Content-Length {expected_size}")
+    with open(path, "rb") as f:
+        if f.read(5) != b"%PDF-":
+            raise ValueError("missing %PDF header")
+        f.seek(max(0, size - 1024))
+        if b"%%EOF" not in f.read():
+            raise ValueError("missing %%EOF trailer")
+
+
+def download_pdf(pdf_url, row, completed, client=None):
     """Download a PDF report to the appropriate dated folder.
 
     Writes to a ``.tmp`` file first and atomically renames on success so that
     an interrupted download never leaves a partial PDF that would be
-    misidentified as valid on resume. Returns True if the file was downloaded
-    or already exists on disk.
+    misidentified as valid on resume. A dropped connection keeps the
+    ``.tmp`` and the next attempt (or run) resumes it with an HTTP Range
+    request. The finished file must match Content-Length and have a ``%PDF``
+    header and ``%%EOF`` trailer before it is renamed into place. Transient
+    failures are retried with capped exponential backoff. ``client`` is the
+    run's shared ``HttpClient`` (a one-off client is used when omitted).
+    Returns the saved path if the file was downloaded or already exists on
+    disk (loose or in its month's report archive), otherwise None.
     """
-    target_dir = make_report_folder_path(completed)
-    target_name = report_filename(row)
-    save_path = os.path.join(target_dir, target_name)
+    target_dir = report_folder_path(completed)
+    save_path = os.path.join(target_dir, report_filename(row))
 
-    if os.path.exists(save_path) and os.path.getsize(save_path) > 0:
+    if report_exists(save_path):
         logging.info("PDF already on disk, updating timestamp")
-        return True
+        return save_path
+    os.makedirs(target_dir, exist_ok=True)
 
+    if client is None:
+        with HttpClient() as own_client:
+            return _download_with_retries(own_client, pdf_url, save_path)
+    return _download_with_retries(client, pdf_url, save_path)
+
+
+def _download_with_retries(client, pdf_url, save_path):
+    """Retry loop behind ``download_pdf``. Returns ``save_path`` or None."""
     tmp_path = save_path + ".tmp"
-    try:
-        with urlopen(Request(pdf_url), timeout=30) as resp:
-            with open(tmp_path, 'wb') as f:
-                while True:
-                    chunk = resp.read(10240)
-                    if not chunk:
-                        break
-                    f.write(chunk)
-        os.replace(tmp_path, save_path)
-        logging.info("  PDF saved")
-        return True
-    except HTTPError as e:
-        logging.warning(f"Failed to download PDF, status: {e.code}")
-        _cleanup_tmp(tmp_path)
-        return False
-    except (URLError, OSError) as e:
-        logging.warning(f"Failed to download PDF: {e}")
-        _cleanup_tmp(tmp_path)
-        return False
+    error = None
+    for attempt in range(_DOWNLOAD_ATTEMPTS):
+        if attempt:
+            delay = _backoff_delay(attempt - 1)
+            logging.warning(f"PDF download attempt {attempt} failed ({error}), "
+                            f"retrying in {delay:.0f}s")
+            time.sleep(delay)
+        try:
+            expected = _fetch_to_tmp(client, pdf_url, tmp_path)
+            _validate_pdf(tmp_path, expected)
+            os.replace(tmp_path, save_path)
+            logging.info("  PDF saved")
+            return save_path
+        except HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                logging.warning(f"Failed to download PDF, status: {e.code}")
+                _cleanup_tmp(tmp_path)
+                return None
+            error = f"status {e.code}"
+        except ValueError as e:
+            # Corrupt or mismatched content: discard and fetch from scratch
+            _cleanup_tmp(tmp_path)
+            error = f"invalid PDF: {e}"
+        except (URLError, OSError, HTTPException) as e:
+            # Connection dropped: keep the partial .tmp so the retry resumes
+            error = e
+    logging.warning(f"Failed to download PDF: {error}")
+    return None
@@ -0,0 +1,213 @@
+"""Append-only ledger of downloaded PDF reports.
+
+Each year folder has a ``pdf_ledger_YYYY.jsonl`` with one JSON line per
+download: the row digest, the download time, the report path (relative to
+the year folder), its size and SHA-256. Recording a download is a single
+small append instead of rewriting the year workbook, and the
+``PDF report save time`` column is filled in from the ledger in batches
+(once per results page and at the end of each account).
+
+A line cut short by a crash is skipped on read; the PDF it described is
+simply picked up again as pending on the next run.
+
+The second half of the module indexes each year's ``reports/`` tree in one
+directory walk (plus the report archive index), so pending rows whose PDF
+is already on disk can be marked in bulk and a run can report orphaned and
+missing files.
+"""
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+
+from .config import get_pdf_ledger_for_year, get_reports_base_for_year
+from .parsing_utils import report_filename, report_folder_path
+from .report_archive import archived_reports, open_report
+
+
+def file_sha256(path):
+    """Hex SHA-256 of a file, read in 64 KB blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def record_download(year, digest, path, saved_at):
+    """Append a ledger entry for a report saved at ``path``. Returns the entry."""
+    return record_downloads(year, [(digest, path, saved_at)])[0]
+
+
+def _report_size_and_sha256(path):
+    """Size and hex SHA-256 of a report, read from disk or its archive."""
+    h = hashlib.sha256()
+    size = 0
+    with open_report(path) as f:
+        for block in iter(lambda: f.read(65536), b""):
+            h.update(block)
+            size += len(block)
+    return size, h.hexdigest()
+
+
+def record_downloads(year, items):
+    """Append one entry per (digest, path, saved_at) with a single write+fsync.
+    Returns the list of entries written."""
+    ledger_path = get_pdf_ledger_for_year(year)
+    year_dir = os.path.dirname(ledger_path)
+    entries = []
+    for digest, path, saved_at in items:
+        size, sha256 = _report_size_and_sha256(path)
+        entries.append({
+            "digest": digest,
+            "time": saved_at,
+            "path": os.path.relpath(path, year_dir),
+            "size": size,
+            "sha256": sha256,
+        })
+    if not entries:
+        return entries
+    os.makedirs(year_dir, exist_ok=True)
+    with open(ledger_path, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    return entries
+
+
+def load_ledger(year):
+    """Return {digest: entry} for a year (latest entry wins), {} if none."""
+    entries = {}
+    try:
+        with open(get_pdf_ledger_for_year(year), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries[int(entry["digest"])] = entry
+                except (ValueError, KeyError, TypeError):
+                    logging.debug(f"Skipping malformed PDF ledger line for {year}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.debug(f"Could not read PDF ledger for {year}: {e}")
+    return entries
+
+
+def apply_ledger(rows_by_year):
+    """Fill ``PDF report save time`` on rows the ledger says are downloaded.
+
+    Rows are updated in place so the next ``save_year_to_excel`` writes the
+    times back to the workbook. Returns the number of rows filled in.
+    """
+    filled = 0
+    for year, rows in rows_by_year.items():
+        ledger = None
+        for row in rows:
+            if row.get("PDF report save time"):
+                continue
+            if ledger is None:
+                ledger = load_ledger(year)
+                if not ledger:
+                    break
+            entry = ledger.get(row.digest)
+            if entry is not None:
+                row["PDF report save time"] = entry["time"]
+                filled += 1
+    return filled
+
+
+# ── Reports directory index ───────────────────────────────────────────────
+# One ``os.scandir`` walk of ``YYYY/reports/<MM DD>/`` replaces a makedirs +
+# exists + getsize round-trip per row. DirEntry.stat() is served from the
+# directory listing on Windows, so the walk costs one call per folder.
+
+def report_relpath(row):
+    """Expected report path for a row, relative to its year folder."""
+    folder = report_folder_path(row["Completed"])
+    return os.path.relpath(os.path.join(folder, report_filename(row)),
+                           os.path.dirname(os.path.dirname(folder)))
+
+
+def scan_reports(year, include_archived=True):
+    """Return {relative_path: (size, mtime)} for every PDF under a year's reports.
+
+    Reports packed into month zips (``report_archive.py``) are listed under
+    their original path unless ``include_archived`` is False; a loose copy
+    of the same report takes precedence.
+    """
+    found = archived_reports(year) if include_archived else {}
+    base = get_reports_base_for_year(year)
+    try:
+        day_dirs = [d for d in os.scandir(base) if d.is_dir()]
+    except FileNotFoundError:
+        return found
+    except OSError as e:
+        logging.debug(f"Could not scan reports for {year}: {e}")
+        return found
+    for day in day_dirs:
+        try:
+            with os.scandir(day.path) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(".pdf") and entry.is_file():
+                        st = entry.stat()
+                        found[os.path.join("reports", day.name, entry.name)] = (
+                            st.st_size, st.st_mtime)
+        except OSError as e:
+            logging.debug(f"Could not scan {day.path}: {e}")
+    return found
+
+
+def mark_reports_on_disk(rows_by_year):
+    """Mark pending rows whose report is already on disk as downloaded.
+
+    Uses one directory walk per year with pending rows. The file's mtime
+    becomes the save time and each hit is added to the ledger in one batch.
+    Returns the number of rows marked.
+    """
+    marked = 0
+    for year, rows in rows_by_year.items():
+        pending = [r for r in rows
+                   if not r.get("PDF report save time") and r.completed_date]
+        if not pending:
+            continue
+        on_disk = scan_reports(year)
+        if not on_disk:
+            continue
+        year_dir = os.path.dirname(get_reports_base_for_year(year))
+        hits = []
+        for row in pending:
+            rel = report_relpath(row)
+            stat = on_disk.get(rel)
+            if stat is None or stat[0] == 0:
+                continue
+            saved_at = datetime.fromtimestamp(stat[1]).strftime("%Y-%m-%d %H:%M:%S")
+            row["PDF report save time"] = saved_at
+            hits.append((row.digest, os.path.join(year_dir, rel), saved_at))
+        if hits:
+            try:
+                record_downloads(year, hits)
+            except OSError as e:
+                logging.debug(f"Could not add on-disk reports to ledger for {year}: {e}")
+            marked += len(hits)
+    return marked
+
+
+def audit_reports(year, rows):
+    """Compare a year's rows with its reports folder.
+
+    Returns (orphans, missing): report files no row points at, and rows
+    marked as downloaded whose report is not on disk (both relative paths).
+    """
+    on_disk = scan_reports(year)
+    expected = set()
+    missing = []
+    for row in rows:
+        if row.completed_date is None:
+            continue
+        rel = report_relpath(row)
+        expected.add(rel)
+        if row.get("PDF report save time") and rel not in on_disk:
+            missing.append(rel)
+    orphans = sorted(p for p in on_disk if p not in expected)
+    return orphans, sorted(missing)
@@ -0,0 +1,156 @@
+"""Optional content-addressed store for report PDFs.
+
+With the ``pdf_content_store`` setting on, every saved report is also kept
+once under ``pdf_store/<aa>/<sha256>.pdf`` and the file in
+``YYYY/reports/MM DD/`` becomes a hard link to it. A report saved again
+under another name (a candidate's name changed, a backfill repeated) then
+takes no extra space. ``pdf_store/manifest.json`` lists every stored hash
+with its size and the report paths linked to it, so a sweep can check the
+whole archive from one file instead of re-reading every PDF.
+
+Hard links need NTFS (or any POSIX filesystem) on the same volume as the
+app folder; where linking fails the report is simply left as a plain file.
+"""
+import os
+import json
+import logging
+
+from .config import atomic_json_write, list_year_folders
+from .pdf_ledger import file_sha256, scan_reports
+
+_MANIFEST_VERSION = 1
+
+
+class ContentStore:
+    """Hash-named PDF objects plus a manifest of the report paths linked to them."""
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.base_dir = os.path.dirname(store_dir)
+        self.manifest_path = os.path.join(store_dir, "manifest.json")
+        self.objects = {}
+        self._dirty = False
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _MANIFEST_VERSION:
+                self.objects = data.get("objects", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logging.debug(f"Ignoring unreadable PDF store manifest: {e}")
+
+    def object_path(self, sha256):
+        return os.path.join(self.store_dir, sha256[:2], sha256 + ".pdf")
+
+    def add(self, path, sha256=None):
+        """Store ``path`` by content and make it a hard link to the stored copy.
+
+        Returns the bytes freed (size of ``path`` when an identical copy was
+        already stored), 0 otherwise. Leaves ``path`` untouched if linking
+        is not supported.
+        """
+        if not os.path.isfile(path):
+            return 0  # archived into a month zip, nothing to link
+        sha256 = sha256 or file_sha256(path)
+        obj = self.object_path(sha256)
+        size = os.path.getsize(path)
+        freed = 0
+        try:
+            if not os.path.exists(obj):
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                os.link(path, obj)
+            elif not os.path.samefile(obj, path):
+                # Swap the duplicate for a link atomically (temp link + replace)
+                tmp = path + ".link.tmp"
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                os.link(obj, tmp)
+                os.replace(tmp, path)
+                freed = size
+        except OSError as e:
+            logging.debug(f"Could not link {os.path.basename(path)} into PDF store: {e}")
+            return 0
+        entry = self.objects.setdefault(sha256, {"size": size, "links": []})
+        rel = os.path.relpath(path, self.base_dir)
+        if rel not in entry["links"]:
+            entry["links"].append(rel)
+        self._dirty = True
+        return freed
+
+    def save(self):
+        if not self._dirty:
+            return
+        os.makedirs(self.store_dir, exist_ok=True)
+        atomic_json_write(self.manifest_path,
+                          {"version": _MANIFEST_VERSION, "objects": self.objects})
+        self._dirty = False
+
+    def sweep(self, verify=False, prune=False):
+        """Deduplicate every year's reports and check the store against the manifest.
+
+        Reports not yet linked are hashed and stored (duplicates become
+        links). Stored objects are checked by size, and by SHA-256 when
+        ``verify`` is set. Links whose report is gone are dropped from the
+        manifest; with ``prune`` an object no report links to is deleted.
+        Returns a summary dict of counts.
+        """
+        summary = {"reports": 0, "linked": 0, "deduplicated": 0, "bytes_freed": 0,
+                   "stale_links": 0, "missing_objects": 0, "corrupt_objects": 0,
+                   "pruned": 0}
+        known = {rel for e in self.objects.values() for rel in e["links"]}
+        relink = []
+        for year in list_year_folders():
+            for rel_in_year, (size, _mtime) in scan_reports(year, include_archived=False).items():
+                summary["reports"] += 1
+                rel = os.path.join(year, rel_in_year)
+                if rel in known or not size:
+                    continue
+                freed = self.add(os.path.join(self.base_dir, rel))
+                summary["linked"] += 1
+                if freed:
+                    summary["deduplicated"] += 1
+                    summary["bytes_freed"] += freed
+
+        for sha256, entry in list(self.objects.items()):
+            obj = self.object_path(sha256)
+            try:
+                obj_stat = os.stat(obj)
+            except FileNotFoundError:
+                summary["missing_objects"] += 1
+                logging.warning(f"PDF store object missing: {sha256}")
+                continue
+            if (obj_stat.st_size != entry["size"]
+                    or (verify and file_sha256(obj) != sha256)):
+                summary["corrupt_objects"] += 1
+                logging.warning(f"PDF store object does not match its hash: {sha256}")
+                continue
+            live = []
+            for rel in entry["links"]:
+                try:
+                    st = os.stat(os.path.join(self.base_dir, rel))
+                except FileNotFoundError:
+                    summary["stale_links"] += 1
+                    continue
+                if (st.st_ino, st.st_dev) == (obj_stat.st_ino, obj_stat.st_dev):
+                    live.append(rel)
+                else:
+                    # Report was replaced by a plain file (e.g. re-downloaded)
+                    relink.append(rel)
+            if live != entry["links"]:
+                entry["links"] = live
+                self._dirty = True
+            if not live and prune:
+                os.remove(obj)
+                del self.objects[sha256]
+                summary["pruned"] += 1
+                self._dirty = True
+
+        for rel in relink:
+            freed = self.add(os.path.join(self.base_dir, rel))
+            summary["linked"] += 1
+            if freed:
+                summary["deduplicated"] += 1
+                summary["bytes_freed"] += freed
+        self.save()
+        return summary
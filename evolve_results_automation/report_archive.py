@@ -0,0 +1,206 @@
+"""Per-month zip archives for old report PDFs.
+
+Years of ``YYYY/reports/MM DD/*.pdf`` add up to tens of thousands of small
+files, which makes every directory scan, backup and copy of the app folder
+slow. ``archive_reports`` packs a year's reports into one
+``YYYY/reports/YYYY-MM.zip`` per month and removes the loose files.
+``YYYY/reports/archive_index.json`` maps each archived report
+(``MM DD/name.pdf``) to its zip, size and original mtime.
+
+Lookups stay transparent. ``scan_reports`` lists archived reports as if they
+were still on disk, ``download_pdf`` treats an archived report as already
+saved, ``open_report`` reads a report from either place (the ledger hashes
+archived reports through it), and the zips sit in the reports folder the
+GUI opens, where Explorer browses them like folders. A loose file
+always wins over an archived copy of the same report, and archiving a month
+again merges new loose files into its zip.
+
+PDFs are stored without recompression (they are compressed already), so a
+report is read straight out of its zip.
+"""
+import os
+import json
+import shutil
+import logging
+import zipfile
+from contextlib import contextmanager
+
+from .config import atomic_json_write, get_reports_base_for_year
+
+_INDEX_NAME = "archive_index.json"
+_INDEX_VERSION = 1
+
+# reports folder -> (index stat key, members); reloaded when the file changes
+_index_cache = {}
+
+
+def _index_path(reports_base):
+    return os.path.join(reports_base, _INDEX_NAME)
+
+
+def _load_index(reports_base):
+    """Return {"MM DD/name.pdf": [zip_name, size, mtime]} for a reports folder."""
+    path = _index_path(reports_base)
+    try:
+        st = os.stat(path)
+    except OSError:
+        _index_cache.pop(reports_base, None)
+        return {}
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    cached = _index_cache.get(reports_base)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    members = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == _INDEX_VERSION:
+            members = data.get("members", {})
+    except (OSError, ValueError, AttributeError) as e:
+        logging.debug(f"Ignoring unreadable report archive index {path}: {e}")
+    _index_cache[reports_base] = (key, members)
+    return members
+
+
+def _member_for(path):
+    """Split a report path into (reports folder, zip member name)."""
+    day_dir, name = os.path.split(path)
+    reports_base, day = os.path.split(day_dir)
+    return reports_base, f"{day}/{name}"
+
+
+def archived_location(path):
+    """Return (zip_path, member) if the report at ``path`` is archived, else None."""
+    reports_base, member = _member_for(path)
+    entry = _load_index(reports_base).get(member)
+    if entry is None:
+        return None
+    zip_path = os.path.join(reports_base, entry[0])
+    if not os.path.exists(zip_path):
+        return None
+    return zip_path, member
+
+
+def report_exists(path):
+    """True if the report is on disk (non-empty) or in its month's archive."""
+    try:
+        if os.path.getsize(path) > 0:
+            return True
+    except OSError:
+        pass
+    return archived_location(path) is not None
+
+
+@contextmanager
+def open_report(path):
+    """Open a report for binary reading, from disk or from its archive."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            yield f
+        return
+    location = archived_location(path)
+    if location is None:
+        raise FileNotFoundError(path)
+    zip_path, member = location
+    with zipfile.ZipFile(zip_path) as zf, zf.open(member) as f:
+        yield f
+
+
+def archived_reports(year):
+    """Return {"reports/MM DD/name.pdf": (size, mtime)} for a year's archived reports."""
+    reports_base = get_reports_base_for_year(year)
+    found = {}
+    for member, (zip_name, size, mtime) in _load_index(reports_base).items():
+        day, name = member.split("/", 1)
+        found[os.path.join("reports", day, name)] = (size, mtime)
+    return found
+
+
+# ── Packing ───────────────────────────────────────────────────────────────
+
+def _write_month_zip(zip_path, files):
+    """Write ``files`` [(member, path)] into ``zip_path``, keeping members of
+    an existing zip that are not being replaced. Atomic (tmp + replace) and
+    CRC-checked before the swap."""
+    tmp_path = zip_path + ".tmp"
+    replacing = {member for member, _ in files}
+    try:
+        with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_STORED) as out:
+            if os.path.exists(zip_path):
+                with zipfile.ZipFile(zip_path) as old:
+                    for info in old.infolist():
+                        if info.filename in replacing:
+                            continue
+                        with old.open(info) as src, out.open(info, "w") as dst:
+                            shutil.copyfileobj(src, dst)
+            for member, path in files:
+                out.write(path, member)
+        with zipfile.ZipFile(tmp_path) as check:
+            bad = check.testzip()
+        if bad is not None:
+            raise zipfile.BadZipFile(f"CRC mismatch for {bad}")
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def archive_reports(year, before=None):
+    """Pack a year's loose reports into per-month zips.
+
+    ``before`` is an optional ``(year, month)`` tuple; only months earlier
+    than it are packed (``None`` packs every month, for a closed year).
+    The zip and index are written before any loose file is removed, so an
+    interruption at worst leaves a report in both places. Returns a summary
+    dict with the number of months, files and bytes archived.
+    """
+    summary = {"months": 0, "files": 0, "bytes": 0}
+    year = int(year)
+    reports_base = get_reports_base_for_year(year)
+    by_month = {}
+    try:
+        day_dirs = sorted(d.name for d in os.scandir(reports_base) if d.is_dir())
+    except FileNotFoundError:
+        return summary
+    for day in day_dirs:
+        try:
+            month = int(day.split(" ", 1)[0])
+        except ValueError:
+            continue
+        if before is not None and (year, month) >= tuple(before):
+            continue
+        day_path = os.path.join(reports_base, day)
+        with os.scandir(day_path) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(".pdf") and entry.is_file():
+                    by_month.setdefault(month, []).append(
+                        (f"{day}/{entry.name}", entry.path, entry.stat()))
+
+    if not by_month:
+        return summary
+    index = dict(_load_index(reports_base))
+    for month, items in sorted(by_month.items()):
+        zip_name = f"{year}-{month:02d}.zip"
+        _write_month_zip(os.path.join(reports_base, zip_name),
+                         [(member, path) for member, path, _ in items])
+        for member, _, st in items:
+            index[member] = [zip_name, st.st_size, st.st_mtime]
+        atomic_json_write(_index_path(reports_base),
+                          {"version": _INDEX_VERSION, "members": index})
+        for member, path, st in items:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.debug(f"Could not remove archived report {path}: {e}")
+            summary["bytes"] += st.st_size
+        summary["months"] += 1
+        summary["files"] += len(items)
+        logging.info(f"Archived {len(items)} report(s) into {year}/reports/{zip_name}")
+
+    for day in day_dirs:
+        try:
+            os.rmdir(os.path.join(reports_base, day))
+        except OSError:
+            pass  # not empty (other files or a month we did not pack)
+    return summary
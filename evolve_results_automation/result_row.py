@@ -0,0 +1,180 @@
+"""Compact record type for one exam result row.
+
+Rows used to travel through the app as 20-key dicts of strings. A
+``ResultRow`` keeps the same data in a flat list ordered like
+``config.COLUMNS`` (plus an optional dict for any extra headers an admin
+added to the workbook), caches the parsed Completed date and the dedup
+digest, and still behaves like a dict for existing callers (``row[col]``,
+``row.get(col, "")``, ``dict(row)``, ``row.items()``).
+"""
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from .config import COLUMNS
+from .parsing_utils import row_digest
+
+_INDEX = {col: i for i, col in enumerate(COLUMNS)}
+_WIDTH = len(COLUMNS)
+_COMPLETED_IDX = _INDEX["Completed"]
+# Fields that feed unique_row_hash; changing one invalidates the cached digest
+_KEY_IDX = frozenset(_INDEX[f] for f in (
+    "Enrolment no.", "First name", "Last name", "Completed", "Test Name", "Result"))
+_UNSET = object()
+
+
+def parse_completed(value):
+    """Parse a dd/mm/yyyy Completed value. Returns datetime or None."""
+    try:
+        # Fast path for the zero-padded form the portal and the app write
+        if (len(value) == 10 and value[2] == "/" and value[5] == "/"
+                and value.replace("/", "").isdigit()):
+            return datetime(int(value[6:]), int(value[3:5]), int(value[:2]))
+        return datetime.strptime(value, "%d/%m/%Y")
+    except (ValueError, TypeError):
+        return None
+
+
+def completed_date(row):
+    """Completed date of a ResultRow or plain dict row (None if unparseable)."""
+    if isinstance(row, ResultRow):
+        return row.completed_date
+    return parse_completed(row.get("Completed", ""))
+
+
+def _clean(value):
+    return "" if value is None else str(value).strip()
+
+
+class ResultRow(MutableMapping):
+    """One result row with dict-style access, ordered like ``COLUMNS``.
+
+    Every ``COLUMNS`` key is always present (empty string when unknown), so
+    ``len(row)`` is at least ``len(COLUMNS)`` and iteration yields the
+    columns in sheet order. Values are stored as stripped strings.
+    """
+    __slots__ = ("_values", "_extra", "_completed", "_digest")
+
+    def __init__(self, data=None):
+        self._values = [""] * _WIDTH
+        self._extra = None
+        self._completed = _UNSET
+        self._digest = None
+        if data:
+            for key, value in data.items():
+                self[key] = value
+
+    @classmethod
+    def from_values(cls, values):
+        """Build from already-normalised strings in ``COLUMNS`` order."""
+        row = cls.__new__(cls)
+        values = list(values)
+        if len(values) != _WIDTH:
+            values = (values + [""] * _WIDTH)[:_WIDTH]
+        row._values = values
+        row._extra = None
+        row._completed = _UNSET
+        row._digest = None
+        return row
+
+    @classmethod
+    def coerce(cls, row):
+        """Return ``row`` unchanged if it is a ResultRow, otherwise wrap it."""
+        return row if isinstance(row, cls) else cls(row)
+
+    def __reduce__(self):
+        # The cached date and digest are left out (``_UNSET`` is compared by
+        # identity) and recomputed on the other side, e.g. in a worker process
+        return (_restore_row, (self._values, self._extra))
+
+    # ── Cached derived values ─────────────────────────────────────────
+    @property
+    def completed_date(self):
+        """Completed as a datetime (parsed once), or None if unparseable."""
+        if self._completed is _UNSET:
+            self._completed = parse_completed(self._values[_COMPLETED_IDX])
+        return self._completed
+
+    @property
+    def digest(self):
+        """Cached ``row_digest`` of this row's dedup key fields."""
+        if self._digest is None:
+            self._digest = row_digest(self)
+        return self._digest
+
+    # ── Mapping protocol ──────────────────────────────────────────────
+    def __getitem__(self, key):
+        idx = _INDEX.get(key)
+        if idx is not None:
+            return self._values[idx]
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        idx = _INDEX.get(key)
+        if idx is not None:
+            return self._values[idx]
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        value = _clean(value)
+        idx = _INDEX.get(key)
+        if idx is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+            return
+        self._values[idx] = value
+        if idx in _KEY_IDX:
+            self._digest = None
+            if idx == _COMPLETED_IDX:
+                self._completed = _UNSET
+
+    def __delitem__(self, key):
+        if key in _INDEX:
+            self[key] = ""
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in _INDEX or (self._extra is not None and key in self._extra)
+
+    def __iter__(self):
+        yield from COLUMNS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return _WIDTH + (len(self._extra) if self._extra else 0)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultRow):
+            return (self._values == other._values
+                    and (self._extra or {}) == (other._extra or {}))
+        if isinstance(other, dict):
+            return dict(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def copy(self):
+        row = ResultRow.from_values(self._values)
+        if self._extra:
+            row._extra = dict(self._extra)
+        return row
+
+    def __repr__(self):
+        return (f"ResultRow({self._values[_INDEX['First name']]!r} "
+                f"{self._values[_INDEX['Last name']]!r}, "
+                f"{self._values[_INDEX['Test Name']]!r}, "
+                f"{self._values[_COMPLETED_IDX]!r})")
+
+
+def _restore_row(values, extra):
+    row = ResultRow.from_values(values)
+    row._extra = extra
+    return row
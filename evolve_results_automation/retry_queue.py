@@ -0,0 +1,107 @@
+"""Persistent queue of PDF downloads that failed after their URL was known.
+
+When the browser has already resolved a report's DocumentStore URL but the
+download fails (network error, timeout, Stop pressed mid-download), the row
+and URL go into ``pdf_retry_queue.json`` with an attempt count and the
+earliest time of the next retry. The next run drains the due entries with
+direct URL fetches before any browser work, so those reports do not wait
+for a full scrape to navigate back to the row.
+
+Entries are dropped after ``_MAX_ATTEMPTS`` failures; the row stays pending
+in its workbook, so the normal scrape still picks it up if the link expired.
+A download cancelled by Stop before it started is queued (or left queued)
+without counting as an attempt.
+"""
+import os
+import json
+import time
+import logging
+
+from .config import atomic_json_write
+
+_VERSION = 1
+_MAX_ATTEMPTS = 5
+_RETRY_BASE = 600           # 10 minutes after the first failure
+_RETRY_CAP = 24 * 3600      # never wait more than a day
+
+
+def _retry_delay(attempts):
+    """Seconds until the next retry after ``attempts`` failures, capped."""
+    return min(_RETRY_CAP, _RETRY_BASE * (2 ** max(0, attempts - 1)))
+
+
+class RetryQueue:
+    """Failed downloads keyed by row digest, persisted to a JSON file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == _VERSION:
+                self.entries = data.get("entries", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logging.debug(f"Ignoring unreadable PDF retry queue: {e}")
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_failure(self, row, url, now=None):
+        """Record a failed attempt for ``row`` (a ResultRow) at ``url``."""
+        now = time.time() if now is None else now
+        key = str(row.digest)
+        entry = self.entries.get(key)
+        attempts = (entry["attempts"] if entry else 0) + 1
+        if attempts >= _MAX_ATTEMPTS:
+            logging.warning(f"Giving up on queued PDF for {row['First name']} "
+                            f"{row['Last name']} after {attempts} attempts")
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = {
+                "url": url,
+                "row": dict(row),
+                "attempts": attempts,
+                "next_retry": now + _retry_delay(attempts),
+            }
+        self._dirty = True
+
+    def add_cancelled(self, row, url, now=None):
+        """Queue ``row`` at ``url`` after its download was cancelled rather than
+        failed. Not counted as an attempt; an existing entry is left as it is."""
+        key = str(row.digest)
+        if key in self.entries:
+            return
+        self.entries[key] = {
+            "url": url,
+            "row": dict(row),
+            "attempts": 0,
+            "next_retry": time.time() if now is None else now,
+        }
+        self._dirty = True
+
+    def remove(self, digest):
+        if self.entries.pop(str(digest), None) is not None:
+            self._dirty = True
+
+    def due(self, now=None):
+        """Return [(row_dict, url)] for entries whose retry time has passed."""
+        now = time.time() if now is None else now
+        return [(e["row"], e["url"]) for e in self.entries.values()
+                if e.get("next_retry", 0) <= now]
+
+    def save(self):
+        """Write the queue if it changed (removes the file once empty)."""
+        if not self._dirty:
+            return
+        try:
+            if self.entries:
+                atomic_json_write(self.path, {"version": _VERSION, "entries": self.entries})
+            elif os.path.exists(self.path):
+                os.remove(self.path)
+            self._dirty = False
+        except OSError as e:
+            logging.debug(f"Could not save PDF retry queue: {e}")
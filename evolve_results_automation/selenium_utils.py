@@ -8,7 +8,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException
 from .config import RESULTS_URL
-from .parsing_utils import unique_row_hash
+from .result_row import ResultRow
 
 # JS snippet to find the last (most recently opened) calendar in the DOM
 _JS_LAST_CALENDAR = "var calendars = document.querySelectorAll('.dx-calendar'); var calendar = calendars[calendars.length - 1];"
@@ -112,9 +112,9 @@ def parse_results_table(driver, existing_hashes):
                 cells = row.find_elements(By.TAG_NAME, "td")
                 if not any(cell.text.strip() for cell in cells) or len(cells) < 12:
                     continue
-                data = {
+                data = ResultRow({
                     col: cells[ci].text.strip() for col, ci in COL_INDEX.items()
-                }
+                })
                 data.update({
                     "Scraping date/time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "PDF report save time": "",
@@ -126,7 +126,7 @@ def parse_results_table(driver, existing_hashes):
                     "Certificate By": "",
                     "Comments": ""
                 })
-                h = unique_row_hash(data)
+                h = data.digest
                 page_hashes.add(h)
                 if h in existing_hashes:
                     continue
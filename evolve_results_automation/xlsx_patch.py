@@ -0,0 +1,450 @@
+"""Swap the dashboard sheets of a year workbook at the zip level.
+
+Refreshing the Analytics tab used to rewrite the whole ``.xlsx``, Results
+sheet included, so its cost grew with the row count. ``replace_sheets``
+instead takes a small package holding only the new Analytics and
+``_ChartData`` sheets (saved by openpyxl from an otherwise empty workbook)
+and grafts their worksheet, drawing and chart parts into the existing
+file:
+
+- the old dashboard sheets and every part only they reference are dropped
+  (and ``calcChain.xml``, which Excel rebuilds);
+- the new parts are renamed where a name is taken and their relationships
+  are rewritten to absolute targets;
+- the cell formats and named styles they use are appended to
+  ``styles.xml`` (reusing identical fonts, fills, borders and formats, and
+  named styles of the same name, already there) and their ``s=`` indexes
+  remapped;
+- ``workbook.xml``, its relationships and ``[Content_Types].xml`` are
+  updated to match.
+
+The Results worksheet, shared strings and everything else are copied
+without being parsed, so admin edits made in Excel survive byte for byte.
+``append_sheets`` does the same without dropping anything, to assemble the
+combined workbook from year tabs built in worker processes.
+
+Like ``xlsx_reader``, anything unexpected raises ``ValueError`` (or a zip/XML
+error) and ``excel_utils`` falls back to writing the whole workbook, so this
+module only has to handle the layouts this app and Excel actually write.
+"""
+import os
+import re
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+_RELATIONSHIP_TAG = f"{{{_PKG_REL_NS}}}Relationship"
+_OVERRIDE_TAG = f"{{{_CT_NS}}}Override"
+_DEFAULT_TAG = f"{{{_CT_NS}}}Default"
+_SHEET_TAG = f"{{{_MAIN_NS}}}sheet"
+_WORKSHEET_TYPE = _REL_NS + "/worksheet"
+_CALC_CHAIN_TYPE = _REL_NS + "/calcChain"
+
+_WORKBOOK = "xl/workbook.xml"
+_WORKBOOK_RELS = "xl/_rels/workbook.xml.rels"
+_CONTENT_TYPES = "[Content_Types].xml"
+_STYLES = "xl/styles.xml"
+
+_FIRST_CUSTOM_NUMFMT = 164
+
+# A cell pointing into sharedStrings.xml, which only the base's copy survives
+_SHARED_STRING_RE = re.compile(r'<c\b[^>]*?\st="s"')
+
+
+# ── Package relationships ─────────────────────────────────────────────────
+
+def _rels_path(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", name + ".rels")
+
+
+def _resolve(source_part, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _read_rels(archive, part):
+    """Relationship elements of ``part``, or [] if it has none."""
+    try:
+        data = archive.read(_rels_path(part))
+    except KeyError:
+        return []
+    return list(ET.fromstring(data).iter(_RELATIONSHIP_TAG))
+
+
+def _reachable(archive, parts):
+    """``parts`` plus every internal part they reference, transitively."""
+    seen = set()
+    stack = list(parts)
+    while stack:
+        part = stack.pop()
+        if part in seen:
+            continue
+        seen.add(part)
+        for rel in _read_rels(archive, part):
+            if rel.get("TargetMode") != "External":
+                stack.append(_resolve(part, rel.get("Target", "")))
+    return seen
+
+
+def _free_name(part, taken):
+    """``part`` if unused, else the same name with the lowest free number."""
+    if part not in taken:
+        return part
+    folder, name = posixpath.split(part)
+    stem, ext = posixpath.splitext(name)
+    stem = stem.rstrip("0123456789")
+    n = 1
+    while True:
+        candidate = posixpath.join(folder, f"{stem}{n}{ext}")
+        if candidate not in taken:
+            return candidate
+        n += 1
+
+
+def _serialize(root, namespace):
+    """Write a flat package part (relationships, content types)."""
+    def local(tag):
+        return tag.rsplit("}", 1)[-1]
+    out = ['<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n',
+           f'<{local(root.tag)} xmlns="{namespace}">']
+    for child in root:
+        attrs = "".join(f" {k}={quoteattr(v)}" for k, v in child.attrib.items())
+        out.append(f"<{local(child.tag)}{attrs}/>")
+    out.append(f"</{local(root.tag)}>")
+    return "".join(out).encode("utf-8")
+
+
+# ── Workbook sheet list ───────────────────────────────────────────────────
+
+_SHEETS_RE = re.compile(r"<sheets>(.*?)</sheets>", re.S)
+_SHEET_RE = re.compile(r"<sheet\b[^>]*?/>")
+_ATTR_RE = r'\b{}="([^"]*)"'
+
+
+def _attr(element, name):
+    m = re.search(_ATTR_RE.format(re.escape(name)), element)
+    return m.group(1) if m else None
+
+
+def _rel_prefix(workbook_xml):
+    m = re.search(r'xmlns:(\w+)="' + re.escape(_REL_NS) + '"', workbook_xml)
+    if not m:
+        raise ValueError("workbook.xml has no relationships namespace")
+    return m.group(1)
+
+
+def _target_sheets(workbook_xml, rel_prefix):
+    """[(element, name, sheetId, r:id)] from an unprefixed ``<sheets>`` block."""
+    m = _SHEETS_RE.search(workbook_xml)
+    if not m:
+        raise ValueError("workbook.xml has no <sheets> element")
+    sheets = []
+    for element in _SHEET_RE.findall(m.group(1)):
+        sheets.append((element, _attr(element, "name"), int(_attr(element, "sheetId")),
+                       _attr(element, f"{rel_prefix}:id")))
+    return sheets
+
+
+def _drop_defined_names(workbook_xml, removed_names):
+    """Remove defined names scoped to or pointing at the removed sheets
+    (the kept Results sheet is always first, so local ids above 0 go)."""
+    def keep(m):
+        element = m.group(0)
+        local = _attr(element, "localSheetId")
+        if local is not None and local != "0":
+            return ""
+        body = element[element.index(">") + 1:]
+        if any(f"{n}!" in body or f"{n}'!" in body for n in removed_names):
+            return ""
+        return element
+    workbook_xml = re.sub(r"<definedName\b[^>]*>.*?</definedName>", keep,
+                          workbook_xml, flags=re.S)
+    return re.sub(r"<definedNames>\s*</definedNames>", "", workbook_xml)
+
+
+# ── Styles ────────────────────────────────────────────────────────────────
+# Only the tables a cell format refers to are merged. Child elements are
+# compared as serialized strings and named styles by name, so formats
+# written by this app are reused on every refresh and styles.xml does not
+# grow.
+
+_TABLES = (("numFmts", "numFmt"), ("fonts", "font"), ("fills", "fill"),
+           ("borders", "border"), ("cellStyleXfs", "xf"), ("cellXfs", "xf"),
+           ("cellStyles", "cellStyle"))
+# Where to insert a table the target lacks: before the first of these
+_FOLLOWERS = {"numFmts": ("fonts",), "cellStyleXfs": ("cellXfs",),
+              "cellStyles": ("dxfs", "tableStyles", "colors", "extLst")}
+
+
+def _table(xml, table, child):
+    """(match or None, [child element strings]) for a styles table."""
+    m = re.search(rf"<{table}\b[^>]*?(?:/>|>(.*?)</{table}>)", xml, re.S)
+    if m is None:
+        return None, []
+    body = m.group(1) or ""
+    return m, re.findall(rf"<{child}\b[^>]*?(?:/>|>.*?</{child}>)", body, re.S)
+
+
+def _set_table(xml, table, child, children):
+    match, _old = _table(xml, table, child)
+    if match is not None:
+        open_tag = re.match(rf"<{table}\b[^>]*?(?=/?>)", match.group(0)).group(0)
+        open_tag = re.sub(r'\scount="\d+"', "", open_tag)
+        element = f'{open_tag} count="{len(children)}">{"".join(children)}</{table}>'
+        return xml[:match.start()] + element + xml[match.end():]
+    if not children:
+        return xml
+    element = f'<{table} count="{len(children)}">{"".join(children)}</{table}>'
+    for follower in _FOLLOWERS.get(table, ()):
+        at = xml.find(f"<{follower}")
+        if at != -1:
+            return xml[:at] + element + xml[at:]
+    raise ValueError(f"styles.xml has no place for <{table}>")
+
+
+def _set_attr(element, name, value):
+    return re.sub(_ATTR_RE.format(re.escape(name)), f'{name}="{value}"', element, count=1)
+
+
+def _merge_styles(target_xml, source_xml):
+    """Append the source's cell formats and named styles to the target styles.
+
+    Returns (new target styles.xml, {source xf index: target xf index}).
+    """
+    if f'<styleSheet xmlns="{_MAIN_NS}"' not in target_xml:
+        raise ValueError("styles.xml does not use the default main namespace")
+    merged = {table: _table(target_xml, table, child)[1] for table, child in _TABLES}
+    source = {table: _table(source_xml, table, child)[1] for table, child in _TABLES}
+    if not merged["cellXfs"]:
+        raise ValueError("styles.xml has no cell formats")
+
+    def index_of(table, element):
+        children = merged[table]
+        try:
+            return children.index(element)
+        except ValueError:
+            children.append(element)
+            return len(children) - 1
+
+    fmt_ids = {}
+    codes = {_attr(nf, "formatCode"): int(_attr(nf, "numFmtId")) for nf in merged["numFmts"]}
+    for nf in source["numFmts"]:
+        code = _attr(nf, "formatCode")
+        if code not in codes:
+            codes[code] = max([_FIRST_CUSTOM_NUMFMT - 1, *codes.values()]) + 1
+            merged["numFmts"].append(_set_attr(nf, "numFmtId", codes[code]))
+        fmt_ids[_attr(nf, "numFmtId")] = codes[code]
+    ids = {attr: [index_of(table, el) for el in source[table]]
+           for attr, table in (("fontId", "fonts"), ("fillId", "fills"),
+                               ("borderId", "borders"))}
+
+    def remap(xf):
+        for attr, mapping in ids.items():
+            value = _attr(xf, attr)
+            if value is not None:
+                xf = _set_attr(xf, attr, mapping[int(value)])
+        num_fmt = _attr(xf, "numFmtId")
+        if num_fmt in fmt_ids:
+            xf = _set_attr(xf, "numFmtId", fmt_ids[num_fmt])
+        return xf
+
+    # Named styles the target already has (Normal, or the dashboard styles
+    # from an earlier refresh) are reused; new ones bring their xf along
+    style_ids = {}
+    named = {_attr(cs, "name"): int(_attr(cs, "xfId")) for cs in merged["cellStyles"]}
+    for cs in source["cellStyles"]:
+        name, xf_id = _attr(cs, "name"), _attr(cs, "xfId")
+        if name not in named:
+            merged["cellStyleXfs"].append(remap(source["cellStyleXfs"][int(xf_id)]))
+            named[name] = len(merged["cellStyleXfs"]) - 1
+            merged["cellStyles"].append(_set_attr(cs, "xfId", named[name]))
+        style_ids[xf_id] = named[name]
+
+    xf_map = {}
+    for i, xf in enumerate(source["cellXfs"]):
+        xf = _set_attr(remap(xf), "xfId", style_ids.get(_attr(xf, "xfId"), 0))
+        xf_map[i] = index_of("cellXfs", xf)
+
+    for table, child in _TABLES:
+        target_xml = _set_table(target_xml, table, child, merged[table])
+    return target_xml, xf_map
+
+
+def _remap_styles(sheet_xml, xf_map):
+    """Point a worksheet's ``s=``/``style=`` attributes at the merged formats."""
+    def sub(m):
+        return f"{m.group(1)}{xf_map[int(m.group(2))]}{m.group(3)}"
+    sheet_xml = re.sub(r'(<(?:c|row)\b[^>]*?\ss=")(\d+)(")', sub, sheet_xml)
+    return re.sub(r'(<col\b[^>]*?\sstyle=")(\d+)(")', sub, sheet_xml)
+
+
+# ── Grafting ──────────────────────────────────────────────────────────────
+
+def _graft(base, sources, out_path, keep=None):
+    """Write ``base`` plus the sheets of each source package (after its first,
+    placeholder sheet) to ``out_path``.
+
+    With ``keep`` (a sheet name) only that sheet of ``base`` is kept and it
+    must be the first; otherwise every base sheet is kept and the new ones
+    are appended.
+    """
+    with zipfile.ZipFile(base) as old:
+        workbook_xml = old.read(_WORKBOOK).decode("utf-8")
+        prefix = _rel_prefix(workbook_xml)
+        sheets = _target_sheets(workbook_xml, prefix)
+        if keep is not None and (not sheets or sheets[0][1] != keep):
+            raise ValueError(f"first sheet is not {keep!r}")
+        kept_sheets = sheets[:1] if keep is not None else sheets
+        gone_sheets = sheets[len(kept_sheets):]
+
+        wb_rels = ET.fromstring(old.read(_WORKBOOK_RELS))
+        rel_parts = {rel.get("Id"): _resolve(_WORKBOOK, rel.get("Target", ""))
+                     for rel in wb_rels.iter(_RELATIONSHIP_TAG)}
+        names = set(old.namelist())
+        kept = _reachable(old, [rel_parts[rid] for _e, _n, _s, rid in kept_sheets])
+        removed = _reachable(old, [rel_parts[rid] for _e, _n, _s, rid in gone_sheets])
+        for rel in list(wb_rels):
+            if rel.get("Type") == _CALC_CHAIN_TYPE:
+                removed.add(rel_parts[rel.get("Id")])
+                wb_rels.remove(rel)
+            elif rel.get("Id") in {rid for _e, _n, _s, rid in gone_sheets}:
+                wb_rels.remove(rel)
+        removed -= kept
+        dropped = removed | {_rels_path(p) for p in removed} & names
+        taken = names - dropped
+
+        styles_xml = old.read(_STYLES).decode("utf-8")
+        types = ET.fromstring(old.read(_CONTENT_TYPES))
+        for override in list(types.iter(_OVERRIDE_TAG)):
+            if override.get("PartName", "").lstrip("/") in dropped:
+                types.remove(override)
+        defaults = {d.get("Extension").lower() for d in types.iter(_DEFAULT_TAG)}
+        used_ids = {rel.get("Id") for rel in wb_rels}
+        next_sheet_id = max([0, *(s[2] for s in sheets)]) + 1
+        elements = [element for element, _n, _s, _r in kept_sheets]
+        written = {}
+
+        # New sheets and their parts, renamed clear of what stays
+        for source in sources:
+            with zipfile.ZipFile(source) as src:
+                src_wb = ET.fromstring(src.read(_WORKBOOK))
+                # Names scoped to the skipped first sheet stay behind with it
+                if any(dn.get("localSheetId") not in (None, "0")
+                       for dn in src_wb.iter(f"{{{_MAIN_NS}}}definedName")):
+                    raise ValueError("source has sheet-scoped defined names")
+                src_rels = {rel.get("Id"): _resolve(_WORKBOOK, rel.get("Target", ""))
+                            for rel in ET.fromstring(src.read(_WORKBOOK_RELS))
+                            .iter(_RELATIONSHIP_TAG)}
+                new_sheets = [(sh.get("name"), sh.get("state"),
+                               src_rels[sh.get(f"{{{_REL_NS}}}id")])
+                              for sh in src_wb.iter(_SHEET_TAG)][1:]
+                sheet_parts = {part for _n, _s, part in new_sheets}
+                src_parts = sorted(_reachable(src, sheet_parts))
+                renamed = {}
+                for part in src_parts:
+                    renamed[part] = _free_name(part, taken)
+                    taken.add(renamed[part])
+
+                styles_xml, xf_map = _merge_styles(styles_xml,
+                                                   src.read(_STYLES).decode("utf-8"))
+                for part in src_parts:
+                    data = src.read(part)
+                    if part in sheet_parts:
+                        data = data.decode("utf-8")
+                        if _SHARED_STRING_RE.search(data):
+                            raise ValueError(f"{part} uses shared strings")
+                        data = _remap_styles(data, xf_map).encode("utf-8")
+                    written[renamed[part]] = data
+                    rels = _read_rels(src, part)
+                    if rels:
+                        root = ET.Element(f"{{{_PKG_REL_NS}}}Relationships")
+                        for rel in rels:
+                            if rel.get("TargetMode") != "External":
+                                rel.set("Target",
+                                        "/" + renamed[_resolve(part, rel.get("Target"))])
+                            root.append(rel)
+                        written[_rels_path(renamed[part])] = _serialize(root, _PKG_REL_NS)
+
+                for name, state, part in new_sheets:
+                    n = 1
+                    while f"rId{n}" in used_ids:
+                        n += 1
+                    used_ids.add(f"rId{n}")
+                    ET.SubElement(wb_rels, _RELATIONSHIP_TAG, Type=_WORKSHEET_TYPE,
+                                  Target="/" + renamed[part], Id=f"rId{n}")
+                    state_attr = f' state="{state}"' if state else ""
+                    elements.append(f'<sheet name={quoteattr(name)} sheetId="{next_sheet_id}"'
+                                    f'{state_attr} {prefix}:id="rId{n}"/>')
+                    next_sheet_id += 1
+
+                src_types = ET.fromstring(src.read(_CONTENT_TYPES))
+                overrides = {o.get("PartName").lstrip("/"): o.get("ContentType")
+                             for o in src_types.iter(_OVERRIDE_TAG)}
+                for d in src_types.iter(_DEFAULT_TAG):
+                    if d.get("Extension").lower() not in defaults:
+                        defaults.add(d.get("Extension").lower())
+                        types.insert(0, d)
+                for part in src_parts:
+                    if part in overrides:
+                        ET.SubElement(types, _OVERRIDE_TAG, PartName="/" + renamed[part],
+                                      ContentType=overrides[part])
+
+        # workbook.xml, its relationships, the content types and styles
+        m = _SHEETS_RE.search(workbook_xml)
+        workbook_xml = (workbook_xml[:m.start()] + f"<sheets>{''.join(elements)}</sheets>"
+                        + workbook_xml[m.end():])
+        if gone_sheets:
+            workbook_xml = _drop_defined_names(workbook_xml, [s[1] for s in gone_sheets])
+        written[_WORKBOOK] = workbook_xml.encode("utf-8")
+        written[_WORKBOOK_RELS] = _serialize(wb_rels, _PKG_REL_NS)
+        written[_CONTENT_TYPES] = _serialize(types, _CT_NS)
+        written[_STYLES] = styles_xml.encode("utf-8")
+
+        tmp = out_path + ".tmp"
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as out:
+                # Untouched parts (the Results sheet among them) are copied as-is
+                for info in old.infolist():
+                    if info.filename in dropped:
+                        continue
+                    data = written.pop(info.filename, None)
+                    out.writestr(info, old.read(info) if data is None else data)
+                for part, data in written.items():
+                    out.writestr(part, data)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    os.replace(tmp, out_path)
+
+
+# ── Public entry-points ───────────────────────────────────────────────────
+
+def replace_sheets(filepath, source, keep="Results"):
+    """Replace every sheet of ``filepath`` except ``keep`` with the sheets of
+    the ``source`` package (a path or file object) after its first one.
+
+    ``keep`` must be the first sheet of ``filepath`` and ``source`` must
+    have been written by openpyxl (inline strings, no defined names for the
+    new sheets). The file is rewritten atomically via ``.tmp`` + replace.
+    """
+    _graft(filepath, [source], filepath, keep=keep)
+
+
+def append_sheets(base, sources, out_path):
+    """Write ``base`` (a path or file object) to ``out_path`` with the sheets
+    of every package in ``sources`` appended, in order, each without its
+    first sheet. Used to assemble the combined analytics workbook from
+    year tabs built in separate processes, and to carry a year workbook's
+    dashboard across a save of its Results sheet. Atomic, like
+    ``replace_sheets``.
+    """
+    _graft(base, sources, out_path)
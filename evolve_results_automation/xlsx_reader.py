@@ -0,0 +1,280 @@
+"""Streaming reader for the Results sheet of a year workbook.
+
+Reads the worksheet XML and shared strings straight out of the ``.xlsx``
+zip with ``iterparse`` and yields plain value tuples, the same shape that
+openpyxl's ``iter_rows(values_only=True)`` produces in read-only mode
+(including its padding of short and missing rows). No cell objects are
+created, which makes loading a large year several times faster.
+
+Anything unexpected raises, and ``excel_utils.load_existing_results``
+falls back to openpyxl, so this module only has to handle the workbooks
+that this app and Excel actually write.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from openpyxl.styles.numbers import (
+    builtin_format_code, is_date_format, is_timedelta_format
+)
+from openpyxl.utils.cell import coordinate_to_tuple, range_boundaries
+from openpyxl.utils.datetime import (
+    CALENDAR_MAC_1904, WINDOWS_EPOCH, from_excel, from_ISO8601
+)
+
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_SHARED_STRINGS_TYPE = _REL_NS + "/sharedStrings"
+_STYLES_TYPE = _REL_NS + "/styles"
+
+_WORKSHEET_TAG = f"{{{_MAIN_NS}}}worksheet"
+_DIMENSION_TAG = f"{{{_MAIN_NS}}}dimension"
+_SHEET_DATA_TAG = f"{{{_MAIN_NS}}}sheetData"
+_ROW_TAG = f"{{{_MAIN_NS}}}row"
+_CELL_TAG = f"{{{_MAIN_NS}}}c"
+_VALUE_TAG = f"{{{_MAIN_NS}}}v"
+_INLINE_TAG = f"{{{_MAIN_NS}}}is"
+_SI_TAG = f"{{{_MAIN_NS}}}si"
+_T_TAG = f"{{{_MAIN_NS}}}t"
+_R_TAG = f"{{{_MAIN_NS}}}r"
+
+
+def _text_content(node):
+    """Plain ``<t>`` text plus the text of every rich-text ``<r>`` run.
+
+    Phonetic runs (``<rPh>``) are ignored, as openpyxl does.
+    """
+    parts = []
+    for child in node:
+        if child.tag == _T_TAG:
+            parts.append(child.text or "")
+        elif child.tag == _R_TAG:
+            t = child.find(_T_TAG)
+            if t is not None:
+                parts.append(t.text or "")
+    return "".join(parts)
+
+
+def _cast_number(value):
+    """Convert a numeric cell string to int or float (same rule as openpyxl)."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _workbook_parts(archive):
+    """Return (sheet_paths, shared_strings_path, styles_path, epoch).
+
+    ``sheet_paths`` maps sheet name to its zip member name.
+    """
+    rels = {}
+    rel_types = {}
+    rels_root = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels_root.iter(f"{{{_PKG_REL_NS}}}Relationship"):
+        target = rel.get("Target", "")
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join("xl", target))
+        rels[rel.get("Id")] = path
+        rel_types.setdefault(rel.get("Type"), path)
+
+    wb_root = ET.fromstring(archive.read("xl/workbook.xml"))
+    if wb_root.tag != f"{{{_MAIN_NS}}}workbook":
+        raise ValueError(f"Unsupported workbook namespace: {wb_root.tag}")
+
+    epoch = WINDOWS_EPOCH
+    pr = wb_root.find(f"{{{_MAIN_NS}}}workbookPr")
+    if pr is not None and pr.get("date1904", "").lower() in ("1", "true"):
+        epoch = CALENDAR_MAC_1904
+
+    sheet_paths = {}
+    for sheet in wb_root.iter(f"{{{_MAIN_NS}}}sheet"):
+        rid = sheet.get(f"{{{_REL_NS}}}id")
+        if rid in rels:
+            sheet_paths[sheet.get("name")] = rels[rid]
+
+    return (sheet_paths, rel_types.get(_SHARED_STRINGS_TYPE),
+            rel_types.get(_STYLES_TYPE), epoch)
+
+
+def _read_shared_strings(archive, path):
+    if not path or path not in archive.namelist():
+        return []
+    strings = []
+    with archive.open(path) as src:
+        for _event, node in ET.iterparse(src):
+            if node.tag == _SI_TAG:
+                strings.append(_text_content(node).replace("x005F_", ""))
+                node.clear()
+    return strings
+
+
+def _read_date_styles(archive, path):
+    """Return (date_style_ids, timedelta_style_ids) from ``styles.xml``."""
+    if not path or path not in archive.namelist():
+        return set(), set()
+    root = ET.fromstring(archive.read(path))
+    custom = {}
+    num_fmts = root.find(f"{{{_MAIN_NS}}}numFmts")
+    if num_fmts is not None:
+        for nf in num_fmts:
+            custom[int(nf.get("numFmtId"))] = nf.get("formatCode")
+
+    date_ids, timedelta_ids = set(), set()
+    cell_xfs = root.find(f"{{{_MAIN_NS}}}cellXfs")
+    if cell_xfs is None:
+        return date_ids, timedelta_ids
+    for idx, xf in enumerate(cell_xfs):
+        fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(fmt_id)
+        if is_date_format(fmt):
+            date_ids.add(idx)
+        if is_timedelta_format(fmt):
+            timedelta_ids.add(idx)
+    return date_ids, timedelta_ids
+
+
+class _SheetParser:
+    """Turns ``<row>`` elements into lists of (column, value) pairs."""
+
+    def __init__(self, shared_strings, date_ids, timedelta_ids, epoch):
+        self.shared_strings = shared_strings
+        self.date_ids = date_ids
+        self.timedelta_ids = timedelta_ids
+        self.epoch = epoch
+        self.row_counter = 0
+        self._columns = {}
+
+    def _column_index(self, coordinate):
+        """Column number of a cell reference such as ``"T20001"`` (cached by letters)."""
+        letters = coordinate.rstrip("0123456789")
+        col = self._columns.get(letters)
+        if col is None:
+            col = self._columns[letters] = coordinate_to_tuple(coordinate)[1]
+        return col
+
+    def parse_row(self, row):
+        r = row.get("r")
+        if r is not None:
+            try:
+                self.row_counter = int(r)
+            except ValueError:
+                val = float(r)
+                if not val.is_integer():
+                    raise ValueError(f"{r} is not a valid row number")
+                self.row_counter = int(val)
+        else:
+            self.row_counter += 1
+
+        col_counter = 0
+        cells = []
+        for c in row:
+            if c.tag != _CELL_TAG:
+                continue
+            coordinate = c.get("r")
+            if coordinate:
+                col_counter = self._column_index(coordinate)
+            else:
+                col_counter += 1
+            cells.append((col_counter, self._cell_value(c)))
+        return self.row_counter, cells
+
+    def _cell_value(self, c):
+        data_type = c.get("t", "n")
+        if data_type == "inlineStr":
+            inline = c.find(_INLINE_TAG)
+            return _text_content(inline) if inline is not None else None
+
+        value = c.findtext(_VALUE_TAG, None) or None
+        if value is None:
+            return None
+        if data_type == "n":
+            value = _cast_number(value)
+            style_id = int(c.get("s", 0))
+            if style_id in self.date_ids:
+                try:
+                    return from_excel(value, self.epoch,
+                                      timedelta=style_id in self.timedelta_ids)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return value
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "d":
+            return from_ISO8601(value)
+        # "str" (formula result) and "e" (error) keep their text
+        return value
+
+
+def sheet_names(filepath):
+    """Return the sheet names of an .xlsx without loading any sheet."""
+    with zipfile.ZipFile(filepath) as archive:
+        return list(_workbook_parts(archive)[0])
+
+
+def iter_sheet_values(filepath, sheet_name="Results"):
+    """Yield value tuples for every row of ``sheet_name``, header included.
+
+    Matches ``ReadOnlyWorksheet.iter_rows(values_only=True)`` with
+    ``data_only=True``: rows are padded to the sheet's declared dimension,
+    gaps between rows are filled with empty rows, and date-formatted numbers
+    come back as ``datetime``. Raises ``KeyError`` if the sheet is missing
+    and ``ValueError`` for layouts this reader does not support.
+    """
+    with zipfile.ZipFile(filepath) as archive:
+        sheet_paths, ss_path, styles_path, epoch = _workbook_parts(archive)
+        sheet_path = sheet_paths[sheet_name]
+        date_ids, timedelta_ids = _read_date_styles(archive, styles_path)
+        parser = _SheetParser(_read_shared_strings(archive, ss_path),
+                              date_ids, timedelta_ids, epoch)
+
+        max_col = max_row = None
+        empty_row = ()
+        counter = 1
+        idx = 1
+        checked_ns = False
+        with archive.open(sheet_path) as src:
+            for _event, elem in ET.iterparse(src):
+                if not checked_ns:
+                    # First completed element is a direct child of <worksheet>
+                    if not elem.tag.startswith(f"{{{_MAIN_NS}}}"):
+                        raise ValueError(f"Unsupported worksheet namespace: {elem.tag}")
+                    checked_ns = True
+                tag = elem.tag
+                if tag == _ROW_TAG:
+                    idx, cells = parser.parse_row(elem)
+                    elem.clear()
+                    if max_row is not None and idx > max_row:
+                        break
+                    for _ in range(counter, idx):
+                        counter += 1
+                        yield empty_row
+                    if counter <= idx:
+                        counter += 1
+                        yield _pad_row(cells, max_col)
+                elif tag == _DIMENSION_TAG:
+                    _min_col, _min_row, max_col, max_row = range_boundaries(elem.get("ref"))
+                    if max_col is not None:
+                        empty_row = (None,) * max_col
+                elif tag == _SHEET_DATA_TAG:
+                    break
+
+        if max_row is not None and max_row < idx:
+            for _ in range(counter, max_row + 1):
+                yield empty_row
+
+
+def _pad_row(cells, max_col):
+    """Place (column, value) pairs into a fixed-width tuple."""
+    if not cells and not max_col:
+        return ()
+    width = max_col or cells[-1][0]
+    values = [None] * width
+    for column, value in cells:
+        if 1 <= column <= width:
+            values[column - 1] = value
+    return tuple(values)
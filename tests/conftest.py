@@ -0,0 +1,12 @@
+"""Shared pytest fixtures."""
+import pytest
+
+import evolve_results_automation.config as config
+
+
+@pytest.fixture
+def base_dir(tmp_path, monkeypatch):
+    """Point ``config.BASE_DIR`` at a temp folder so the real year folders
+    are never touched."""
+    monkeypatch.setattr(config, "BASE_DIR", str(tmp_path))
+    return tmp_path
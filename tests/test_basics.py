@@ -18,9 +18,16 @@ import pytest
 import evolve_results_automation.main as main_mod
 from evolve_results_automation.main import compute_pdf_cutoff_date
 from evolve_results_automation.parsing_utils import (
-    unique_row_hash, report_filename
+    unique_row_hash, row_digest, report_filename
 )
-from evolve_results_automation.excel_utils import format_ddmmyyyy
+from evolve_results_automation.excel_utils import (
+    format_ddmmyyyy, _build_results_workbook
+)
+from evolve_results_automation.analytics_stats import (
+    AttemptIndex, RowStats, StoredAttemptIndex, YearSummary, merge_stats,
+    merge_summary, summarize
+)
+from evolve_results_automation.result_row import ResultRow
 from evolve_results_automation.secure_credentials import SecureCredentialManager
 
 
@@ -81,6 +88,122 @@ def test_unique_row_hash_case_insensitive():
     assert unique_row_hash(lower) == unique_row_hash(upper)
 
 
+def test_row_digest_compact_and_consistent():
+    """Digest is a 64-bit int that follows unique_row_hash's normalisation:
+    case/whitespace variants match, a different enrolment does not."""
+    d = row_digest(_ROW)
+    assert isinstance(d, int) and 0 <= d < 2 ** 64
+    assert row_digest(dict(_ROW, Result=" PASS ")) == d
+    assert row_digest(dict(_ROW, **{"Enrolment no.": "99999999"})) != d
+
+
+def test_result_row_behaves_like_dict():
+    """ResultRow keeps dict-style access and invalidates cached date/digest."""
+    row = ResultRow(_ROW)
+    assert row["Completed"] == _ROW["Completed"]
+    assert row.get("Comments", "x") == ""
+    assert row.get("Not a column", "x") == "x"
+    assert dict(row) == {**{k: "" for k in row}, **_ROW}
+    assert row.digest == row_digest(_ROW)
+    assert row.completed_date == datetime.strptime(_ROW["Completed"], "%d/%m/%Y")
+
+    row["Completed"] = "01/02/2025"
+    assert row.completed_date == datetime(2025, 2, 1)
+    assert row.digest == row_digest(dict(_ROW, Completed="01/02/2025"))
+    row["Completed"] = "not a date"
+    assert row.completed_date is None
+
+
+def test_row_stats_single_pass():
+    """One RowStats pass yields every per-section dashboard figure."""
+    def r(enrol, test, result, pct, dur, completed="15/06/2026"):
+        return ResultRow({"Enrolment no.": enrol, "Test Name": test, "Result": result,
+                          "Percent": pct, "Duration": dur, "Completed": completed})
+    rows = [r("1", "Maths", "Pass", "80%", "60"), r("2", "Maths", "Fail", "40%", "60"),
+            r("2", "Maths", "Pass", "", "90", "02/07/2026"), r("", "English", "Pass", "x", "x")]
+    stats = RowStats(rows)
+    assert (stats.total, stats.passed, stats.failed, stats.customers) == (4, 3, 1, 2)
+    assert stats.avg_score == 60.0
+    assert stats.centres == {"Unknown Centre": 4}
+    assert stats.monthly_counts() == {6: {"count": 3}, 7: {"count": 1}}
+    maths, english = stats.by_exam()
+    assert maths == {"name": "Maths", "count": 3, "passed": 2, "failed": 1,
+                     "rate": 66.7, "avg_score": 60.0}
+    assert english["avg_score"] == 0.0
+    assert [(e["enrolment"], e["extra_pct"]) for e in stats.extra_time()] == [("2", "+50%")]
+
+
+def test_attempt_index_resits_and_rebooks():
+    """Resit and rebook figures come from one index over every year."""
+    def r(enrol, result, completed, test="Maths"):
+        return ResultRow({"Enrolment no.": enrol, "First name": "Ann", "Last name": enrol,
+                          "Test Name": test, "Result": result, "Completed": completed})
+    idx = AttemptIndex([
+        r("1", "Fail", "10/11/2025"), r("1", "Pass", "05/01/2026"),   # resat next year
+        r("2", "Fail", "01/03/2025"), r("2", "Fail", "01/04/2025"),   # never passed
+        r("3", "Fail", "20/02/2026"), r("3", "Pass", "01/02/2026"),   # latest is a fail
+        r("", "Fail", "01/01/2026"),                                  # no enrolment
+    ])
+    assert idx.resit_conversion(2025) == (1, 2)
+    assert idx.resit_conversion(2026) == (0, 1)
+    assert idx.resit_conversion() == (1, 3)
+    rebooks = idx.rebook_opportunities(now=datetime(2026, 3, 2))
+    assert [(b["enrolment"], b["attempts"], b["days_ago"]) for b in rebooks] == [
+        ("2", 2, 335), ("3", 2, 10)]
+    assert [b["enrolment"] for b in idx.rebook_opportunities(2026)] == ["3"]
+
+
+def test_stored_summaries_match_row_path():
+    """Dashboards built from stored year summaries match the row scans."""
+    import json
+    import random
+    rnd = random.Random(11)
+    rows = [ResultRow({
+        "Enrolment no.": rnd.choice(["", *map(str, range(1, 40))]),
+        "First name": rnd.choice(["Ann", "Bo "]), "Last name": rnd.choice(["X", "Y"]),
+        "Test Name": rnd.choice(["", "Maths", "English ", "ICT"]),
+        "Result": rnd.choice(["Pass", "Fail", "fail ", ""]),
+        "Percent": rnd.choice(["", "55%", "55.5%", "x", "100%"]),
+        "Duration": rnd.choice(["", "60", "60", "75", "x"]),
+        "Centre Name": rnd.choice(["", "C1", "C2"]),
+        "Completed": rnd.choice(["bad", f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/"
+                                        f"{rnd.choice([2024, 2025, 2026])}"]),
+    }) for _ in range(600)]
+    files = [rows[:250], rows[250:400], rows[400:]]
+    summaries = [json.loads(json.dumps(summarize(part))) for part in files]
+    # The middle year saved in two goes: new rows merged into its summary
+    summaries[1] = json.loads(json.dumps(merge_summary(summarize(rows[250:300]),
+                                                       rows[300:400])))
+
+    for part, summary in zip(files, summaries):
+        py, stored = RowStats(part), YearSummary(summary)
+        assert (py.total, py.customers, py.avg_score) == \
+            (stored.total, stored.customers, stored.avg_score)
+        assert list(py.centres.items()) == list(stored.centres.items())
+        assert py.by_exam() == stored.by_exam()
+        assert py.extra_time() == stored.extra_time()
+
+    py, merged = RowStats(rows), merge_stats(map(YearSummary, summaries))
+    assert (py.total, py.passed, py.failed, py.customers, py.avg_score) == \
+        (merged.total, merged.passed, merged.failed, merged.customers, merged.avg_score)
+    assert list(py.monthly_counts().items()) == list(merged.monthly_counts().items())
+    assert py.by_exam() == merged.by_exam()
+
+    now = datetime(2026, 10, 1)
+    py_idx, stored_idx = AttemptIndex(rows), StoredAttemptIndex(summaries)
+    for year in (None, 1, 2024, 2025, 2026):
+        assert tuple(py_idx.resit_conversion(year)) == tuple(stored_idx.resit_conversion(year))
+        assert py_idx.rebook_opportunities(year, now) == stored_idx.rebook_opportunities(year, now)
+
+    # Rows at the old usual duration were not stored; once they would count
+    # as extra time the merge gives up and the full rows are summarized
+    slow = [ResultRow({"Test Name": "ICT", "Duration": "90", "Enrolment no.": str(i)})
+            for i in range(3)]
+    fast = [ResultRow({"Test Name": "ICT", "Duration": "60"}) for _ in range(5)]
+    assert merge_summary(summarize(slow), fast) is None
+    assert len(YearSummary(summarize(slow + fast)).extra_time()) == 3
+
+
 # ---------------------------------------------------------------------------
 # compute_pdf_cutoff_date (uses months_back + 1 rule)
 # ---------------------------------------------------------------------------
@@ -174,6 +297,23 @@ def test_format_ddmmyyyy_empty_and_none():
     assert format_ddmmyyyy("   ") == ""
 
 
+# ---------------------------------------------------------------------------
+# Results sheet styling
+# ---------------------------------------------------------------------------
+
+def test_results_sheet_striped_by_conditional_format():
+    """Stripes and borders must come from conditional formatting over the
+    data range, not from per-cell styles, so styling cost stays constant."""
+    rows = [dict(_ROW, **{"Enrolment no.": str(i)}) for i in range(5)]
+    wb = _build_results_workbook(rows)
+    ws = wb["Results"]
+    ranges = [str(cf.sqref) for cf in ws.conditional_formatting]
+    assert ranges == ["A2:T6"]
+    assert ws["A2"].fill.fill_type is None
+    assert ws["A1"].fill.fill_type == "solid"
+    wb.close()
+
+
 # ---------------------------------------------------------------------------
 # Credential encryption round-trip
 # ---------------------------------------------------------------------------
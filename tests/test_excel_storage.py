@@ -0,0 +1,358 @@
+"""Offline tests for the year-workbook storage layer (save, load, dedup index,
+PDF ledger).
+
+Every test points ``config.BASE_DIR`` at a pytest temp folder (the shared
+``base_dir`` fixture in conftest.py) so the real year folders are never
+touched.
+"""
+import os
+
+import evolve_results_automation.config as config
+import evolve_results_automation.excel_utils as excel_utils
+from evolve_results_automation.config import COLUMNS
+from evolve_results_automation.excel_utils import (
+    load_all_existing_data, load_existing_results, save_year_to_excel
+)
+from evolve_results_automation.parsing_utils import report_filename
+from evolve_results_automation.pdf_ledger import (
+    audit_reports, load_ledger, record_download, scan_reports
+)
+from evolve_results_automation.result_row import ResultRow
+from evolve_results_automation.xlsx_reader import sheet_names
+
+
+def _row(i, completed="15/06/2026", pdf=""):
+    row = {col: "" for col in COLUMNS}
+    row.update({
+        "Enrolment no.": str(10000000 + i), "First name": "Emma",
+        "Last name": f"Smith{i}", "Completed": completed,
+        "Test Name": "Functional Skills English Level 2", "Result": "Pass",
+        "PDF report save time": pdf,
+    })
+    return row
+
+
+def test_dedup_index_written_on_save(base_dir):
+    save_year_to_excel(2026, {2026: [_row(1), _row(2, pdf="2026-06-15 10:00:00")]})
+    assert os.path.isfile(config.get_dedup_index_for_year(2026))
+
+    hashes, rows_by_year, pending = load_all_existing_data(silent=True)
+    assert len(hashes) == 2
+    assert pending == 1
+    assert [r["Last name"] for r in rows_by_year[2026]] == ["Smith1"]
+
+
+def test_dedup_index_skips_unchanged_workbooks(base_dir, monkeypatch):
+    """A fresh index means the workbook is not opened at all."""
+    save_year_to_excel(2026, {2026: [_row(1)]})
+
+    def _fail(path):
+        raise AssertionError(f"{path} should have been served from the index")
+    monkeypatch.setattr(excel_utils, "load_existing_results", _fail)
+    hashes, _rows, _pending = load_all_existing_data(silent=True)
+    assert len(hashes) == 1
+
+
+def test_dedup_index_rebuilt_after_outside_edit(base_dir):
+    """Editing the workbook (new mtime/size) must invalidate the index."""
+    save_year_to_excel(2026, {2026: [_row(1)]})
+    path = config.get_excel_file_for_year(2026)
+    # Simulate an admin edit that the app did not write
+    wb = excel_utils._build_results_workbook([_row(1), _row(2)])
+    wb.save(path)
+    os.utime(path, ns=(1, 1))
+
+    hashes, _rows, pending = load_all_existing_data(silent=True)
+    assert len(hashes) == 2
+    assert pending == 2
+    # Index now matches the edited workbook again
+    assert excel_utils._read_dedup_index(2026, path) is not None
+    assert len(load_existing_results(path)) == 2
+
+
+def _completed_order(year):
+    rows = load_existing_results(config.get_excel_file_for_year(year))
+    return [(r["Completed"], r["Last name"]) for r in rows]
+
+
+def test_save_merges_new_rows_in_completed_order(base_dir):
+    save_year_to_excel(2026, {2026: [_row(1, "20/06/2026"), _row(2, "05/06/2026"),
+                                     _row(3, "bad date")]})
+    assert _completed_order(2026) == [
+        ("05/06/2026", "Smith2"), ("20/06/2026", "Smith1"), ("bad date", "Smith3")]
+
+    # Same-day rows land after the existing ones; a re-saved row keeps its slot
+    save_year_to_excel(2026, {2026: [_row(4, "05/06/2026"), _row(5, "01/06/2026"),
+                                     _row(1, "20/06/2026", pdf="2026-06-21 09:00:00")]})
+    assert _completed_order(2026) == [
+        ("01/06/2026", "Smith5"), ("05/06/2026", "Smith2"), ("05/06/2026", "Smith4"),
+        ("20/06/2026", "Smith1"), ("bad date", "Smith3")]
+    rows = load_existing_results(config.get_excel_file_for_year(2026))
+    assert rows[3]["PDF report save time"] == "2026-06-21 09:00:00"
+
+
+def test_save_resorts_workbook_reordered_outside_app(base_dir):
+    path = config.get_excel_file_for_year(2026)
+    os.makedirs(os.path.dirname(path))
+    excel_utils._build_results_workbook(
+        [_row(1, "20/06/2026"), _row(2, "05/06/2026")]).save(path)
+
+    save_year_to_excel(2026, {2026: [_row(3, "10/06/2026")]})
+    assert [c for c, _ in _completed_order(2026)] == [
+        "05/06/2026", "10/06/2026", "20/06/2026"]
+
+
+def test_pdf_ledger_marks_pending_rows_done(base_dir):
+    """A download recorded only in the ledger (run stopped before the batch
+    save) is no longer pending and its time is written on the next save."""
+    save_year_to_excel(2026, {2026: [_row(1), _row(2)]})
+    report = base_dir / "2026" / "reports" / "06 15" / "Emma Smith1.pdf"
+    report.parent.mkdir(parents=True)
+    report.write_bytes(b"%PDF-1.4 test")
+    entry = record_download(2026, ResultRow(_row(1)).digest, str(report),
+                            "2026-06-16 08:00:00")
+    assert entry["path"] == os.path.join("reports", "06 15", "Emma Smith1.pdf")
+    assert entry["size"] == 13
+
+    # A torn final line from a crash mid-append is ignored
+    with open(config.get_pdf_ledger_for_year(2026), "a", encoding="utf-8") as f:
+        f.write('{"digest": 12')
+    assert list(load_ledger(2026)) == [entry["digest"]]
+
+    _hashes, rows_by_year, pending = load_all_existing_data(silent=True)
+    assert pending == 1
+    save_year_to_excel(2026, rows_by_year)
+    times = {r["Last name"]: r["PDF report save time"]
+             for r in load_existing_results(config.get_excel_file_for_year(2026))}
+    assert times == {"Smith1": "2026-06-16 08:00:00", "Smith2": ""}
+
+
+def test_reports_on_disk_marked_in_bulk_and_audited(base_dir):
+    save_year_to_excel(2026, {2026: [_row(1), _row(2), _row(3, pdf="2026-06-15 10:00:00")]})
+    day = base_dir / "2026" / "reports" / "06 15"
+    day.mkdir(parents=True)
+    on_disk = day / report_filename(_row(1))
+    on_disk.write_bytes(b"%PDF-1.4 one")
+    (day / "Someone Else.pdf").write_bytes(b"%PDF-1.4 stray")
+    (day / (report_filename(_row(2)) + ".tmp")).write_bytes(b"partial")
+
+    assert set(scan_reports(2026)) == {
+        os.path.join("reports", "06 15", on_disk.name),
+        os.path.join("reports", "06 15", "Someone Else.pdf")}
+
+    _hashes, rows_by_year, pending = load_all_existing_data(silent=True)
+    assert pending == 1
+    assert ResultRow(_row(1)).digest in load_ledger(2026)
+
+    save_year_to_excel(2026, rows_by_year)
+    rows = load_existing_results(config.get_excel_file_for_year(2026))
+    orphans, missing = audit_reports(2026, rows)
+    assert orphans == [os.path.join("reports", "06 15", "Someone Else.pdf")]
+    assert missing == [os.path.join("reports", "06 15", report_filename(_row(3)))]
+
+
+def test_analytics_rebuilds_only_touched_and_dependent_years(base_dir, monkeypatch):
+    analytics_file = str(base_dir / "analytics.xlsx")
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", analytics_file)
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    resit = _row(1, completed="10/03/2025")
+    resit["Result"] = "Fail"
+    save_year_to_excel(2024, {2024: [_row(7, completed="01/02/2024")]})
+    save_year_to_excel(2025, {2025: [resit]})
+    save_year_to_excel(2026, {2026: [_row(2)]})
+    assert excel_utils.regenerate_analytics()
+
+    # 2026 saved with a new attempt at the candidate who failed in 2025;
+    # 2024 is unrelated and already has its dashboard
+    new = _row(1, completed="20/06/2026")
+    save_year_to_excel(2026, {2026: [new]})
+    built = []
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    monkeypatch.setattr(excel_utils, "_refresh_year_file",
+                        lambda path, rows, **kwargs: built.append(path))
+    assert excel_utils.regenerate_analytics({2026}, [new])
+    assert built == [config.get_excel_file_for_year(2025),
+                     config.get_excel_file_for_year(2026)]
+    assert os.path.isfile(analytics_file)
+
+    # Rebuilt years keep a fresh dedup index
+    monkeypatch.setattr(excel_utils, "load_existing_results", lambda p: 1 / 0)
+    load_all_existing_data(silent=True)
+
+
+def test_rows_edited_in_place_rebuild_dependent_years(base_dir, monkeypatch):
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", str(base_dir / "analytics.xlsx"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    save_year_to_excel(2024, {2024: [_row(7, completed="01/02/2024")]})
+    save_year_to_excel(2025, {2025: [_row(1, completed="10/03/2025")]})
+    attempt = _row(1, completed="20/06/2026")
+    assert save_year_to_excel(2026, {2026: [attempt]}) == []
+    assert excel_utils.regenerate_analytics()
+
+    # Same result re-saved with a corrected score: an edit, not a new row
+    attempt["Percent"] = "72"
+    edited = save_year_to_excel(2026, {2026: [attempt]})
+    assert [r["Percent"] for r in edited] == ["72"]
+    summaries = excel_utils._load_year_summaries()
+    assert excel_utils.analytics_years_to_rebuild(summaries, {2026}, edited) == {2025, 2026}
+
+
+def test_analytics_cache_skips_pdf_only_changes(base_dir, monkeypatch, caplog):
+    analytics_file = str(base_dir / "analytics.xlsx")
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", analytics_file)
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    save_year_to_excel(2025, {2025: [_row(1, completed="10/03/2025")]})
+    save_year_to_excel(2026, {2026: [_row(2)]})
+    assert excel_utils.regenerate_analytics()
+    combined_mtime = os.stat(analytics_file).st_mtime_ns
+    real_refresh = excel_utils._refresh_year_file
+
+    # Only a PDF time changes: the save carries 2026's dashboard across, so
+    # neither year nor the combined workbook is rebuilt
+    path = config.get_excel_file_for_year(2026)
+    save_year_to_excel(2026, {2026: [_row(2, pdf="2026-06-15 10:00:00")]})
+    assert sheet_names(path) == ["Results", "Analytics", "_ChartData"]
+    assert load_existing_results(path)[0]["PDF report save time"] == "2026-06-15 10:00:00"
+    built = []
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    monkeypatch.setattr(excel_utils, "_refresh_year_file",
+                        lambda path, rows, **kw: built.append(path))
+    with caplog.at_level("INFO"):
+        assert excel_utils.regenerate_analytics({2026})
+    assert built == []
+    assert "Analytics for 2026 unchanged, skipping rebuild" in caplog.text
+    assert "Combined analytics unchanged, skipping rebuild" in caplog.text
+    assert os.stat(analytics_file).st_mtime_ns == combined_mtime
+
+    # A new row drops the stale dashboard and only that year is rebuilt,
+    # with its dedup index still current
+    save_year_to_excel(2026, {2026: [_row(3)]})
+    assert sheet_names(path) == ["Results"]
+    monkeypatch.setattr(excel_utils, "_refresh_year_file", real_refresh)
+    assert excel_utils.regenerate_analytics({2026})
+    assert sheet_names(path) == ["Results", "Analytics", "_ChartData"]
+    monkeypatch.setattr(excel_utils, "load_existing_results", lambda p: 1 / 0)
+    load_all_existing_data(silent=True)
+
+
+def test_dashboards_build_in_worker_processes(base_dir, monkeypatch):
+    analytics_file = str(base_dir / "analytics.xlsx")
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", analytics_file)
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 2)
+    save_year_to_excel(2025, {2025: [_row(1, completed="10/03/2025")]})
+    save_year_to_excel(2026, {2026: [_row(2)]})
+    assert excel_utils.regenerate_analytics()
+
+    from evolve_results_automation.xlsx_reader import sheet_names
+    assert sheet_names(analytics_file) == [
+        "Overview", "_OverviewChartData", "2026", "_2026_ChartData", "2025", "_2025_ChartData"]
+    for year in (2025, 2026):
+        assert sheet_names(config.get_excel_file_for_year(year)) == [
+            "Results", "Analytics", "_ChartData"]
+
+
+def test_analytics_built_from_stored_summaries(base_dir, monkeypatch):
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", str(base_dir / "analytics.xlsx"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    resit = _row(1, completed="10/03/2025")
+    resit["Result"] = "Fail"
+    save_year_to_excel(2025, {2025: [resit, _row(2, completed="11/03/2025")]})
+    save_year_to_excel(2026, {2026: [_row(3, completed="01/06/2026")]})
+
+    # A later save merges its new rows into the stored summary
+    with monkeypatch.context() as m:
+        m.setattr(excel_utils, "summarize", lambda rows: 1 / 0)
+        save_year_to_excel(2026, {2026: [_row(1)]})
+    path = config.get_excel_file_for_year(2026)
+    assert excel_utils._read_year_summary(2026, path)["total"] == 2
+
+    # Saving wrote each year's summary: no workbook rows are read back
+    real_load = excel_utils.load_existing_results
+    monkeypatch.setattr(excel_utils, "load_existing_results", lambda p: 1 / 0)
+    assert excel_utils.regenerate_analytics()
+    for year in (2025, 2026):
+        path = config.get_excel_file_for_year(year)
+        assert "Analytics" in sheet_names(path)
+        assert excel_utils._read_year_summary(year, path) is not None
+    assert sheet_names(excel_utils.ANALYTICS_FILE)[:3] == ["Overview", "_OverviewChartData", "2026"]
+
+    # A missing (or stale) summary is rebuilt from its workbook
+    monkeypatch.setattr(excel_utils, "load_existing_results", real_load)
+    os.remove(config.get_analytics_summary_for_year(2025))
+    assert excel_utils.regenerate_analytics(set())
+    summary = excel_utils._read_year_summary(2025, config.get_excel_file_for_year(2025))
+    assert (summary["total"], summary["pairs"][0][:2]) == (2, ["10000001", _row(1)["Test Name"]])
+
+
+def test_combined_workbook_builds_standalone(base_dir, monkeypatch):
+    analytics_file = str(base_dir / "analytics.xlsx")
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", analytics_file)
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    save_year_to_excel(2025, {2025: [_row(1, completed="10/03/2025")]})
+    save_year_to_excel(2026, {2026: [_row(2)]})
+
+    # No pool or stats passed in: reads the summaries and makes its own pool
+    excel_utils.generate_analytics_workbook()
+    assert sheet_names(analytics_file) == [
+        "Overview", "_OverviewChartData", "2026", "_2026_ChartData", "2025", "_2025_ChartData"]
+
+
+def test_locked_year_workbook_fails_the_analytics_job(base_dir, monkeypatch):
+    import evolve_results_automation.analytics_job as analytics_job
+
+    monkeypatch.setattr(excel_utils, "ANALYTICS_FILE", str(base_dir / "analytics.xlsx"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_CACHE_FILE", str(base_dir / "cache.json"))
+    monkeypatch.setattr(excel_utils, "ANALYTICS_WORKERS", 1)
+    save_year_to_excel(2025, {2025: [_row(1, completed="10/03/2025")]})
+    save_year_to_excel(2026, {2026: [_row(2)]})
+
+    # 2025 is open in Excel: Windows refuses to replace it
+    locked = config.get_excel_file_for_year(2025)
+    real_replace = os.replace
+
+    def replace(src, dst):
+        if os.path.abspath(dst) == os.path.abspath(locked):
+            raise PermissionError(13, "The process cannot access the file", dst)
+        real_replace(src, dst)
+    monkeypatch.setattr(os, "replace", replace)
+
+    job = analytics_job.AnalyticsJob()
+    job.schedule()
+    assert job.wait(30)
+    assert job.status == "failed" and "2025" in job.error and "2026" not in job.error
+    # The other year still got its dashboard
+    assert "Analytics" in sheet_names(config.get_excel_file_for_year(2026))
+    assert "Analytics" not in sheet_names(locked)
+
+
+def test_background_analytics_merges_queued_runs(monkeypatch):
+    import threading
+    import evolve_results_automation.analytics_job as analytics_job
+
+    calls, release = [], threading.Event()
+
+    def fake_regenerate(years, rows):
+        calls.append((years, rows))
+        release.wait(5)
+        if years and 2027 in years:
+            raise OSError("analytics.xlsx is open")
+    monkeypatch.setattr(analytics_job, "regenerate_analytics", fake_regenerate)
+
+    job = analytics_job.AnalyticsJob()
+    job.schedule({2025}, ["a"])
+    while not calls:
+        threading.Event().wait(0.01)
+    # Queued while the first rebuild runs: merged into one follow-up rebuild
+    job.schedule({2026}, ["b"])
+    job.schedule({2027}, ["c"])
+    assert job.busy and not job.wait(0.05)
+    release.set()
+    assert job.wait(5) and not job.busy
+    assert calls == [({2025}, ["a"]), ({2026, 2027}, ["b", "c"])]
+    assert (job.status, job.error) == ("failed", "analytics.xlsx is open")
+
+    job.schedule(None)
+    assert job.wait(5) and calls[-1] == (None, []) and job.status == "done"
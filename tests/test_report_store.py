@@ -0,0 +1,112 @@
+"""Offline tests for report storage on disk (content-addressed PDF store)."""
+import os
+from datetime import datetime
+
+from evolve_results_automation.maintenance import main as maintenance_main
+from evolve_results_automation.pdf_store import ContentStore
+
+
+def _report(base_dir, year, day, name, body):
+    path = base_dir / str(year) / "reports" / day / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    return path
+
+
+def test_store_links_duplicate_reports(base_dir):
+    store = ContentStore(str(base_dir / "pdf_store"))
+    first = _report(base_dir, 2026, "06 15", "Emma Smith.pdf", b"%PDF-1.4 same %%EOF")
+    second = _report(base_dir, 2026, "06 16", "Emma Jones.pdf", b"%PDF-1.4 same %%EOF")
+
+    assert store.add(str(first)) == 0
+    assert store.add(str(second)) == len(b"%PDF-1.4 same %%EOF")
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == b"%PDF-1.4 same %%EOF"
+    store.save()
+
+    reloaded = ContentStore(str(base_dir / "pdf_store"))
+    (entry,) = reloaded.objects.values()
+    assert entry["links"] == [os.path.join("2026", "reports", "06 15", "Emma Smith.pdf"),
+                              os.path.join("2026", "reports", "06 16", "Emma Jones.pdf")]
+
+
+def test_sweep_dedups_archive_and_checks_manifest(base_dir):
+    _report(base_dir, 2025, "01 10", "A.pdf", b"%PDF-1.4 one %%EOF")
+    dup = _report(base_dir, 2026, "02 11", "A renamed.pdf", b"%PDF-1.4 one %%EOF")
+    _report(base_dir, 2026, "02 11", "B.pdf", b"%PDF-1.4 two %%EOF")
+
+    store = ContentStore(str(base_dir / "pdf_store"))
+    summary = store.sweep()
+    assert (summary["reports"], summary["linked"], summary["deduplicated"]) == (3, 3, 1)
+    assert len(store.objects) == 2
+
+    # Nothing new: the second sweep only checks the manifest
+    assert store.sweep()["linked"] == 0
+
+    dup.unlink()
+    summary = store.sweep()
+    assert summary["stale_links"] == 1
+
+    # Same-size corruption is only caught when re-hashing
+    obj = store.object_path(next(iter(store.objects)))
+    with open(obj, "r+b") as f:
+        f.write(b"%PDF-9")
+    assert store.sweep()["corrupt_objects"] == 0
+    assert store.sweep(verify=True)["corrupt_objects"] == 1
+
+
+def test_maintenance_dedup_command(base_dir, monkeypatch, capsys):
+    monkeypatch.setattr("evolve_results_automation.maintenance.PDF_STORE_DIR",
+                        str(base_dir / "pdf_store"))
+    _report(base_dir, 2026, "06 15", "A.pdf", b"%PDF-1.4 x %%EOF")
+    _report(base_dir, 2026, "06 16", "B.pdf", b"%PDF-1.4 x %%EOF")
+    assert maintenance_main(["dedup-reports"]) == 0
+    assert "1 duplicate(s) linked" in capsys.readouterr().out
+
+
+def test_archive_reports_keeps_lookup_transparent(base_dir):
+    from evolve_results_automation.parsing_utils import download_pdf, report_filename
+    from evolve_results_automation.pdf_ledger import record_download, scan_reports
+    from evolve_results_automation.report_archive import archive_reports, open_report
+    from evolve_results_automation.result_row import ResultRow
+
+    row = ResultRow({"First name": "Emma", "Last name": "Smith", "Enrolment no.": "123",
+                     "Test Name": "English", "Result": "Pass", "Completed": "15/06/2025"})
+    body = b"%PDF-1.4 archived %%EOF"
+    loose = _report(base_dir, 2025, "06 15", report_filename(row), body)
+    _report(base_dir, 2025, "07 01", "Other.pdf", b"%PDF-1.4 july %%EOF")
+    before = scan_reports(2025)
+
+    summary = archive_reports(2025, before=(2025, 7))
+    assert (summary["months"], summary["files"]) == (1, 1)
+    assert not loose.exists() and not loose.parent.exists()
+    assert (base_dir / "2025" / "reports" / "2025-06.zip").exists()
+    assert (base_dir / "2025" / "reports" / "07 01" / "Other.pdf").exists()
+    assert scan_reports(2025) == before
+    assert scan_reports(2025, include_archived=False) == {
+        k: v for k, v in before.items() if "07 01" in k}
+
+    # Already archived: no download attempted, ledger hashes the zipped copy
+    saved = download_pdf("http://127.0.0.1:9/unused.pdf", row, row["Completed"])
+    assert saved == str(loose)
+    with open_report(saved) as f:
+        assert f.read() == body
+    entry = record_download(2025, row.digest, saved, "2025-06-15 10:00:00")
+    assert entry["size"] == len(body)
+
+    # A re-downloaded loose copy is merged into the existing month zip
+    _report(base_dir, 2025, "06 20", "Late.pdf", b"%PDF-1.4 late %%EOF")
+    assert archive_reports(2025)["files"] == 2
+    assert len(scan_reports(2025)) == 3
+    assert not list((base_dir / "2025" / "reports").glob("* *"))
+
+
+def test_maintenance_archive_command(base_dir, capsys):
+    from evolve_results_automation.maintenance import _months_back
+    assert _months_back(datetime(2026, 2, 10), 3) == (2025, 11)
+
+    _report(base_dir, 2020, "03 01", "Old.pdf", b"%PDF-1.4 old %%EOF")
+    _report(base_dir, datetime.now().year, "01 01", "New.pdf", b"%PDF-1.4 new %%EOF")
+    assert maintenance_main(["archive-reports"]) == 0
+    assert "Archived 1 report(s) into 1 month zip(s)" in capsys.readouterr().out
+    assert (base_dir / "2020" / "reports" / "2020-03.zip").exists()
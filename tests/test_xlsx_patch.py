@@ -0,0 +1,123 @@
+"""Tests for swapping the dashboard sheets of a year workbook in place."""
+import io
+import zipfile
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from evolve_results_automation.config import COLUMNS
+from evolve_results_automation.excel_utils import (
+    _add_analytics_to_wb, _build_results_workbook, load_existing_results
+)
+from evolve_results_automation.result_row import ResultRow
+from evolve_results_automation.xlsx_patch import replace_sheets
+from evolve_results_automation.xlsx_reader import sheet_names
+
+
+def _rows():
+    rows = []
+    for i in range(40):
+        row = {col: "" for col in COLUMNS}
+        row.update({
+            "Enrolment no.": str(10000000 + i % 9), "First name": "Emma",
+            "Last name": f"Smith {i}", "Completed": f"{i % 28 + 1:02d}/06/2026",
+            "Test Name": f"Exam {i % 3}", "Result": "Pass" if i % 3 else "Fail",
+            "Percent": f"{50 + i}%", "Duration": "45", "Centre Name": "Centre",
+        })
+        rows.append(ResultRow.coerce(row))
+    return rows
+
+
+def _dashboard(rows):
+    wb = Workbook()
+    wb.active.title = "Results"
+    _add_analytics_to_wb(wb, rows, all_rows=rows)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf
+
+
+def _member(path, name):
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(name)
+
+
+def _rewrite(path, transforms, extra=()):
+    with zipfile.ZipFile(path) as zin:
+        items = [(i, zin.read(i.filename)) for i in zin.infolist()]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info, data in items:
+            if info.filename in transforms:
+                data = transforms[info.filename](data.decode("utf-8")).encode("utf-8")
+            zout.writestr(info, data)
+        for name, data in extra:
+            zout.writestr(name, data)
+
+
+def test_replace_sheets_leaves_results_untouched(tmp_path):
+    rows = _rows()
+    path = str(tmp_path / "exam_results_2026.xlsx")
+    _build_results_workbook(rows).save(path)
+    results_xml = _member(path, "xl/worksheets/sheet1.xml")
+
+    replace_sheets(path, _dashboard(rows))
+    styles = _member(path, "xl/styles.xml")
+    replace_sheets(path, _dashboard(rows))
+
+    assert sheet_names(path) == ["Results", "Analytics", "_ChartData"]
+    assert _member(path, "xl/worksheets/sheet1.xml") == results_xml
+    assert _member(path, "xl/styles.xml") == styles   # formats reused, not re-added
+    assert load_existing_results(path) == rows
+    wb = load_workbook(path)
+    title = wb["Analytics"]["A1"]
+    assert title.value == "EVOLVE SECURE-ASSESS ANALYTICS"
+    assert title.font.b and title.fill.fgColor.rgb == "00E30613"
+    assert title.style == "header-title"
+    assert {"table-header", "kpi-label", "highlight-days"} <= set(wb.named_styles)
+    assert len(wb["Analytics"]._charts) == 2
+    assert wb["_ChartData"].sheet_state == "hidden"
+
+
+def test_replace_sheets_excel_style_package(tmp_path):
+    """Relative targets, a calc chain and names scoped to the old dashboard."""
+    rows = _rows()
+    path = str(tmp_path / "exam_results_2026.xlsx")
+    _build_results_workbook(rows).save(path)
+    replace_sheets(path, _dashboard(rows))
+    _rewrite(path, {
+        "xl/_rels/workbook.xml.rels": lambda s: s.replace('Target="/xl/', 'Target="').replace(
+            "</Relationships>",
+            '<Relationship Id="rId99" Target="calcChain.xml" Type="http://schemas.'
+            'openxmlformats.org/officeDocument/2006/relationships/calcChain"/>'
+            "</Relationships>"),
+        "[Content_Types].xml": lambda s: s.replace(
+            "</Types>", '<Override PartName="/xl/calcChain.xml" ContentType="application/'
+            'vnd.openxmlformats-officedocument.spreadsheetml.calcChain+xml"/></Types>'),
+        "xl/workbook.xml": lambda s: s.replace(
+            "</definedNames>", '<definedName name="_xlnm.Print_Area" localSheetId="1">'
+            "Analytics!$A$1:$L$40</definedName></definedNames>"),
+    }, extra=[("xl/calcChain.xml", b'<calcChain xmlns="http://schemas.openxmlformats.org/'
+                                   b'spreadsheetml/2006/main"><c r="A1" i="2"/></calcChain>')])
+    results_xml = _member(path, "xl/worksheets/sheet1.xml")
+
+    replace_sheets(path, _dashboard(rows))
+
+    with zipfile.ZipFile(path) as zf:
+        assert "xl/calcChain.xml" not in zf.namelist()
+        workbook_xml = zf.read("xl/workbook.xml").decode("utf-8")
+    assert "Print_Area" not in workbook_xml and "_FilterDatabase" in workbook_xml
+    assert _member(path, "xl/worksheets/sheet1.xml") == results_xml
+    wb = load_workbook(path)
+    assert wb.sheetnames == ["Results", "Analytics", "_ChartData"]
+    assert wb["Analytics"]["A1"].value == "EVOLVE SECURE-ASSESS ANALYTICS"
+
+
+def test_replace_sheets_needs_results_first(tmp_path):
+    wb = Workbook()
+    wb.active.title = "Notes"
+    wb.create_sheet("Results")
+    path = str(tmp_path / "exam_results_2026.xlsx")
+    wb.save(path)
+    with pytest.raises(ValueError):
+        replace_sheets(path, _dashboard(_rows()))
+    assert sheet_names(path) == ["Notes", "Results"]
@@ -0,0 +1,196 @@
+"""Parity tests for the streaming Results-sheet reader.
+
+Every test builds a workbook, reads it with both ``xlsx_reader`` and
+openpyxl's read-only mode, and asserts the two agree exactly - first on the
+raw value tuples, then on the normalised ``ResultRow`` records that
+``load_existing_results`` hands to the rest of the app.
+"""
+import zipfile
+from datetime import datetime, date, time
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from evolve_results_automation.config import COLUMNS
+from evolve_results_automation.excel_utils import (
+    _build_results_workbook, _load_existing_results_openpyxl,
+    _rows_to_records, load_existing_results
+)
+from evolve_results_automation.xlsx_reader import iter_sheet_values
+
+
+def _openpyxl_values(path):
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb["Results"] if "Results" in wb.sheetnames else wb.active
+        return list(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+
+def _assert_parity(path):
+    assert list(iter_sheet_values(path)) == _openpyxl_values(path)
+    fast = _rows_to_records(iter_sheet_values(path))
+    assert fast == _load_existing_results_openpyxl(path)
+    assert load_existing_results(str(path)) == fast
+
+
+def _rewrite_member(path, member, transform):
+    """Rewrite one zip member in place (used to hand-craft XML variants)."""
+    with zipfile.ZipFile(path) as zin:
+        items = [(i, zin.read(i.filename)) for i in zin.infolist()]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info, data in items:
+            if info.filename == member:
+                data = transform(data.decode("utf-8")).encode("utf-8")
+            zout.writestr(info, data)
+
+
+def _results_wb(rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Results"
+    for row in rows:
+        ws.append(row)
+    return wb
+
+
+def test_parity_app_written_workbook(tmp_path):
+    """A workbook produced by the app's own Results writer."""
+    rows = []
+    for i in range(30):
+        row = {col: "" for col in COLUMNS}
+        row.update({
+            "Enrolment no.": str(10000000 + i), "First name": "Emma",
+            "Last name": f"Smith {i}", "Completed": f"{i % 28 + 1:02d}/06/2026",
+            "Test Name": "Functional Skills English Level 2",
+            "Result": "Pass" if i % 3 else "Fail", "Percent": f"{50 + i}%",
+            "Duration": "45", "Comments": "  padded  " if i == 4 else "",
+        })
+        rows.append(row)
+    path = tmp_path / "exam_results_2026.xlsx"
+    _build_results_workbook(rows).save(path)
+    _assert_parity(path)
+    assert len(load_existing_results(str(path))) == 30
+
+
+def test_parity_mixed_cell_types(tmp_path):
+    """Numbers, floats, booleans, dates, times, formulas and 'nan' text."""
+    wb = _results_wb([
+        ["Name", "Int", "Float", "Bool", "Date", "Time", "Formula", "Text"],
+        ["a", 1, 2.5, True, datetime(2026, 4, 15, 10, 30), time(9, 15), "=1+1", "nan"],
+        ["b", -7, 1e-7, False, date(2025, 12, 31), None, None, " x "],
+    ])
+    path = tmp_path / "mixed.xlsx"
+    wb.save(path)
+    _assert_parity(path)
+    row = load_existing_results(str(path))[0]
+    assert row["Date"] == "2026-04-15 10:30:00"
+    assert row["Text"] == ""
+
+
+def test_parity_sparse_rows_and_gaps(tmp_path):
+    """Missing rows, short rows and cells beyond the header width."""
+    wb = _results_wb([["A", "B", "C"]])
+    ws = wb.active
+    ws["A3"] = "after gap"
+    ws["C5"] = "only third"
+    ws["E6"] = "wider than header"
+    path = tmp_path / "sparse.xlsx"
+    wb.save(path)
+    _assert_parity(path)
+
+
+_SST = ('<?xml version="1.0" encoding="UTF-8"?>'
+        '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'count="2" uniqueCount="2"><si><t>Note</t></si>'
+        '<si><r><t>ri</t></r><r><rPr><b/></rPr><t>ch</t></r>'
+        '<rPh sb="0" eb="1"><t>ignored</t></rPh></si></sst>')
+
+
+def _add_shared_strings(path):
+    """Add a sharedStrings part (openpyxl itself writes inline strings only)."""
+    with zipfile.ZipFile(path, "a") as z:
+        z.writestr("xl/sharedStrings.xml", _SST)
+    _rewrite_member(path, "xl/_rels/workbook.xml.rels", lambda xml: xml.replace(
+        "</Relationships>",
+        '<Relationship Id="rIdSst" Target="sharedStrings.xml" Type="http://schemas.'
+        'openxmlformats.org/officeDocument/2006/relationships/sharedStrings"/>'
+        "</Relationships>"))
+    _rewrite_member(path, "[Content_Types].xml", lambda xml: xml.replace(
+        "</Types>",
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        "</Types>"))
+
+
+def _cell_xml(xml, ref, new_cell):
+    start = xml.index(f'<c r="{ref}"')
+    end = xml.index("</c>", start) + 4
+    return xml[:start] + new_cell + xml[end:]
+
+
+def test_parity_inline_and_rich_strings(tmp_path):
+    """Inline strings and rich-text shared strings as written by Excel."""
+    path = tmp_path / "strings.xlsx"
+    _results_wb([["Name", "Note"], ["x", "y"]]).save(path)
+    _add_shared_strings(path)
+
+    def to_excel_style(xml):
+        xml = _cell_xml(xml, "A2", '<c r="A2" t="inlineStr"><is>'
+                        '<t xml:space="preserve"> Inline </t></is></c>')
+        xml = _cell_xml(xml, "B1", '<c r="B1" t="s"><v>0</v></c>')
+        return _cell_xml(xml, "B2", '<c r="B2" t="s"><v>1</v></c>')
+
+    _rewrite_member(path, "xl/worksheets/sheet1.xml", to_excel_style)
+    _assert_parity(path)
+    row = load_existing_results(str(path))[0]
+    assert (row["Name"], row["Note"]) == ("Inline", "rich")
+
+
+def test_parity_without_dimension_or_references(tmp_path):
+    """No <dimension> element and cells/rows without r= attributes."""
+    path = tmp_path / "bare.xlsx"
+    _results_wb([["A", "B"], [1, 2], [3]]).save(path)
+
+    def strip_refs(xml):
+        start = xml.index("<dimension")
+        xml = xml[:start] + xml[xml.index("/>", start) + 2:]
+        for ref in ("A1", "B1", "A2", "B2", "A3"):
+            xml = xml.replace(f' r="{ref}"', "")
+        for r in ("1", "2", "3"):
+            xml = xml.replace(f'<row r="{r}">', "<row>")
+        return xml
+
+    _rewrite_member(path, "xl/worksheets/sheet1.xml", strip_refs)
+    _assert_parity(path)
+
+
+def test_parity_1904_epoch(tmp_path):
+    """Mac 1904 date system must shift date serials the same way."""
+    wb = _results_wb([["Completed"], [datetime(2026, 1, 2)]])
+    wb.epoch = datetime(1904, 1, 1)
+    path = tmp_path / "epoch.xlsx"
+    wb.save(path)
+    _assert_parity(path)
+
+
+def test_missing_results_sheet_falls_back(tmp_path):
+    """No 'Results' sheet: streaming reader refuses, loader uses the active sheet."""
+    wb = Workbook()
+    wb.active.title = "Sheet"
+    wb.active.append(["Completed"])
+    wb.active.append(["15/06/2026"])
+    path = tmp_path / "other.xlsx"
+    wb.save(path)
+    with pytest.raises(KeyError):
+        list(iter_sheet_values(path))
+    rows = load_existing_results(str(path))
+    assert [r["Completed"] for r in rows] == ["15/06/2026"]
+
+
+def test_empty_results_sheet(tmp_path):
+    path = tmp_path / "empty.xlsx"
+    _results_wb([]).save(path)
+    _assert_parity(path)
+    assert load_existing_results(str(path)) == []